@@ -0,0 +1,300 @@
+"""
+End-to-end load generator for the web app → ML client → MongoDB chain.
+
+Runs against a live deployment (--target) or fully offline (--local), in
+which case the real web app is served in-process with an in-memory Mongo
+stand-in (or, with --store sqlite, the embedded SQLite store) and a stub ML
+server with configurable latency.
+
+Examples:
+    python loadgen.py --local --mode closed --users 20 --duration 30
+    python loadgen.py --local --mode open --rate 50 --ml-latency 0.2
+    python loadgen.py --local --store sqlite --mix analyze=1,whiteboard=3,export=1
+    python loadgen.py --target http://localhost:5000 --mode open --sweep 5,10,20,40
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+import requests
+
+from stubs import BackgroundServer, InMemoryCollection, make_stub_ml_app
+
+# 1x1 PNG, same fixture the service tests use
+TINY_PNG = (
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42"
+    "mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+)
+
+ENDPOINTS = {
+    "analyze": ("POST", "/analyze"),
+    "whiteboard": ("GET", "/api/whiteboard?format=compact"),
+    "whiteboard_full": ("GET", "/api/whiteboard"),
+    "page": ("GET", "/whiteboard"),
+    "export": ("GET", "/api/export?limit=1000"),
+}
+
+
+class Recorder:
+    """Collects latencies and outcomes per endpoint."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, latency, status):
+        """Store one request's latency and status (an int or error name)."""
+        with self._lock:
+            self.latencies[endpoint].append(latency)
+            self.statuses[endpoint][status] += 1
+            if not isinstance(status, int) or status >= 400:
+                self.errors[endpoint] += 1
+
+    def summary(self, elapsed):
+        """Return per-endpoint p50/p95/p99, throughput and error rate."""
+        report = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            count = len(values)
+            report[endpoint] = {
+                "requests": count,
+                "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+                "error_rate": round(self.errors[endpoint] / count, 4),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1),
+                "statuses": {str(k): v for k, v in self.statuses[endpoint].items()},
+            }
+        return report
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def parse_mix(spec):
+    """Parse 'analyze=1,whiteboard=5' into a weighted endpoint list."""
+    names, weights = [], []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"unknown endpoint {name!r}; pick from {list(ENDPOINTS)}")
+        names.append(name)
+        weights.append(float(weight or 1))
+    return names, weights
+
+
+class LoadGenerator:
+    """Issues requests against base_url and records the results."""
+
+    def __init__(self, base_url, mix, image, timeout=35):
+        self.base_url = base_url.rstrip("/")
+        self.names, self.weights = mix
+        self.body = {"image": image}
+        self.timeout = timeout
+        self.recorder = Recorder()
+        self._local = threading.local()
+
+    def _session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def fire(self, intended_start=None):
+        """
+        Send one request picked from the mix. Open-loop callers pass the
+        scheduled start time so queueing delay counts towards latency.
+        """
+        endpoint = random.choices(self.names, self.weights)[0]
+        method, path = ENDPOINTS[endpoint]
+        started = intended_start or time.perf_counter()
+        try:
+            response = self._session().request(
+                method,
+                self.base_url + path,
+                json=self.body if method == "POST" else None,
+                timeout=self.timeout,
+            )
+            status = response.status_code
+        except requests.RequestException as exc:
+            status = type(exc).__name__
+        self.recorder.record(endpoint, time.perf_counter() - started, status)
+
+    def run_closed(self, users, duration):
+        """N virtual users, each sending its next request when the last ends."""
+        deadline = time.perf_counter() + duration
+
+        def user():
+            while time.perf_counter() < deadline:
+                self.fire()
+
+        threads = [threading.Thread(target=user) for _ in range(users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run_open(self, rate, duration, max_inflight=512):
+        """Fixed arrival rate regardless of how fast responses come back."""
+        interval = 1.0 / rate
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_inflight) as pool:
+            sent = 0
+            while True:
+                intended = start + sent * interval
+                if intended - start >= duration:
+                    break
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self.fire, intended)
+                sent += 1
+
+
+def start_local_stack(args):
+    """
+    Serve the real web app in-process against a stub ML server, storing
+    gestures in an in-memory Mongo stand-in or (--store sqlite) in a
+    throwaway SQLite file.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.join(here, "..", "web-app"))
+    sys.path.insert(0, os.path.join(here, ".."))
+    os.environ.pop("CI", None)
+    # Every simulated user shares one address; limits would measure themselves
+    os.environ.setdefault("RATE_LIMITS", "")
+    os.environ["GESTURE_STORE"] = "sqlite" if args.store == "sqlite" else "mongo"
+    if args.store == "sqlite":
+        os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "gestures.db")
+    # pylint: disable=import-outside-toplevel,import-error
+    import app as webapp
+    from shared.gesture_store import sqlite_store
+    from ml_pool import ReplicaPool
+
+    collection = InMemoryCollection()
+    save = sqlite_store().add if args.store == "sqlite" else collection.insert_one
+    ml_servers = [
+        BackgroundServer(
+            make_stub_ml_app(
+                save,
+                latency=args.ml_latency,
+                jitter=args.ml_jitter,
+                error_rate=args.ml_error_rate,
+            )
+        )
+        for _ in range(args.ml_replicas)
+    ]
+    webapp.ML_POOL = ReplicaPool(
+        [server.url for server in ml_servers],
+        hedge_after=args.hedge_ms / 1000 if args.hedge_ms else None,
+    )
+    webapp.get_mongo_collection = lambda: collection
+    web_server = BackgroundServer(webapp.create_app())
+    return ml_servers + [web_server]
+
+
+def print_report(report, label):
+    """Print a per-endpoint summary table."""
+    print(f"\n== {label} ==")
+    header = f"{'endpoint':<16}{'reqs':>7}{'rps':>9}{'err%':>7}"
+    header += f"{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}{'maxms':>9}"
+    print(header)
+    for endpoint, row in report.items():
+        print(
+            f"{endpoint:<16}{row['requests']:>7}{row['throughput_rps']:>9}"
+            f"{row['error_rate'] * 100:>7.1f}{row['p50_ms']:>9}"
+            f"{row['p95_ms']:>9}{row['p99_ms']:>9}{row['max_ms']:>9}"
+        )
+
+
+def run_steps(base_url, args, image):
+    """Run one load level, or each level of --sweep, and collect reports."""
+    mix = parse_mix(args.mix)
+    if args.sweep:
+        levels = [float(x) for x in args.sweep.split(",")]
+    else:
+        levels = [args.rate if args.mode == "open" else args.users]
+
+    results = []
+    for level in levels:
+        generator = LoadGenerator(base_url, mix, image)
+        started = time.perf_counter()
+        if args.mode == "open":
+            generator.run_open(level, args.duration)
+            label = f"open loop, {level:g} req/s"
+        else:
+            generator.run_closed(int(level), args.duration)
+            label = f"closed loop, {int(level)} users"
+        report = generator.recorder.summary(time.perf_counter() - started)
+        results.append({"label": label, "level": level, "endpoints": report})
+        if not args.json:
+            print_report(report, label)
+    return results
+
+
+def main(argv=None):
+    """Parse arguments, optionally start the local stack and run the test."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--target", help="base URL of a running web app")
+    target.add_argument(
+        "--local", action="store_true", help="run web app with stub ML + Mongo"
+    )
+    parser.add_argument("--mode", choices=["open", "closed"], default="closed")
+    parser.add_argument("--rate", type=float, default=10, help="open-loop req/s")
+    parser.add_argument("--users", type=int, default=10, help="closed-loop users")
+    parser.add_argument("--sweep", help="comma-separated rates/users to step through")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per level")
+    parser.add_argument(
+        "--mix", default="analyze=1,whiteboard=3", help="endpoint weights"
+    )
+    parser.add_argument("--image", help="image file to send instead of a 1x1 PNG")
+    parser.add_argument("--ml-latency", type=float, default=0.15)
+    parser.add_argument("--ml-jitter", type=float, default=0.05)
+    parser.add_argument("--ml-error-rate", type=float, default=0.0)
+    parser.add_argument("--ml-replicas", type=int, default=1)
+    parser.add_argument("--hedge-ms", type=float, default=0, help="0 disables")
+    parser.add_argument(
+        "--store", choices=["memory", "sqlite"], default="memory", help="--local only"
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args(argv)
+
+    image = TINY_PNG
+    if args.image:
+        with open(args.image, "rb") as f:
+            image = base64.b64encode(f.read()).decode()
+
+    if args.local:
+        servers = start_local_stack(args)
+        with ExitStack() as stack:
+            for server in servers:
+                stack.enter_context(server)
+            results = run_steps(servers[-1].url, args, image)
+    else:
+        results = run_steps(args.target, args, image)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
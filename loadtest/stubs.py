@@ -0,0 +1,202 @@
+"""Local stand-ins for MongoDB and the ML client used by the load generator."""
+
+import logging
+import random
+import threading
+import time
+from itertools import islice
+from operator import itemgetter
+
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+_OPERATORS = {
+    "$in": lambda value, arg: value in arg,
+    "$nin": lambda value, arg: value not in arg,
+    "$ne": lambda value, arg: value != arg,
+    "$gt": lambda value, arg: value is not None and value > arg,
+    "$gte": lambda value, arg: value is not None and value >= arg,
+    "$lt": lambda value, arg: value is not None and value < arg,
+    "$lte": lambda value, arg: value is not None and value <= arg,
+}
+
+
+def _matches(doc, query):
+    """Evaluate the subset of Mongo query syntax the services use."""
+    for key, cond in query.items():
+        if key == "$or":
+            matched = any(_matches(doc, sub) for sub in cond)
+        elif key == "$and":
+            matched = all(_matches(doc, sub) for sub in cond)
+        elif isinstance(cond, dict):
+            matched = all(_OPERATORS[op](doc.get(key), arg) for op, arg in cond.items())
+        else:
+            matched = doc.get(key) == cond
+        if not matched:
+            return False
+    return True
+
+
+def _project(doc, projection):
+    """Apply an inclusion or exclusion projection."""
+    if not projection:
+        return dict(doc)
+    included = {k for k, v in projection.items() if v and k != "_id"}
+    if included:
+        out = {k: doc[k] for k in included if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            out["_id"] = doc["_id"]
+        return out
+    return {k: v for k, v in doc.items() if projection.get(k, 1)}
+
+
+class InMemoryCursor:
+    """Lazily sorted/limited cursor over an InMemoryCollection snapshot."""
+
+    def __init__(self, docs, projection):
+        self._docs = docs
+        self._projection = projection
+        self._sort = []
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=1):
+        """Sort like pymongo: sort("field", -1) or sort([("a", 1), ("b", -1)])."""
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction)]
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def limit(self, count):
+        """Cap the number of returned documents (0 = no limit)."""
+        self._limit = count
+        return self
+
+    def batch_size(self, _size):
+        """Accepted for API compatibility; everything is already in memory."""
+        return self
+
+    def __iter__(self):
+        docs = self._docs
+        for key, direction in reversed(self._sort):
+            docs = sorted(
+                docs,
+                key=lambda d, k=key: (d.get(k) is not None, d.get(k)),
+                reverse=direction < 0,
+            )
+        if self._limit:
+            docs = islice(docs, self._limit)
+        return (_project(doc, self._projection) for doc in docs)
+
+
+class InMemoryCollection:
+    """Thread-safe dict store with the pymongo collection calls the apps make."""
+
+    def __init__(self):
+        self._docs = []
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def insert_one(self, doc):
+        """Store a copy of doc with a generated integer _id."""
+        with self._lock:
+            self._next_id += 1
+            doc.setdefault("_id", self._next_id)
+            self._docs.append(dict(doc))
+
+    def insert_many(self, docs):
+        """Store several documents."""
+        for doc in docs:
+            self.insert_one(doc)
+
+    def find(self, query=None, projection=None, sort=None, limit=0, **_kwargs):
+        """Return a cursor over documents matching query."""
+        with self._lock:
+            docs = [d for d in self._docs if _matches(d, query or {})]
+        cursor = InMemoryCursor(docs, projection)
+        if sort:
+            cursor.sort(sort)
+        return cursor.limit(limit)
+
+    def count_documents(self, query):
+        """Count matching documents."""
+        with self._lock:
+            return sum(1 for d in self._docs if _matches(d, query))
+
+    def delete_many(self, query):
+        """Remove matching documents."""
+        with self._lock:
+            self._docs = [d for d in self._docs if not _matches(d, query)]
+
+    def create_index(self, *_args, **_kwargs):
+        """Indexes are meaningless here; accepted for compatibility."""
+        return "stub_index"
+
+    def latest(self, count):
+        """Return the newest documents (handy for debugging a run)."""
+        with self._lock:
+            return sorted(self._docs, key=itemgetter("_id"))[-count:]
+
+
+def make_stub_ml_app(save, latency=0.1, jitter=0.05, error_rate=0.0):
+    """
+    Flask app that mimics the ML client's /analyze-image: sleeps for a random
+    inference time, stores a result with save(document) and returns it.
+    """
+    # Imported here: the registry lives in the shared package at the
+    # repository root, which start_local_stack puts on sys.path
+    # pylint: disable=import-outside-toplevel,import-error
+    from shared.gesture_registry import lookup
+
+    app = Flask("stub_ml")
+    gestures = ["thumbs_up", "thumbs_down", "open_palm", "fist", "victory", "ok"]
+
+    @app.route("/analyze-image", methods=["POST"])
+    def analyze_image_stub():
+        data = request.get_json(silent=True) or {}
+        if "image" not in data:
+            return jsonify({"error": "No image provided"}), 400
+        time.sleep(max(0.0, random.gauss(latency, jitter)))
+        if random.random() < error_rate:
+            return jsonify({"error": "stub failure"}), 500
+        gesture = random.choice(gestures)
+        entry = lookup(gesture)
+        save(
+            {
+                "room": data.get("room") or "main",
+                "code": entry.code,
+                "score": 1.0,
+                "timestamp": time.time(),
+            }
+        )
+        return jsonify(
+            {
+                "gesture": gesture,
+                "emoji": entry.emoji,
+                "confidence": 1.0,
+                "tier": "full",
+            }
+        )
+
+    @app.route("/health")
+    def health_stub():
+        return jsonify({"status": "ok"})
+
+    return app
+
+
+class BackgroundServer:
+    """Run a WSGI app on a threaded werkzeug server in a daemon thread."""
+
+    def __init__(self, app, host="127.0.0.1", port=0):
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        self._server = make_server(host, port, app, threaded=True)
+        self.url = f"http://{host}:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_exc):
+        self._server.shutdown()
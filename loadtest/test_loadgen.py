@@ -0,0 +1,91 @@
+"""Tests for the load generator and its local stand-ins."""
+
+from loadgen import main, parse_mix, percentile
+from stubs import InMemoryCollection
+
+
+def test_percentile_nearest_rank():
+    """p50/p99 use nearest rank over sorted samples."""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 99) == 0.0
+
+
+def test_parse_mix_rejects_unknown_endpoint():
+    """Typos in --mix are reported instead of silently ignored."""
+    assert parse_mix("analyze=2,whiteboard") == (["analyze", "whiteboard"], [2.0, 1.0])
+    try:
+        parse_mix("analyse=1")
+    except ValueError as exc:
+        assert "analyse" in str(exc)
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_in_memory_collection_queries():
+    """The Mongo stand-in supports the filters, sorts and projections used."""
+    collection = InMemoryCollection()
+    collection.insert_many(
+        [{"gesture": "fist", "timestamp": t} for t in (3.0, 1.0, 2.0)]
+        + [{"gesture": "no_hand", "timestamp": 4.0}]
+    )
+    rows = list(
+        collection.find(
+            {"timestamp": {"$gte": 2.0}, "gesture": {"$nin": ["no_hand"]}},
+            {"_id": 0},
+        ).sort("timestamp", -1)
+    )
+    assert rows == [
+        {"gesture": "fist", "timestamp": 3.0},
+        {"gesture": "fist", "timestamp": 2.0},
+    ]
+    collection.delete_many({"timestamp": {"$lt": 2.0}})
+    assert collection.count_documents({}) == 3
+
+
+def test_local_closed_loop_run():
+    """A short offline run exercises the whole chain and reports per endpoint."""
+    results = main(
+        [
+            "--local",
+            "--mode",
+            "closed",
+            "--users",
+            "2",
+            "--duration",
+            "0.5",
+            "--ml-latency",
+            "0.01",
+            "--ml-jitter",
+            "0",
+            "--json",
+        ]
+    )
+    endpoints = results[0]["endpoints"]
+    assert endpoints["analyze"]["requests"] > 0
+    assert endpoints["analyze"]["error_rate"] == 0
+    assert endpoints["whiteboard"]["p99_ms"] >= endpoints["whiteboard"]["p50_ms"]
+
+
+def test_local_run_on_sqlite_store():
+    """--store sqlite serves the whiteboard and export from an SQLite file."""
+    results = main(
+        [
+            "--local",
+            "--store",
+            "sqlite",
+            "--users",
+            "2",
+            "--duration",
+            "0.5",
+            "--ml-latency",
+            "0.01",
+            "--mix",
+            "analyze=1,whiteboard=1,export=1",
+            "--json",
+        ]
+    )
+    endpoints = results[0]["endpoints"]
+    assert endpoints["analyze"]["requests"] > 0
+    assert all(e["error_rate"] == 0 for e in endpoints.values())
@@ -0,0 +1,73 @@
+"""Tests for the trace collector stand-in and report."""
+
+import requests
+
+from stubs import BackgroundServer
+from traces import build_traces, load_spans, make_collector_app, report, self_times
+
+
+def span(span_id, name, start, end, parent=None):
+    """One OTLP JSON span of trace 'a...a', times in ms."""
+    otlp = {
+        "traceId": "a" * 32,
+        "spanId": span_id,
+        "name": name,
+        "startTimeUnixNano": str(int(start * 1e6)),
+        "endTimeUnixNano": str(int(end * 1e6)),
+    }
+    if parent:
+        otlp["parentSpanId"] = parent
+    return otlp
+
+
+def export(service, *spans):
+    """An OTLP/HTTP JSON export request from service."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": service}}
+                    ]
+                },
+                "scopeSpans": [{"spans": list(spans)}],
+            }
+        ]
+    }
+
+
+def test_collector_merges_services(tmp_path, capsys):
+    """Spans posted by both services join into one trace across tiers."""
+    path = tmp_path / "traces.jsonl"
+    with BackgroundServer(make_collector_app(str(path))) as server:
+        url = f"{server.url}/v1/traces"
+        requests.post(
+            url,
+            json=export(
+                "web-app",
+                span("1", "POST /analyze", 0, 100),
+                span("2", "ml_request", 5, 95, parent="1"),
+            ),
+            timeout=5,
+        )
+        requests.post(
+            url,
+            json=export(
+                "machine-learning-client",
+                span("3", "POST /analyze-image", 20, 90, parent="2"),
+                span("4", "mediapipe.detect", 30, 80, parent="3"),
+            ),
+            timeout=5,
+        )
+
+    traces = build_traces(load_spans([str(path)]))
+    trace = traces["a" * 32]
+    assert trace["duration"] == 100
+    assert [root["name"] for root in trace["roots"]] == ["POST /analyze"]
+    times = self_times(trace)
+    assert times[("web-app", "ml_request")] == 20  # the hop itself
+    assert times[("machine-learning-client", "mediapipe.detect")] == 50
+
+    report([str(path)], slowest=1)
+    out = capsys.readouterr().out
+    assert "machine-learning-client: mediapipe.detect" in out
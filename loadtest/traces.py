@@ -0,0 +1,221 @@
+"""
+Collect and read the traces the web app and the ML client export.
+
+"collect" is a stand-in for an OTLP collector: it accepts OTLP/HTTP JSON on
+/v1/traces and appends each export request to a file, in the same format
+the services write with TRACE_EXPORT=file. "report" merges any number of
+such files by trace id, prints the slowest requests as waterfalls and shows
+where the tail's time goes: the self time (a span's time minus its
+children's) of each stage in the slowest traces next to its typical value.
+The self time of the web app's ml_request span is the hop itself: network,
+replica queueing and anything else the ML client did not record.
+
+Examples:
+    python traces.py collect --port 4318 --out traces.jsonl
+    python traces.py report traces.jsonl --slowest 5 --tail 99
+    python traces.py report ../web-app/traces.jsonl ../machine-learning-client/traces.jsonl
+"""
+
+import argparse
+import json
+from collections import defaultdict
+
+from flask import Flask, request
+from werkzeug.serving import make_server
+
+from loadgen import percentile
+
+
+def make_collector_app(path):
+    """Flask app appending each OTLP/HTTP JSON export request to path."""
+    app = Flask(__name__)
+
+    @app.route("/v1/traces", methods=["POST"])
+    def receive():
+        payload = request.get_json(force=True)
+        with open(path, "a", encoding="utf-8") as out:
+            out.write(json.dumps(payload) + "\n")
+        return {"partialSuccess": {}}
+
+    return app
+
+
+def _attributes(items):
+    return {
+        item["key"]: next(iter(item["value"].values()), None) for item in items or []
+    }
+
+
+def load_spans(paths):
+    """Flat span dicts from files of OTLP JSON export requests."""
+    spans = []
+    for path in paths:
+        with open(path, encoding="utf-8") as lines:
+            for line in lines:
+                if not line.strip():
+                    continue
+                for resource_spans in json.loads(line).get("resourceSpans", []):
+                    resource = _attributes(
+                        resource_spans.get("resource", {}).get("attributes")
+                    )
+                    for scope in resource_spans.get("scopeSpans", []):
+                        for span in scope.get("spans", []):
+                            spans.append(
+                                {
+                                    "trace_id": span["traceId"],
+                                    "span_id": span["spanId"],
+                                    "parent_id": span.get("parentSpanId"),
+                                    "name": span["name"],
+                                    "service": resource.get("service.name", "?"),
+                                    "start": int(span["startTimeUnixNano"]) / 1e6,
+                                    "end": int(span["endTimeUnixNano"]) / 1e6,
+                                    "attributes": _attributes(span.get("attributes")),
+                                }
+                            )
+    return spans
+
+
+def build_traces(spans):
+    """trace id -> {"duration", "start", "roots", "children"}."""
+    by_trace = defaultdict(list)
+    for span in spans:
+        by_trace[span["trace_id"]].append(span)
+    traces = {}
+    for trace_id, members in by_trace.items():
+        ids = {span["span_id"] for span in members}
+        children = defaultdict(list)
+        roots = []
+        for span in sorted(members, key=lambda s: s["start"]):
+            if span["parent_id"] in ids:
+                children[span["parent_id"]].append(span)
+            else:
+                # The caller's span may not have been exported
+                roots.append(span)
+        start = min(span["start"] for span in members)
+        traces[trace_id] = {
+            "start": start,
+            "duration": max(span["end"] for span in members) - start,
+            "roots": roots,
+            "children": children,
+        }
+    return traces
+
+
+def self_times(trace):
+    """(service, span name) -> time not covered by the span's children, in ms."""
+    totals = defaultdict(float)
+    for spans in [trace["roots"], *trace["children"].values()]:
+        for span in spans:
+            covered = sum(
+                child["end"] - child["start"]
+                for child in trace["children"].get(span["span_id"], [])
+            )
+            totals[(span["service"], span["name"])] += max(
+                span["end"] - span["start"] - covered, 0.0
+            )
+    return totals
+
+
+def waterfall(trace_id, trace, width=40):
+    """Text rendering of one trace: offset, duration and a bar per span."""
+    scale = width / trace["duration"] if trace["duration"] else 0
+    lines = [f"trace {trace_id}  {trace['duration']:.1f} ms"]
+
+    def walk(span, depth):
+        offset = span["start"] - trace["start"]
+        length = span["end"] - span["start"]
+        bars = " " * int(offset * scale) + "#" * max(1, int(length * scale))
+        label = f"{'  ' * depth}{span['service']}: {span['name']}"
+        lines.append(f"  {offset:>8.1f} {length:>8.1f}  {label:<48} |{bars:<{width}}|")
+        for child in trace["children"].get(span["span_id"], []):
+            walk(child, depth + 1)
+
+    for root in trace["roots"]:
+        walk(root, 0)
+    return "\n".join(lines)
+
+
+def tail_attribution(traces, tail=99.0):
+    """
+    Mean self time per stage over all traces and over the traces at or above
+    the tail percentile, slowest-growing stages first.
+    """
+    durations = sorted(trace["duration"] for trace in traces.values())
+    cutoff = percentile(durations, tail)
+    everyone = defaultdict(float)
+    slow = defaultdict(float)
+    slow_count = 0
+    for trace in traces.values():
+        times = self_times(trace)
+        for key, value in times.items():
+            everyone[key] += value
+        if trace["duration"] >= cutoff:
+            slow_count += 1
+            for key, value in times.items():
+                slow[key] += value
+    rows = [
+        {
+            "service": service,
+            "stage": name,
+            "mean_ms": everyone[(service, name)] / len(traces),
+            "tail_ms": slow[(service, name)] / slow_count,
+        }
+        for service, name in everyone
+    ]
+    rows.sort(key=lambda row: row["tail_ms"] - row["mean_ms"], reverse=True)
+    return cutoff, slow_count, rows
+
+
+def report(paths, slowest=5, tail=99.0):
+    """Print the slowest traces and the tail attribution table."""
+    traces = build_traces(load_spans(paths))
+    if not traces:
+        print("no traces found")
+        return
+    ranked = sorted(traces.items(), key=lambda item: item[1]["duration"], reverse=True)
+    print(f"{len(traces)} traces; slowest {min(slowest, len(ranked))}:\n")
+    print(f"  {'start ms':>8} {'dur ms':>8}  span")
+    for trace_id, trace in ranked[:slowest]:
+        print(waterfall(trace_id, trace))
+        print()
+
+    cutoff, slow_count, rows = tail_attribution(traces, tail)
+    print(f"self time per stage, all traces vs the {slow_count} at/above p{tail:g}")
+    print(f"({cutoff:.1f} ms):")
+    print(f"  {'service':<26}{'stage':<28}{'mean ms':>9}{'tail ms':>9}")
+    for row in rows:
+        print(
+            f"  {row['service']:<26}{row['stage']:<28}"
+            f"{row['mean_ms']:>9.1f}{row['tail_ms']:>9.1f}"
+        )
+
+
+def main(argv=None):
+    """Run the collector or print a report."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    collect = commands.add_parser("collect", help="receive OTLP/HTTP JSON traces")
+    collect.add_argument("--host", default="127.0.0.1")
+    collect.add_argument("--port", type=int, default=4318)
+    collect.add_argument("--out", default="traces.jsonl")
+    show = commands.add_parser("report", help="summarize exported traces")
+    show.add_argument("files", nargs="+")
+    show.add_argument("--slowest", type=int, default=5)
+    show.add_argument("--tail", type=float, default=99.0, help="tail percentile")
+    args = parser.parse_args(argv)
+
+    if args.command == "report":
+        report(args.files, args.slowest, args.tail)
+        return
+    server = make_server(
+        args.host, args.port, make_collector_app(args.out), threaded=True
+    )
+    print(f"collecting traces on http://{args.host}:{args.port}/v1/traces")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Compare hand-landmark backends (HAND_BACKEND) on this machine.
+
+Each configuration runs the same frames through the backend's detect() at
+one quality tier and reports per-frame latency, single-stream throughput and
+the throughput of several worker processes running at once (as gunicorn
+workers would). The tflite backend is measured at every --threads count,
+with and without XNNPACK. Results are compared with the first configuration:
+"agree" is the share of frames given the same gesture.
+
+    python benchmarks/bench_backends.py path/to/frames
+    python benchmarks/bench_backends.py path/to/frames --threads 1,2,4 --workers 2
+    python benchmarks/bench_backends.py --frames 50 --size 1280x720 --json
+
+Without a folder of images, noise frames are used; they contain no hands, so
+only palm detection runs and the numbers understate the cost of real frames.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# The client's own modules, and the shared package at the repository root
+sys.path[:0] = [os.path.join(HERE, ".."), os.path.join(HERE, "..", "..")]
+
+# pylint: disable=wrong-import-position,import-error
+from model import load_backend
+from quality import TIERS
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+_worker = {}
+
+
+def load_frames(dataset, count, size):
+    """RGB frames from a folder, or count noise frames of size (w, h)."""
+    if dataset:
+        frames = []
+        for path in sorted(Path(dataset).rglob("*")):
+            if path.suffix.lower() in IMAGE_SUFFIXES:
+                image = cv2.imread(str(path))
+                if image is not None:
+                    frames.append(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        return frames[:count] if count else frames
+    rng = np.random.default_rng(0)
+    width, height = size
+    return [
+        cv2.GaussianBlur(
+            rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (0, 0), 3
+        )
+        for _ in range(count or 30)
+    ]
+
+
+def configurations(args):
+    """(label, backend name, options) for every configuration to measure."""
+    configs = []
+    for name in args.backends.split(","):
+        if name == "tflite":
+            for threads in (int(t) for t in args.threads.split(",")):
+                for xnnpack in (True, False):
+                    label = (
+                        f"tflite threads={threads} xnnpack={'on' if xnnpack else 'off'}"
+                    )
+                    configs.append(
+                        (label, name, {"threads": threads, "xnnpack": xnnpack})
+                    )
+        else:
+            configs.append((name, name, {}))
+    return configs
+
+
+def _gesture(hands):
+    if not hands:
+        return "no_hand"
+    # pylint: disable-next=import-outside-toplevel
+    from gesture_api import classify_landmarks
+
+    return classify_landmarks(hands[0])["gesture"]
+
+
+def _init_worker(name, options, tier_index):
+    _worker["backend"] = load_backend(name, **options)
+    _worker["tier"] = TIERS[tier_index]
+
+
+def _detect_count(frame):
+    return len(_worker["backend"].detect(frame, _worker["tier"]))
+
+
+def measure(name, options, frames, tier, workers):
+    """Latency, throughput and per-frame gestures for one configuration."""
+    backend = load_backend(name, **options)
+    backend.detect(frames[0], tier)  # build the model and warm up
+    timings = []
+    hands = []
+    for frame in frames:
+        started = time.perf_counter()
+        hands.append(backend.detect(frame, tier))
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+
+    parallel = None
+    if workers > 1:
+        # spawn: a MediaPipe graph does not survive a fork
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(
+            workers, _init_worker, (name, options, TIERS.index(tier))
+        ) as pool:
+            pool.map(_detect_count, frames[:workers])  # warm up every worker
+            started = time.perf_counter()
+            pool.map(_detect_count, frames * workers, chunksize=1)
+            parallel = len(frames) * workers / (time.perf_counter() - started)
+
+    return {
+        "mean_ms": sum(timings) / len(timings) * 1000,
+        "p50_ms": timings[len(timings) // 2] * 1000,
+        "p95_ms": timings[int(len(timings) * 0.95)] * 1000,
+        "fps": len(timings) / sum(timings),
+        "parallel_fps": parallel,
+        "hand_rate": sum(1 for h in hands if h) / len(hands),
+        "gestures": [_gesture(h) for h in hands],
+    }
+
+
+def main(argv=None):
+    """Parse arguments, measure every configuration and print the table."""
+    parser = argparse.ArgumentParser(description="Compare hand-landmark backends")
+    parser.add_argument("dataset", nargs="?", type=Path)
+    parser.add_argument("--backends", default="mediapipe,tflite")
+    parser.add_argument("--threads", default="1,2")
+    parser.add_argument("--tier", choices=[t.name for t in TIERS], default="full")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--frames", type=int, default=0)
+    parser.add_argument("--size", default="640x480")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    tier = next(t for t in TIERS if t.name == args.tier)
+    frames = load_frames(
+        args.dataset, args.frames, tuple(int(v) for v in args.size.split("x"))
+    )
+    if not frames:
+        parser.error(f"no images found in {args.dataset}")
+
+    results = {}
+    baseline = None
+    for label, name, options in configurations(args):
+        try:
+            result = measure(name, options, frames, tier, args.workers)
+        except ImportError as exc:
+            print(f"skipping {label}: {exc}", file=sys.stderr)
+            continue
+        gestures = result.pop("gestures")
+        baseline = baseline or gestures
+        result["agree"] = sum(a == b for a, b in zip(gestures, baseline)) / len(
+            gestures
+        )
+        results[label] = result
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return results
+    print(f"{len(frames)} frames, tier {tier.name}, {args.workers} workers")
+    print(
+        f"{'configuration':<34}{'mean ms':>9}{'p95 ms':>9}{'fps':>8}"
+        f"{'par fps':>9}{'hands':>7}{'agree':>7}"
+    )
+    for label, r in results.items():
+        parallel = f"{r['parallel_fps']:.1f}" if r["parallel_fps"] else "-"
+        print(
+            f"{label:<34}{r['mean_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['fps']:>8.1f}"
+            f"{parallel:>9}{r['hand_rate']:>7.0%}{r['agree']:>7.0%}"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Peak memory of one /analyze-image request at several upload sizes.
+
+Each measurement runs in a fresh process: the MediaPipe model is loaded with
+a warm-up request, the kernel's RSS high-water mark is reset, and then one
+request of the given size is sent through the Flask test client. Gesture
+writes go to a no-op store so only the request path is measured.
+
+    python benchmarks/bench_memory.py
+    python benchmarks/bench_memory.py --sizes 1280x720,4000x3000 --tier reduced
+
+"--legacy" also measures the old decode path (b64decode of a stripped copy,
+temp file, imread, cvtColor into a new array) for comparison. That row covers
+decoding only, so it understates what the old request path used.
+"""
+
+import argparse
+import base64
+import multiprocessing
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import cv2
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# The client's own modules, and the shared package at the repository root
+sys.path[:0] = [os.path.join(HERE, ".."), os.path.join(HERE, "..", "..")]
+
+# pylint: disable=wrong-import-position,import-error
+from shared.gesture_store import GestureStore
+
+
+class _NullStore(GestureStore):  # pylint: disable=abstract-method
+    """Accepts the writes client.py makes and discards them."""
+
+    name = "null"
+
+    def ensure_indexes(self):
+        pass
+
+    def add(self, document):
+        pass
+
+
+def _status_kb(field):
+    """Read a Vm* field (in kB) from /proc/self/status."""
+    with open("/proc/self/status", encoding="ascii") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def _reset_peak():
+    """Reset VmHWM to the current RSS (Linux only)."""
+    with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+        f.write("5")
+
+
+def _payload(width, height):
+    """A noisy JPEG data URL, as a browser canvas would send it."""
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    _, encoded = cv2.imencode(".jpg", pixels, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return "data:image/jpeg;base64," + base64.b64encode(encoded).decode()
+
+
+def _legacy_decode(image_data):
+    """The pre-image_io decode path, kept here only for comparison."""
+    image_data = image_data.split(",", 1)[1]
+    img_bytes = base64.b64decode(image_data)
+    with tempfile.NamedTemporaryFile(suffix=".jpg") as f:
+        f.write(img_bytes)
+        f.flush()
+        image = cv2.imread(f.name)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def _measure(width, height, tier_name, legacy, queue):
+    """Runs in a child process; puts one result dict on queue."""
+    # pylint: disable=import-outside-toplevel,import-error
+    import client
+    from quality import TIERS
+
+    client.store = _NullStore()
+    tier = next(t for t in TIERS if t.name == tier_name)
+    client.quality.acquire = lambda: tier
+    app = client.create_app()
+    app.config["MAX_CONTENT_LENGTH"] = None
+    http = app.test_client()
+
+    response = http.post("/analyze-image", json={"image": _payload(64, 64)})
+    if response.status_code != 200:
+        # Measuring now would only measure the error path
+        queue.put({"error": f"warm-up request failed: {response.get_json()}"})
+        return
+    body = _payload(width, height)
+    baseline = _status_kb("VmRSS")
+    _reset_peak()
+    tracemalloc.start()
+    if legacy:
+        _legacy_decode(body)
+        status = "-"
+    else:
+        response = http.post("/analyze-image", json={"image": body})
+        status = response.status_code
+        if status != 200:
+            print(f"{width}x{height}: {response.get_json()}", file=sys.stderr)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    queue.put(
+        {
+            "size": f"{width}x{height}",
+            "path": "legacy decode" if legacy else "request",
+            "status": status,
+            "payload_mb": len(body) / 2**20,
+            "peak_rss_mb": (_status_kb("VmHWM") - baseline) / 1024,
+            "traced_peak_mb": traced_peak / 2**20,
+        }
+    )
+
+
+def run(width, height, tier_name, legacy=False):
+    """Measure one configuration in a fresh process."""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(width, height, tier_name, legacy, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    if "error" in result:
+        raise SystemExit(result["error"])
+    return result
+
+
+def main(argv=None):
+    """Parse arguments and print one row per measurement."""
+    parser = argparse.ArgumentParser(description="Peak RSS per request")
+    parser.add_argument("--sizes", default="640x480,1280x720,1920x1080,4000x3000")
+    parser.add_argument("--tier", default="full", help="full, reduced or minimal")
+    parser.add_argument("--legacy", action="store_true")
+    args = parser.parse_args(argv)
+
+    print(
+        f"{'size':<11}{'path':<15}{'status':>7}{'payload MB':>12}"
+        f"{'peak RSS MB':>13}{'traced MB':>11}"
+    )
+    for spec in args.sizes.split(","):
+        width, height = (int(v) for v in spec.split("x"))
+        rows = [run(width, height, args.tier)]
+        if args.legacy:
+            rows.append(run(width, height, args.tier, legacy=True))
+        for row in rows:
+            print(
+                f"{row['size']:<11}{row['path']:<15}{row['status']:>7}"
+                f"{row['payload_mb']:>12.1f}{row['peak_rss_mb']:>13.1f}"
+                f"{row['traced_peak_mb']:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Measure the no-hand prefilter against a labeled set of frames.
+
+The dataset directory holds images in two subfolders, hand/ and no_hand/.
+With --label-with-mediapipe every image under the directory is labeled by
+whether MediaPipe finds a hand instead, which is the behaviour the prefilter
+must not change.
+
+    python benchmarks/prefilter_eval.py path/to/frames
+    python benchmarks/prefilter_eval.py path/to/frames --min-skin 0.05 --json
+    python benchmarks/prefilter_eval.py path/to/captures --label-with-mediapipe
+
+The false-reject rate is the share of frames with a hand that the prefilter
+would have answered no_hand/no_image for; keep it near zero before turning
+PREFILTER on. Frames are fed in file order as one camera session, as the
+camera page sends them, so a repeat of a hand-less frame counts as "static";
+--independent judges each frame alone and leaves "static" out.
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import cv2
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# The client's own modules, and the shared package at the repository root
+sys.path[:0] = [os.path.join(HERE, ".."), os.path.join(HERE, "..", "..")]
+
+# pylint: disable=wrong-import-position,import-error
+from prefilter import Prefilter, evaluate
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def folder_samples(root):
+    """(image, has_hand) from hand/ and no_hand/ subfolders."""
+    for label, has_hand in (("hand", True), ("no_hand", False)):
+        for path in sorted((root / label).rglob("*")):
+            if path.suffix.lower() in IMAGE_SUFFIXES:
+                image = cv2.imread(str(path))
+                if image is not None:
+                    yield image, has_hand
+
+
+def mediapipe_samples(root):
+    """(image, has_hand) for every image, labeled by the full hand model."""
+    import mediapipe as mp  # pylint: disable=import-outside-toplevel
+
+    hands = mp.solutions.hands.Hands(static_image_mode=True)
+    for path in sorted(root.rglob("*")):
+        if path.suffix.lower() in IMAGE_SUFFIXES:
+            image = cv2.imread(str(path))
+            if image is not None:
+                results = hands.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+                yield image, bool(results.multi_hand_landmarks)
+
+
+def main(argv=None):
+    """Parse arguments, run the evaluation and print the result."""
+    parser = argparse.ArgumentParser(description="Evaluate the no-hand prefilter")
+    parser.add_argument("dataset", type=Path)
+    parser.add_argument("--label-with-mediapipe", action="store_true")
+    parser.add_argument("--min-brightness", type=float)
+    parser.add_argument("--min-contrast", type=float)
+    parser.add_argument("--min-sharpness", type=float)
+    parser.add_argument("--min-skin", type=float)
+    parser.add_argument(
+        "--independent",
+        action="store_true",
+        help="judge frames one by one, without the per-session static check",
+    )
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    thresholds = {
+        name: value
+        for name, value in (
+            ("min_brightness", args.min_brightness),
+            ("min_contrast", args.min_contrast),
+            ("min_sharpness", args.min_sharpness),
+            ("min_skin", args.min_skin),
+        )
+        if value is not None
+    }
+    prefilter = Prefilter(enabled=True, **thresholds)
+    samples = (
+        mediapipe_samples(args.dataset)
+        if args.label_with_mediapipe
+        else folder_samples(args.dataset)
+    )
+    result = evaluate(prefilter, samples, None if args.independent else "evaluate")
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return result
+    print(f"frames:            {result['frames']}")
+    if args.independent:
+        print("(frames judged independently; the static check is excluded)")
+    print(f"false-reject rate: {result['false_reject_rate']:.2%}")
+    print(f"no-hand skip rate: {result['skip_rate']:.2%}")
+    print(
+        f"check time:        {result['mean_us']:.0f} us mean, "
+        f"{result['p99_us']:.0f} us p99"
+    )
+    for reason, count in sorted(result["reasons"].items()):
+        print(f"  {reason:<20}{count}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
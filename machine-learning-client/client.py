@@ -1,13 +1,24 @@
 """ML-client API server for gesture recognition."""
 
 import os
+import re
+import sqlite3
 import time
-import base64
+import binascii
+import threading
 from dotenv import load_dotenv
 from flask import Flask, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
 from pymongo import MongoClient
-from gesture_api import analyze_image
-from mapping import map_gesture
+from pymongo.errors import PyMongoError
+from shared import profiling, tracing
+from shared.gesture_registry import lookup
+from shared.gesture_store import open_store
+from shared.profiling import stage
+from gesture_api import analyze_clip, analyze_image
+from image_io import ImageTooLarge
+from motion import MAX_FRAMES
+from quality import TIERS, QualityController
 
 load_dotenv()
 
@@ -15,86 +26,188 @@ MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 DB_NAME = os.getenv("DB_NAME", "testdb")
 COLLECTION_NAME = "gestures"
 
-# Initialize MongoDB client with timeout
-client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+# Initialize MongoDB client with timeout. connect=False defers the connection
+# to the first query so gunicorn can fork workers after importing this module.
+client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000, connect=False)
 db = client[DB_NAME]
 collection = db[COLLECTION_NAME]
+# GESTURE_STORE=sqlite stores gestures in a local file instead
+store = open_store(lambda: collection)
+
+# Whiteboard rooms; keep in step with room_cache.py in the web app
+DEFAULT_ROOM = "main"
+ROOM_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# Steps inference down to cheaper tiers when requests pile up
+quality = QualityController()
 
 load_dotenv()
 
 
-def create_app():
+def ensure_indexes():
+    """Create the indexes the read and write paths rely on (idempotent)."""
+    try:
+        store.ensure_indexes()
+    except (PyMongoError, sqlite3.Error) as exc:
+        print(f"{store.name} index creation failed: {exc}")
+
+
+def _session_id(data):
+    """
+    Frames from one camera session share a prefilter history; anything that
+    isn't a short string is ignored.
+    """
+    session_id = data.get("session_id")
+    if isinstance(session_id, str) and 0 < len(session_id) <= 128:
+        return session_id
+    return None
+
+
+def _decode_base64(image_data):
+    """Bytes of a base64 image, with or without a data:image/... header."""
+    if not isinstance(image_data, str):
+        raise ValueError("image must be a base64 string")
+    # If begins with data:image/... strip header
+    if image_data.startswith("data:image"):
+        image_data = image_data[image_data.find(",") + 1 :]
+    # binascii reads an ASCII str in place, where base64.b64decode would
+    # first encode a copy of it
+    return binascii.a2b_base64(image_data)
+
+
+def _room(data):
+    """The whiteboard room a frame belongs to; invalid ids fall back to main."""
+    room = data.get("room")
+    if isinstance(room, str) and ROOM_PATTERN.fullmatch(room):
+        return room
+    return DEFAULT_ROOM
+
+
+def create_app():  # pylint: disable=too-many-statements
     """Factory for creating Flask app (needed for testing)."""
     app = Flask(__name__)
+    app.config["MAX_CONTENT_LENGTH"] = int(
+        os.getenv("MAX_CONTENT_LENGTH", str(10 * 1024 * 1024))
+    )
+    profiling.init_app(app)
+    tracing.init_app(app, "machine-learning-client")
+    # In the background so a slow or missing MongoDB never delays startup
+    threading.Thread(target=ensure_indexes, daemon=True).start()
+
+    @app.route("/health")
+    def health():
+        """Liveness probe used by the web app's replica pool."""
+        return (
+            jsonify(
+                {
+                    "status": "ok",
+                    "tier": TIERS[quality.level].name,
+                    "inflight": quality.inflight,
+                }
+            ),
+            200,
+        )
 
     @app.route("/analyze-image", methods=["POST"])
-    def analyze_image_api():
+    def analyze_image_api():  # pylint: disable=too-many-return-statements
         """Receive base64 image, run gesture detection, store to MongoDB, return result."""
+        # Bound up front so the error handler below can log whatever exists
+        data, images, result = None, [], None
         try:
-            data = request.get_json()
-            if not data or "image" not in data:
+            # cache=False: don't keep the raw body around next to the parsed one
+            with stage("parse_json"):
+                data = request.get_json(cache=False)
+            if not data or ("image" not in data and "frames" not in data):
                 return jsonify({"error": "No image provided"}), 400
 
-            image_data = data["image"]
-
-            # If begins with data:image/... strip header
-            if image_data.startswith("data:image"):
-                image_data = image_data.split(",", 1)[1]
-
-            # Decode base64 → bytes
+            # "frames" is a clip: a burst of camera frames, oldest first, that
+            # is also checked for swipes, waves and circles. Popped so the
+            # only references to the (large) strings are local, and each is
+            # freed as soon as it has been decoded.
+            clip = "image" not in data
+            encoded = data.pop("frames") if clip else [data.pop("image")]
+            if not isinstance(encoded, list) or not 0 < len(encoded) <= MAX_FRAMES:
+                return (
+                    jsonify({"error": f"Send 1 to {MAX_FRAMES} frames"}),
+                    400,
+                )
             try:
-                img_bytes = base64.b64decode(image_data)
-            except Exception as exc:
+                with stage("base64_decode"):
+                    while encoded:
+                        images.append(_decode_base64(encoded.pop(0)))
+            except (binascii.Error, ValueError) as exc:
                 print(exc)
                 return jsonify({"error": "Invalid base64"}), 500
 
-            # Save to temp file
-            temp_path = "ml_temp.jpg"
-            with open(temp_path, "wb") as f:
-                f.write(img_bytes)
-
-            # Call gesture recognizer
+            # Call gesture recognizer at the tier current load allows. The
+            # image is decoded straight from memory, no temp file.
+            tier = quality.acquire()
+            started = time.monotonic()
             try:
-                result = analyze_image(temp_path)
+                if clip:
+                    result = analyze_clip(images, tier, session=_session_id(data))
+                else:
+                    result = analyze_image(images[0], tier, session=_session_id(data))
+            except ImageTooLarge as exc:
+                return jsonify({"error": f"Image too large: {exc}"}), 413
             except Exception as exc:
                 print(exc)
-                return jsonify({"error": f"gesture_api failure: {exc}"}), 500
+                return (
+                    jsonify(
+                        {"error": f"gesture_api failure: {exc}", "tier": tier.name}
+                    ),
+                    500,
+                )
+            finally:
+                # Per frame, so clips don't read as slow requests and push
+                # single images down a tier
+                quality.release((time.monotonic() - started) / len(images))
 
             gesture = result.get("gesture", "unknown")
             score = result.get("score", 1.0)
+            tracing.annotate(tier=tier.name, gesture=gesture)
 
-            # Map gesture to mood/emoji
-            mood, emoji = map_gesture(gesture)
+            # Mood and emoji come from the shared registry; only its code
+            # is stored, readers resolve the labels themselves
+            entry = lookup(gesture)
 
             # Insert into MongoDB
-            collection.insert_one(
-                {
-                    "gesture": gesture,
-                    "score": score,
-                    "mood": mood,
-                    "emoji": emoji,
-                    "timestamp": time.time(),
-                }
-            )
+            document = {
+                "room": _room(data),
+                "code": entry.code,
+                "score": score,
+                "timestamp": time.time(),
+            }
+            request_id = request.headers.get("X-Request-ID")
+            if request_id:
+                # The web app mints one per /analyze call and sends it with
+                # every hedged copy; whichever replica finishes first stores it.
+                document["request_id"] = request_id
+            with stage(f"{store.name}_insert"):
+                store.add(document)
 
             # Return result
             return (
                 jsonify(
                     {
                         "gesture": gesture,
-                        "emoji": emoji,
+                        "emoji": entry.emoji,
                         "label": gesture,
                         "confidence": score,
+                        "tier": tier.name,
                         "message": "Processed and stored successfully",
                     }
                 ),
                 200,
             )
 
+        except RequestEntityTooLarge:
+            return jsonify({"error": "Image too large"}), 413
+
         except Exception as exc:
             # Debug prints
             print("Received request:", data)
-            print("Decoded image bytes:", len(img_bytes))
+            print("Decoded image bytes:", sum(map(len, images)))
             print("Gesture result:", result)
             print(exc)
             return jsonify({"error": str(exc)}), 500
@@ -105,4 +218,5 @@ def create_app():
 if __name__ == "__main__":
     flask_app = create_app()
     port = int(os.environ.get("PORT", 80))
-    flask_app.run(host="0.0.0.0", port=port, debug=True)
+    # Development server only; production runs gunicorn (see gunicorn.conf.py)
+    flask_app.run(host="0.0.0.0", port=port, debug=os.getenv("FLASK_DEBUG") == "1")
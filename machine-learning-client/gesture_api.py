@@ -5,9 +5,20 @@ Identify gestures module
 import math
 import pprint
 import cv2
-import mediapipe as mp
+from shared.profiling import stage
+from image_io import decode_image
+from model import load_backend
+from motion import MAX_FRAMES, classify_motion, frame_buffer, write_landmarks
+from prefilter import Prefilter
+from quality import TIERS
 
-mp_hands = mp.solutions.hands.Hands(static_image_mode=True)
+# Hand landmark model (HAND_BACKEND: mediapipe or tflite), chosen at startup.
+# The full tier's model is built now so the first request does not wait.
+backend = load_backend()
+backend.model_for(TIERS[0])
+
+# Skips the hand model for frames that obviously have no hand (PREFILTER=1)
+prefilter = Prefilter()
 
 
 # --------------------------
@@ -45,25 +56,115 @@ def distance(a, b):
     return math.sqrt((a.x - b.x) ** 2 + (a.y - b.y) ** 2 + (a.z - b.z) ** 2)
 
 
+def _downscale(image, max_side):
+    """Shrink image so its longest side is at most max_side."""
+    height, width = image.shape[:2]
+    longest = max(height, width)
+    if not max_side or longest <= max_side:
+        return image
+    scale = max_side / longest
+    return cv2.resize(
+        image,
+        (max(1, int(width * scale)), max(1, int(height * scale))),
+        interpolation=cv2.INTER_AREA,
+    )
+
+
 # --------------------------
 # Gesture Recognition
 # --------------------------
 
 
-def analyze_image(image_path):
-    image = cv2.imread(image_path)
-    if image is None:
-        return {"gesture": "no_image"}
-
-    img_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    results = mp_hands.process(img_rgb)
-
-    if not results.multi_hand_landmarks:
-        return {"gesture": "no_hand"}
-
-    lm = results.multi_hand_landmarks[0].landmark
+def _find_hand(image, tier, session):
+    """
+    Decode an image and run the hand model on it. Returns the first hand's
+    21 landmarks, or None and the gesture to report when there is no hand.
+    """
+    with stage("cv2_decode"):
+        if isinstance(image, str):
+            image = cv2.imread(image)
+        else:
+            image = decode_image(image, tier.max_side)
+        if image is None:
+            return None, "no_image"
+        if tier.max_side:
+            image = _downscale(image, tier.max_side)
+
+    with stage("prefilter"):
+        rejected = prefilter.check(image, session)
+    if rejected:
+        return None, rejected
+
+    with stage("cv2_color"):
+        # Convert in place; the BGR pixels are not needed again
+        img_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+
+    with stage(f"{backend.name}.detect"):
+        hands = backend.detect(img_rgb, tier)
+
+    prefilter.remember(session, bool(hands))
+    if not hands:
+        return None, "no_hand"
+    return hands[0], None
+
+
+def analyze_image(image, tier=None, session=None):
+    """
+    Classify the gesture in an image, given as a file path or as encoded
+    bytes. tier (see quality.TIERS) trades accuracy for speed; None runs at
+    full quality. session lets the prefilter skip repeats of a hand-less
+    frame from the same camera.
+    Raises image_io.ImageTooLarge for oversized images.
+    """
+    tier = tier or TIERS[0]
+    lm, gesture = _find_hand(image, tier, session)
+    if lm is None:
+        return {"gesture": gesture}
     # debug_landmarks(lm)
 
+    with stage("rules"):
+        return classify_landmarks(lm)
+
+
+def analyze_clip(images, tier=None, session=None):
+    """
+    Classify a clip: encoded frames, oldest first, captured a fraction of a
+    second apart. A swipe, wave or circle traced by the hand across the
+    frames takes precedence; otherwise the pose in the last frame with a
+    hand is reported.
+    Raises image_io.ImageTooLarge for oversized images, and ValueError for
+    more than motion.MAX_FRAMES frames.
+    """
+    if len(images) > MAX_FRAMES:
+        raise ValueError(f"a clip has at most {MAX_FRAMES} frames")
+    tier = tier or TIERS[0]
+    # Landmarks go straight into this thread's reused buffer
+    points = frame_buffer()
+    found = 0
+    last = None
+    gesture = "no_image"
+    for image in images:
+        lm, missing = _find_hand(image, tier, session)
+        if lm is None:
+            gesture = missing
+        else:
+            write_landmarks(points[found], lm)
+            found += 1
+            last = lm
+    if last is None:
+        return {"gesture": gesture}
+
+    with stage("motion"):
+        motion = classify_motion(points[:found])
+    if motion:
+        return {"gesture": motion}
+
+    with stage("rules"):
+        return classify_landmarks(last)
+
+
+def classify_landmarks(lm):
+    """Apply the gesture rules to a list of 21 hand landmarks."""
     # Landmarks
     thumb_tip, thumb_mcp = lm[4], lm[2]
     index_tip, index_pip = lm[8], lm[6]
@@ -0,0 +1,31 @@
+"""Gunicorn settings for the ML client; every value can be overridden via env."""
+
+# pylint: disable=invalid-name
+
+import os
+
+# Import the heavy native modules once in the master so every worker shares
+# their pages copy-on-write. The Hands graphs themselves are built inside each
+# worker: a MediaPipe graph created before fork crashes the forked children.
+import cv2  # pylint: disable=unused-import
+import mediapipe  # pylint: disable=unused-import
+
+bind = f"0.0.0.0:{os.getenv('PORT', '80')}"
+
+# Inference is CPU bound and each Hands graph runs one frame at a time, so
+# keep threads low; extra threads only queue up behind the graph lock.
+worker_class = "gthread"
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "2"))
+
+# Matches the web app's 30 s timeout for /analyze-image
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+# On SIGTERM, stop accepting and give in-flight requests this long to drain
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Recycle workers periodically to cap memory growth
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "500"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "50"))
+
+accesslog = "-"
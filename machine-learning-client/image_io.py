@@ -0,0 +1,88 @@
+"""Bounded-memory image decoding for uploaded frames."""
+
+import os
+import struct
+import cv2
+import numpy as np
+
+# Largest decoded image accepted (width * height). 3 bytes per pixel, so the
+# default caps a single BGR frame at ~50 MB before any copies.
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(4096 * 4096)))
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# JPEG start-of-frame markers (everything in C0-CF except DHT, JPG and DAC)
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7}
+_JPEG_SOF |= {0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+class ImageTooLarge(ValueError):
+    """The image has more pixels than MAX_IMAGE_PIXELS."""
+
+
+def image_size(buf):
+    """
+    Read (width, height) from a PNG or JPEG header without decoding it.
+    Returns None for other formats or truncated headers.
+    """
+    view = memoryview(buf)
+    if view[:8] == PNG_SIGNATURE and len(view) >= 24:
+        width, height = struct.unpack(">II", view[16:24])
+        return width, height
+    if view[:2] != b"\xff\xd8":
+        return None
+    pos = 2
+    while pos + 4 <= len(view):
+        if view[pos] != 0xFF:
+            return None
+        marker = view[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:  # no length field
+            pos += 2
+            continue
+        (length,) = struct.unpack(">H", view[pos + 2 : pos + 4])
+        if marker in _JPEG_SOF:
+            if pos + 9 > len(view):
+                return None
+            height, width = struct.unpack(">HH", view[pos + 5 : pos + 9])
+            return width, height
+        pos += 2 + length
+    return None
+
+
+def _decode_flags(size, max_side):
+    """Let libjpeg scale down while decoding when the tier will shrink anyway."""
+    if size and max_side:
+        longest = max(size)
+        for factor, flag in _REDUCED_FLAGS:
+            if longest // factor >= max_side:
+                return flag
+    return cv2.IMREAD_COLOR
+
+
+def decode_image(buf, max_side=None):
+    """
+    Decode encoded image bytes straight from memory into a BGR array.
+    Oversized images are rejected from their header before any pixel buffer
+    is allocated; formats without a parsable header are checked after.
+    """
+    if not buf:
+        return None
+    size = image_size(buf)
+    if size and size[0] * size[1] > MAX_IMAGE_PIXELS:
+        raise ImageTooLarge(f"{size[0]}x{size[1]} exceeds {MAX_IMAGE_PIXELS} pixels")
+    # frombuffer wraps the bytes without copying them
+    image = cv2.imdecode(
+        np.frombuffer(buf, dtype=np.uint8), _decode_flags(size, max_side)
+    )
+    if image is not None and size is None:
+        height, width = image.shape[:2]
+        if width * height > MAX_IMAGE_PIXELS:
+            raise ImageTooLarge(f"{width}x{height} exceeds {MAX_IMAGE_PIXELS} pixels")
+    return image
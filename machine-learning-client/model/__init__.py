@@ -0,0 +1,24 @@
+"""Hand-landmark inference backends, picked at startup with HAND_BACKEND."""
+
+import importlib
+import os
+
+from model.base import HandBackend, Landmark
+
+# name -> (module, class); modules are imported on demand so a backend's
+# dependencies only need to be installed when it is used
+BACKENDS = {
+    "mediapipe": ("model.mediapipe_backend", "MediaPipeBackend"),
+    "tflite": ("model.tflite_backend", "TFLiteBackend"),
+}
+
+__all__ = ["BACKENDS", "HandBackend", "Landmark", "load_backend"]
+
+
+def load_backend(name=None, **options):
+    """Create the backend called name (default HAND_BACKEND, else mediapipe)."""
+    name = name or os.getenv("HAND_BACKEND", "mediapipe")
+    if name not in BACKENDS:
+        raise ValueError(f"unknown HAND_BACKEND {name!r}; pick from {list(BACKENDS)}")
+    module_name, class_name = BACKENDS[name]
+    return getattr(importlib.import_module(module_name), class_name)(**options)
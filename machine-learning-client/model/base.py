@@ -0,0 +1,50 @@
+"""Interface shared by the hand-landmark inference backends."""
+
+import threading
+from collections import namedtuple
+
+# Coordinates are normalised to the image like MediaPipe's: x and y in
+# [0, 1] from the top left, z relative depth on roughly the scale of x.
+Landmark = namedtuple("Landmark", ["x", "y", "z"])
+
+
+class HandBackend:
+    """
+    Finds hand landmarks in RGB images. A backend keeps one model per
+    quality tier (see quality.TIERS), built on first use, and runs each
+    model one frame at a time since none of them are safe to share between
+    threads.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self._models = {}
+        self._locks = {}
+        self._init_lock = threading.Lock()
+
+    def _build(self, tier):
+        """Create the model for a tier."""
+        raise NotImplementedError
+
+    def _run(self, model, rgb, tier):
+        """Run one RGB frame through a model; see detect for the result."""
+        raise NotImplementedError
+
+    def model_for(self, tier):
+        """Return the (lazily built) model for a tier and its lock."""
+        with self._init_lock:
+            if tier.name not in self._models:
+                self._models[tier.name] = self._build(tier)
+                self._locks[tier.name] = threading.Lock()
+            return self._models[tier.name], self._locks[tier.name]
+
+    def detect(self, rgb, tier):
+        """
+        Return the hands found in an RGB uint8 image, most confident first,
+        each as a list of 21 landmarks with x, y and z attributes. An empty
+        list means no hand.
+        """
+        model, lock = self.model_for(tier)
+        with lock:
+            return self._run(model, rgb, tier)
@@ -0,0 +1,24 @@
+"""Hand landmarks from the MediaPipe Hands solution (the default backend)."""
+
+import mediapipe as mp
+
+from model.base import HandBackend
+
+
+class MediaPipeBackend(HandBackend):
+    """One mp.solutions.hands.Hands graph per quality tier."""
+
+    name = "mediapipe"
+
+    def _build(self, tier):
+        return mp.solutions.hands.Hands(
+            static_image_mode=True,
+            model_complexity=tier.model_complexity,
+            max_num_hands=tier.max_num_hands,
+        )
+
+    def _run(self, model, rgb, tier):
+        results = model.process(rgb)
+        if not results.multi_hand_landmarks:
+            return []
+        return [hand.landmark for hand in results.multi_hand_landmarks]
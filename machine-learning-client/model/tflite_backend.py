@@ -0,0 +1,320 @@
+"""
+Hand landmarks from MediaPipe's palm detection and hand landmark models,
+run directly on the TensorFlow Lite interpreter.
+
+This follows the MediaPipe Hands graph for still images: letterbox the
+frame to 192x192, decode the palm detector's SSD output and merge
+overlapping boxes (weighted non-maximum suppression), turn each palm into a
+rotated square around the whole hand, crop it to 224x224 and run the
+landmark model on the crop, then project the 21 landmarks back onto the
+frame. Skipping the graph runtime leaves only the two model invocations and
+a few OpenCV calls, and exposes the interpreter's thread count and XNNPACK
+switch.
+"""
+
+import importlib.util
+import math
+import os
+from collections import namedtuple
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from model.base import HandBackend, Landmark
+
+try:
+    from tflite_runtime.interpreter import Interpreter, OpResolverType
+except ImportError:  # the full TensorFlow package ships the same interpreter
+    try:
+        from tensorflow.lite import Interpreter
+        from tensorflow.lite.experimental import OpResolverType
+    except ImportError:
+        Interpreter = OpResolverType = None
+
+PALM_SIZE = 192
+LANDMARK_SIZE = 224
+# (palm detection, hand landmark) model files per MediaPipe model_complexity
+MODEL_FILES = {
+    0: ("palm_detection_lite.tflite", "hand_landmark_lite.tflite"),
+    1: ("palm_detection_full.tflite", "hand_landmark_full.tflite"),
+}
+
+# Same thresholds and ROI geometry as the MediaPipe Hands graph
+MIN_DETECTION_SCORE = 0.5
+MIN_HAND_PRESENCE = 0.5
+NMS_IOU = 0.3
+ROI_SCALE = 2.6
+ROI_SHIFT_Y = -0.5
+# Palm keypoints that define the hand's axis: wrist and middle finger base
+WRIST, MIDDLE_MCP = 0, 2
+
+# Rotated square region of the frame, in pixels; rotation in radians
+Roi = namedtuple("Roi", ["cx", "cy", "size", "rotation"])
+Palm = namedtuple("Palm", ["box", "keypoints", "score"])
+
+
+def model_path(filename, model_dir=None):
+    """
+    Find a bundled model file: in HAND_MODEL_DIR if set, next to this module,
+    or in the installed mediapipe package (which ships both models).
+    """
+    candidates = []
+    model_dir = model_dir or os.getenv("HAND_MODEL_DIR")
+    if model_dir:
+        candidates.append(Path(model_dir) / filename)
+    candidates.append(Path(__file__).resolve().parent / filename)
+    spec = importlib.util.find_spec("mediapipe")
+    if spec is not None:
+        subdir = "palm_detection" if filename.startswith("palm") else "hand_landmark"
+        for location in spec.submodule_search_locations or []:
+            candidates.append(Path(location) / "modules" / subdir / filename)
+    for candidate in candidates:
+        if candidate.is_file():
+            return str(candidate)
+    raise FileNotFoundError(
+        f"{filename} not found; set HAND_MODEL_DIR to a folder that has it"
+    )
+
+
+def palm_anchors(size=PALM_SIZE, strides=(8, 16, 16, 16)):
+    """
+    SSD anchor centres of the palm detector, normalised to [0, 1]. Layers
+    that share a stride share one grid; each contributes two anchors per
+    cell, and all anchors have a fixed size of 1.
+    """
+    centres = []
+    layer = 0
+    while layer < len(strides):
+        stride = strides[layer]
+        per_cell = 0
+        while layer < len(strides) and strides[layer] == stride:
+            per_cell += 2
+            layer += 1
+        cells = math.ceil(size / stride)
+        ys, xs = np.mgrid[0:cells, 0:cells]
+        grid = np.stack([(xs + 0.5) / cells, (ys + 0.5) / cells], axis=-1)
+        centres.append(np.repeat(grid.reshape(-1, 2), per_cell, axis=0))
+    return np.concatenate(centres).astype(np.float32)
+
+
+def decode_palms(raw_boxes, raw_scores, anchors, min_score=MIN_DETECTION_SCORE):
+    """
+    Turn the detector's per-anchor output into palms with a score of at least
+    min_score: boxes as (xmin, ymin, xmax, ymax) and 7 keypoints, both
+    normalised to the 192x192 input.
+    """
+    scores = 1 / (1 + np.exp(-np.clip(raw_scores.reshape(-1), -100, 100)))
+    keep = scores >= min_score
+    raw, anchors, scores = raw_boxes[keep] / PALM_SIZE, anchors[keep], scores[keep]
+    centres = raw[:, :2] + anchors
+    half = raw[:, 2:4] / 2
+    boxes = np.concatenate([centres - half, centres + half], axis=1)
+    keypoints = raw[:, 4:18].reshape(-1, 7, 2) + anchors[:, None, :]
+    return boxes, keypoints, scores
+
+
+def _iou(box, boxes):
+    top_left = np.maximum(box[:2], boxes[:, :2])
+    bottom_right = np.minimum(box[2:], boxes[:, 2:])
+    overlap = np.prod(np.clip(bottom_right - top_left, 0, None), axis=1)
+    area = np.prod(box[2:] - box[:2])
+    areas = np.prod(boxes[:, 2:] - boxes[:, :2], axis=1)
+    return overlap / np.maximum(area + areas - overlap, 1e-9)
+
+
+def weighted_nms(boxes, keypoints, scores, threshold=NMS_IOU, limit=None):
+    """
+    Merge overlapping detections, best first: every box overlapping the best
+    remaining one by more than threshold (IoU) is averaged into it, weighted
+    by score. Returns at most limit palms.
+    """
+    palms = []
+    remaining = np.argsort(-scores)
+    while remaining.size and (limit is None or len(palms) < limit):
+        best = remaining[0]
+        overlapping = _iou(boxes[best], boxes[remaining]) > threshold
+        group = remaining[overlapping]
+        weights = scores[group] / scores[group].sum()
+        palms.append(
+            Palm(
+                (boxes[group] * weights[:, None]).sum(axis=0),
+                (keypoints[group] * weights[:, None, None]).sum(axis=0),
+                float(scores[best]),
+            )
+        )
+        remaining = remaining[~overlapping]
+    return palms
+
+
+def hand_roi(box, keypoints):
+    """
+    Rotated square around the whole hand for a palm given in pixels: turned
+    so the wrist-to-middle-finger axis points up, moved half a palm towards
+    the fingers and enlarged 2.6 times.
+    """
+    (x0, y0), (x1, y1) = keypoints[WRIST], keypoints[MIDDLE_MCP]
+    rotation = math.pi / 2 - math.atan2(-(y1 - y0), x1 - x0)
+    rotation = (rotation + math.pi) % (2 * math.pi) - math.pi
+    width, height = box[2] - box[0], box[3] - box[1]
+    cx = (box[0] + box[2]) / 2 - height * ROI_SHIFT_Y * math.sin(rotation)
+    cy = (box[1] + box[3]) / 2 + height * ROI_SHIFT_Y * math.cos(rotation)
+    return Roi(cx, cy, max(width, height) * ROI_SCALE, rotation)
+
+
+def roi_transform(roi, size=LANDMARK_SIZE):
+    """2x3 affine map from size x size crop pixels to frame pixels."""
+    scale = roi.size / size
+    cos, sin = math.cos(roi.rotation) * scale, math.sin(roi.rotation) * scale
+    half = size / 2
+    return np.array(
+        [
+            [cos, -sin, roi.cx - (cos - sin) * half],
+            [sin, cos, roi.cy - (sin + cos) * half],
+        ],
+        dtype=np.float32,
+    )
+
+
+def letterbox(rgb, size=PALM_SIZE):
+    """
+    Fit rgb into a size x size float tensor in [0, 1], padded evenly with
+    zeros. Returns it with the scale and the left/top padding in pixels.
+    """
+    height, width = rgb.shape[:2]
+    scale = size / max(height, width)
+    new_w, new_h = max(1, round(width * scale)), max(1, round(height * scale))
+    left, top = (size - new_w) // 2, (size - new_h) // 2
+    tensor = np.zeros((1, size, size, 3), dtype=np.float32)
+    resized = cv2.resize(rgb, (new_w, new_h), interpolation=cv2.INTER_AREA)
+    np.multiply(resized, 1 / 255, out=tensor[0, top : top + new_h, left : left + new_w])
+    return tensor, scale, left, top
+
+
+# Interpreters for one tier plus the tensor indices they are fed through
+_Models = namedtuple(
+    "_Models",
+    [
+        "palm",
+        "palm_in",
+        "boxes_out",
+        "scores_out",
+        "hand",
+        "hand_in",
+        "landmarks_out",
+        "presence_out",
+    ],
+)
+
+
+def _output_index(interpreter, name):
+    for detail in interpreter.get_output_details():
+        if detail["name"] == name:
+            return detail["index"]
+    raise ValueError(f"model has no output {name!r}")
+
+
+class TFLiteBackend(HandBackend):
+    """
+    MediaPipe's hand models on the TFLite interpreter. TFLITE_THREADS sets
+    the interpreter's intra-op threads (default 1, as gunicorn already runs
+    a worker per core); TFLITE_XNNPACK=0 turns off the XNNPACK CPU delegate.
+    """
+
+    name = "tflite"
+
+    def __init__(self, threads=None, xnnpack=None, model_dir=None):
+        if Interpreter is None:
+            raise ImportError("HAND_BACKEND=tflite needs tflite-runtime installed")
+        super().__init__()
+        self.threads = threads or int(os.getenv("TFLITE_THREADS", "1"))
+        self.xnnpack = (
+            xnnpack if xnnpack is not None else os.getenv("TFLITE_XNNPACK", "1") == "1"
+        )
+        self.model_dir = model_dir
+        self.anchors = palm_anchors()
+
+    def _interpreter(self, filename):
+        interpreter = Interpreter(
+            model_path=model_path(filename, self.model_dir),
+            num_threads=self.threads,
+            experimental_op_resolver_type=(
+                OpResolverType.AUTO
+                if self.xnnpack
+                else OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+            ),
+        )
+        interpreter.allocate_tensors()
+        return interpreter
+
+    def _build(self, tier):
+        palm_file, hand_file = MODEL_FILES[min(tier.model_complexity, 1)]
+        palm = self._interpreter(palm_file)
+        hand = self._interpreter(hand_file)
+        outputs = sorted(
+            palm.get_output_details(), key=lambda detail: detail["shape"][-1]
+        )
+        return _Models(
+            palm,
+            palm.get_input_details()[0]["index"],
+            outputs[1]["index"],  # 18 values per anchor: box and keypoints
+            outputs[0]["index"],  # 1 score per anchor
+            hand,
+            hand.get_input_details()[0]["index"],
+            _output_index(hand, "Identity"),
+            _output_index(hand, "Identity_1"),
+        )
+
+    def find_palms(self, models, rgb, limit):
+        """Palms in rgb with boxes and keypoints in frame pixels, best first."""
+        tensor, scale, left, top = letterbox(rgb)
+        models.palm.set_tensor(models.palm_in, tensor)
+        models.palm.invoke()
+        boxes, keypoints, scores = decode_palms(
+            models.palm.get_tensor(models.boxes_out)[0],
+            models.palm.get_tensor(models.scores_out)[0],
+            self.anchors,
+        )
+        offset = np.array([left, top], dtype=np.float32)
+        return [
+            Palm(
+                (palm.box.reshape(2, 2) * PALM_SIZE - offset).reshape(4) / scale,
+                (palm.keypoints * PALM_SIZE - offset) / scale,
+                palm.score,
+            )
+            for palm in weighted_nms(boxes, keypoints, scores, limit=limit)
+        ]
+
+    def _landmarks(self, models, rgb, roi):
+        """21 landmarks for the hand in roi, or None if the model sees none."""
+        to_frame = roi_transform(roi)
+        crop = cv2.warpAffine(
+            rgb,
+            to_frame,
+            (LANDMARK_SIZE, LANDMARK_SIZE),
+            flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+            borderMode=cv2.BORDER_CONSTANT,
+        )
+        models.hand.set_tensor(
+            models.hand_in, np.multiply(crop[None], 1 / 255, dtype=np.float32)
+        )
+        models.hand.invoke()
+        if models.hand.get_tensor(models.presence_out).item() < MIN_HAND_PRESENCE:
+            return None
+
+        points = models.hand.get_tensor(models.landmarks_out).reshape(21, 3)
+        height, width = rgb.shape[:2]
+        xy = points[:, :2] @ to_frame[:, :2].T + to_frame[:, 2]
+        z = points[:, 2] * roi.size / LANDMARK_SIZE
+        return [
+            Landmark(float(x / width), float(y / height), float(depth / width))
+            for (x, y), depth in zip(xy, z)
+        ]
+
+    def _run(self, model, rgb, tier):
+        hands = []
+        for palm in self.find_palms(model, rgb, tier.max_num_hands):
+            landmarks = self._landmarks(model, rgb, hand_roi(palm.box, palm.keypoints))
+            if landmarks is not None:
+                hands.append(landmarks)
+        return hands
@@ -0,0 +1,102 @@
+"""
+Motion gestures (swipes, waves, circles) from the hand's path through a clip.
+
+A clip is a short burst of frames the camera page sends in one request, so
+all of a movement's frames reach the same worker of the same replica.
+"""
+
+import math
+import os
+import threading
+import numpy as np
+
+# Wrist and the four finger MCP joints; their mean is a stable palm centre
+PALM = [0, 5, 9, 13, 17]
+
+MIN_FRAMES = 5
+MIN_PATH = 0.15  # total palm travel, in normalized image widths
+STILL_STEP = 0.005  # steps shorter than this are treated as jitter
+
+# Most frames accepted in one clip (the camera page sends about 12)
+MAX_FRAMES = int(os.getenv("MOTION_MAX_FRAMES", "24"))
+
+MOTION_GESTURES = ("swipe_left", "swipe_right", "wave", "circle")
+
+
+_local = threading.local()
+
+
+def frame_buffer():
+    """
+    This thread's (MAX_FRAMES, 21, 3) landmark buffer. A request thread
+    handles one clip at a time, so it is allocated once and reused by every
+    clip rather than once per request.
+    """
+    points = getattr(_local, "points", None)
+    if points is None:
+        points = _local.points = np.empty((MAX_FRAMES, 21, 3), dtype=np.float32)
+    return points
+
+
+def write_landmarks(frame, landmarks):
+    """Copy one hand's 21 landmarks (objects or an array) into a buffer row."""
+    if isinstance(landmarks, np.ndarray):
+        frame[:] = landmarks
+    else:
+        for point, landmark in zip(frame, landmarks):
+            point[:] = (landmark.x, landmark.y, landmark.z)
+
+
+def trajectory_features(points):
+    """Summarize the palm centre's path through an (n, 21, 3) frame array."""
+    palm = points[:, PALM, :2].mean(axis=1)
+    steps = np.diff(palm, axis=0)
+    lengths = np.hypot(steps[:, 0], steps[:, 1])
+    moving = steps[lengths > STILL_STEP]
+
+    x_signs = np.sign(moving[:, 0])
+    angles = np.arctan2(moving[:, 1], moving[:, 0])
+    # Wrap each change of heading into [-pi, pi) before summing
+    turns = (np.diff(angles) + math.pi) % (2 * math.pi) - math.pi
+    total_turn = float(turns.sum())
+    return {
+        "net": palm[-1] - palm[0],
+        "path": float(lengths.sum()),
+        "span": palm.max(axis=0) - palm.min(axis=0),
+        "reversals": int(np.count_nonzero(x_signs[1:] != x_signs[:-1])),
+        "turn": total_turn,
+        "turn_consistency": (
+            float(np.mean(np.sign(turns) == math.copysign(1, total_turn)))
+            if len(turns)
+            else 0.0
+        ),
+    }
+
+
+def classify_motion(points):
+    """
+    Return a motion gesture for the frames, or None. Directions are in image
+    coordinates: swipe_right means the hand moved towards the image's right.
+    """
+    if len(points) < MIN_FRAMES:
+        return None
+    features = trajectory_features(points)
+    if features["path"] < MIN_PATH:
+        return None
+    net_x, net_y = features["net"]
+    span_x, span_y = features["span"]
+
+    if abs(net_x) >= 0.25 and abs(net_x) >= 0.7 * features["path"]:
+        if abs(net_y) < 0.5 * abs(net_x):
+            return "swipe_right" if net_x > 0 else "swipe_left"
+
+    if features["reversals"] >= 3 and span_x >= 0.1 and span_y < 0.6 * span_x:
+        return "wave"
+
+    if (
+        abs(features["turn"]) >= 1.5 * math.pi
+        and features["turn_consistency"] >= 0.75
+        and min(span_x, span_y) >= 0.08
+    ):
+        return "circle"
+    return None
@@ -0,0 +1,166 @@
+"""Cheap checks that reject frames with no hand before MediaPipe runs."""
+
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+import cv2
+import numpy as np
+
+# Everything is judged on a thumbnail this size (width, height)
+THUMB_SIZE = (48, 36)
+# Commonly used YCrCb skin range; generous on purpose to keep false rejects low
+SKIN_LOWER = np.array([0, 133, 77], dtype=np.uint8)
+SKIN_UPPER = np.array([255, 173, 127], dtype=np.uint8)
+
+# What each rejection reason reports as the result
+REASON_GESTURE = {
+    "dark": "no_image",
+    "flat": "no_image",
+    "blurry": "no_hand",
+    "no_skin": "no_hand",
+    "static": "no_hand",
+}
+
+
+def _env_float(name, default):
+    return float(os.getenv(name, str(default)))
+
+
+class Prefilter:  # pylint: disable=too-many-instance-attributes
+    """
+    Judge a frame from a tiny thumbnail: too dark, too flat (blank or lens
+    covered), too blurry, too little skin tone, or, within a session,
+    unchanged from a previous frame that had no hand. Any of these returns
+    no_hand/no_image without running the hand model. Off unless PREFILTER=1.
+    """
+
+    MAX_SESSIONS = 5000
+
+    def __init__(self, enabled=None, **thresholds):
+        self.enabled = (
+            enabled if enabled is not None else os.getenv("PREFILTER", "0") == "1"
+        )
+        # Mean and standard deviation of the 0-255 grey thumbnail
+        self.min_brightness = thresholds.get(
+            "min_brightness", _env_float("PREFILTER_MIN_BRIGHTNESS", 16)
+        )
+        self.min_contrast = thresholds.get(
+            "min_contrast", _env_float("PREFILTER_MIN_CONTRAST", 6)
+        )
+        # Variance of the Laplacian; 0 disables the blur check
+        self.min_sharpness = thresholds.get(
+            "min_sharpness", _env_float("PREFILTER_MIN_SHARPNESS", 0)
+        )
+        # Share of thumbnail pixels in the skin range
+        self.min_skin = thresholds.get(
+            "min_skin", _env_float("PREFILTER_MIN_SKIN", 0.02)
+        )
+        # Mean absolute grey difference counted as "the same frame"
+        self.static_diff = thresholds.get(
+            "static_diff", _env_float("PREFILTER_STATIC_DIFF", 2.0)
+        )
+        self.rejects = Counter()
+        self._sessions = OrderedDict()  # session -> [grey thumbnail, hand seen]
+        self._lock = threading.Lock()
+
+    def reason(self, image):
+        """Return why image would be rejected, or None to let it through."""
+        reason, _ = self._judge(image)
+        return reason
+
+    def _judge(self, image):
+        thumb = cv2.resize(image, THUMB_SIZE, interpolation=cv2.INTER_LINEAR)
+        grey = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+        mean, std = cv2.meanStdDev(grey)
+        if mean[0][0] < self.min_brightness:
+            return "dark", grey
+        if std[0][0] < self.min_contrast:
+            return "flat", grey
+        if self.min_sharpness and (
+            cv2.Laplacian(grey, cv2.CV_32F).var() < self.min_sharpness
+        ):
+            return "blurry", grey
+        skin = cv2.inRange(
+            cv2.cvtColor(thumb, cv2.COLOR_BGR2YCrCb), SKIN_LOWER, SKIN_UPPER
+        )
+        if cv2.countNonZero(skin) < self.min_skin * skin.size:
+            return "no_skin", grey
+        return None, grey
+
+    def check(self, image, session=None):
+        """
+        Return the gesture to report for a frame that can be rejected
+        (no_hand or no_image), or None when the hand model should run.
+        """
+        if not self.enabled:
+            return None
+        reason = self.session_reason(image, session)
+        if reason is None:
+            return None
+        self.rejects[reason] += 1
+        return REASON_GESTURE[reason]
+
+    def session_reason(self, image, session=None):
+        """
+        Like reason(), but also "static" for a session's repeat of a frame the
+        hand model found no hand in. Records the frame as the session's last.
+        """
+        reason, grey = self._judge(image)
+        if session:
+            with self._lock:
+                previous = self._sessions.pop(session, None)
+                if (
+                    reason is None
+                    and previous is not None
+                    and not previous[1]
+                    and cv2.absdiff(previous[0], grey).mean() < self.static_diff
+                ):
+                    reason = "static"
+                self._sessions[session] = [grey, False]
+                while len(self._sessions) > self.MAX_SESSIONS:
+                    self._sessions.popitem(last=False)
+        return reason
+
+    def remember(self, session, hand_seen):
+        """Record whether the hand model found a hand in the session's frame."""
+        if not self.enabled or not session:
+            return
+        with self._lock:
+            entry = self._sessions.get(session)
+            if entry is not None:
+                entry[1] = hand_seen
+
+
+def evaluate(prefilter, samples, session="evaluate"):
+    """
+    Score a prefilter on labeled frames: samples yields (image, has_hand).
+    Frames go through the same per-session path as requests, in order, as
+    one camera's session whose labels stand in for the hand model, so
+    "static" repeats are counted; session=None judges each frame alone.
+    Returns counts, the false-reject rate (frames with a hand that would be
+    rejected), the share of hand-less frames skipped, and timings.
+    """
+    counts = Counter()
+    reasons = Counter()
+    timings = []
+    for image, has_hand in samples:
+        started = time.perf_counter()
+        reason = prefilter.session_reason(image, session)
+        timings.append(time.perf_counter() - started)
+        if session and reason is None:
+            prefilter.remember(session, has_hand)
+        label = "hand" if has_hand else "no_hand"
+        counts[label] += 1
+        if reason:
+            counts[f"{label}_rejected"] += 1
+            reasons[f"{label}:{reason}"] += 1
+    timings.sort()
+    return {
+        "frames": sum(counts[k] for k in ("hand", "no_hand")),
+        "false_reject_rate": counts["hand_rejected"] / max(counts["hand"], 1),
+        "skip_rate": counts["no_hand_rejected"] / max(counts["no_hand"], 1),
+        "reasons": dict(reasons),
+        "mean_us": sum(timings) / max(len(timings), 1) * 1e6,
+        "p99_us": timings[int(len(timings) * 0.99)] * 1e6 if timings else 0.0,
+    }
@@ -0,0 +1,87 @@
+"""Load-aware quality tiers for gesture inference."""
+
+import os
+import threading
+import time
+from collections import namedtuple
+
+Tier = namedtuple("Tier", ["name", "model_complexity", "max_side", "max_num_hands"])
+# In-flight requests and EWMA latency (seconds) that count as full load, and
+# the minimum seconds between tier changes
+Budget = namedtuple("Budget", ["max_inflight", "latency", "cooldown"])
+
+# Ordered from best quality to cheapest. max_side=None keeps full resolution.
+TIERS = (
+    Tier("full", 1, None, 2),
+    Tier("reduced", 0, 640, 1),
+    Tier("minimal", 0, 320, 1),
+)
+
+
+def default_max_inflight():
+    """
+    QUALITY_MAX_INFLIGHT, or one less than the worker's GUNICORN_THREADS. A
+    worker never has more requests in flight than it has threads, and the
+    queue only counts as over budget above max_inflight, so the default
+    trips once every thread is busy and further requests must wait.
+    """
+    configured = os.getenv("QUALITY_MAX_INFLIGHT")
+    if configured:
+        return int(configured)
+    return max(1, int(os.getenv("GUNICORN_THREADS", "2")) - 1)
+
+
+class QualityController:
+    """
+    Pick a quality tier from the number of in-flight requests and the
+    recent (EWMA) inference latency. Steps down one tier when either signal
+    is over budget and back up once both fall under half of it.
+    """
+
+    ALPHA = 0.2  # EWMA smoothing factor
+
+    def __init__(self, max_inflight=None, latency_budget=None, cooldown=None):
+        self.budget = Budget(
+            max_inflight or default_max_inflight(),
+            latency_budget or float(os.getenv("QUALITY_LATENCY_BUDGET", "2.0")),
+            (
+                cooldown
+                if cooldown is not None
+                else float(os.getenv("QUALITY_COOLDOWN", "1.0"))
+            ),
+        )
+        self.level = 0
+        self.inflight = 0
+        self.ewma = 0.0
+        self._changed_at = 0.0
+        self._lock = threading.Lock()
+
+    def pressure(self):
+        """Return load relative to budget; above 1.0 means overloaded."""
+        return max(
+            self.inflight / self.budget.max_inflight, self.ewma / self.budget.latency
+        )
+
+    def acquire(self):
+        """Register a new request and return the tier it should run at."""
+        with self._lock:
+            self.inflight += 1
+            now = time.monotonic()
+            if now - self._changed_at >= self.budget.cooldown:
+                pressure = self.pressure()
+                if pressure > 1.0 and self.level < len(TIERS) - 1:
+                    self.level += 1
+                    self._changed_at = now
+                elif pressure < 0.5 and self.level > 0:
+                    self.level -= 1
+                    self._changed_at = now
+            return TIERS[self.level]
+
+    def release(self, latency):
+        """Mark a request as finished and fold its latency into the EWMA."""
+        with self._lock:
+            self.inflight = max(0, self.inflight - 1)
+            if self.ewma == 0.0:
+                self.ewma = latency
+            else:
+                self.ewma = self.ALPHA * latency + (1 - self.ALPHA) * self.ewma
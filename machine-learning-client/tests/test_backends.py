@@ -0,0 +1,207 @@
+"""Tests for the hand-landmark inference backends."""
+
+import math
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+import model
+from model import tflite_backend
+from model.mediapipe_backend import MediaPipeBackend
+from model.tflite_backend import Roi, TFLiteBackend
+from quality import TIERS
+
+
+def test_load_backend_by_name():
+    """HAND_BACKEND picks the implementation; unknown names are rejected."""
+    with patch("model.mediapipe_backend.mp.solutions.hands.Hands"):
+        with patch.dict("os.environ", {"HAND_BACKEND": "mediapipe"}):
+            assert isinstance(model.load_backend(), MediaPipeBackend)
+    with pytest.raises(ValueError):
+        model.load_backend("onnx")
+
+
+def test_mediapipe_backend_graph_per_tier():
+    """Each tier gets its own Hands graph, built once with its options."""
+    backend = MediaPipeBackend()
+    landmarks = [MagicMock() for _ in range(21)]
+    graph = MagicMock()
+    graph.process.side_effect = [
+        MagicMock(multi_hand_landmarks=[MagicMock(landmark=landmarks)]),
+        MagicMock(multi_hand_landmarks=None),
+    ]
+    with patch(
+        "model.mediapipe_backend.mp.solutions.hands.Hands", return_value=graph
+    ) as hands:
+        rgb = np.zeros((4, 4, 3), dtype=np.uint8)
+        assert backend.detect(rgb, TIERS[2]) == [landmarks]
+        assert backend.detect(rgb, TIERS[2]) == []
+
+    hands.assert_called_once_with(
+        static_image_mode=True,
+        model_complexity=TIERS[2].model_complexity,
+        max_num_hands=TIERS[2].max_num_hands,
+    )
+
+
+def test_palm_anchors_layout():
+    """2016 anchors: 24x24 cells x 2, then 12x12 cells x 6."""
+    anchors = tflite_backend.palm_anchors()
+    assert anchors.shape == (2016, 2)
+    np.testing.assert_allclose(anchors[0], anchors[1])
+    np.testing.assert_allclose(anchors[0], [0.5 / 24, 0.5 / 24])
+    np.testing.assert_allclose(anchors[1152], [0.5 / 12, 0.5 / 12])
+    np.testing.assert_allclose(anchors[-1], [11.5 / 12, 11.5 / 12])
+
+
+def test_decode_palms_offsets_from_anchor():
+    """Boxes and keypoints are offsets (in input pixels) from the anchor."""
+    anchors = np.array([[0.5, 0.5], [0.25, 0.25]], dtype=np.float32)
+    raw = np.zeros((2, 18), dtype=np.float32)
+    raw[0, :4] = [19.2, 0, 38.4, 19.2]  # centre +0.1 in x, 0.2 x 0.1 box
+    raw[0, 4:6] = [0, -9.6]  # wrist keypoint 0.05 above the anchor
+    scores = np.array([[4.0], [-4.0]], dtype=np.float32)
+
+    boxes, keypoints, kept = tflite_backend.decode_palms(raw, scores, anchors)
+
+    assert len(boxes) == 1
+    np.testing.assert_allclose(boxes[0], [0.5, 0.45, 0.7, 0.55], atol=1e-6)
+    np.testing.assert_allclose(keypoints[0, 0], [0.5, 0.45], atol=1e-6)
+    assert kept[0] == pytest.approx(1 / (1 + math.exp(-4)))
+
+
+def test_weighted_nms_merges_overlaps():
+    """Overlapping boxes average by score; separate ones stay apart."""
+    boxes = np.array([[0, 0, 1, 1], [0.1, 0, 1.1, 1], [5, 5, 6, 6]], dtype=np.float32)
+    keypoints = np.zeros((3, 7, 2), dtype=np.float32)
+    scores = np.array([0.9, 0.6, 0.8], dtype=np.float32)
+
+    palms = tflite_backend.weighted_nms(boxes, keypoints, scores)
+
+    assert [p.score for p in palms] == pytest.approx([0.9, 0.8])
+    np.testing.assert_allclose(palms[0].box[0], 0.1 * 0.6 / 1.5, atol=1e-6)
+    np.testing.assert_allclose(palms[1].box, boxes[2])
+    assert len(tflite_backend.weighted_nms(boxes, keypoints, scores, limit=1)) == 1
+
+
+def test_hand_roi_points_towards_fingers():
+    """The ROI turns with the hand and shifts half a palm towards the fingers."""
+    box = np.array([40, 40, 60, 60], dtype=np.float32)
+    upright = np.zeros((7, 2), dtype=np.float32)
+    upright[0], upright[2] = (50, 60), (50, 40)  # wrist below the fingers
+    roi = tflite_backend.hand_roi(box, upright)
+    assert roi.rotation == pytest.approx(0)
+    assert (roi.cx, roi.cy) == pytest.approx((50, 40))
+    assert roi.size == pytest.approx(20 * 2.6)
+
+    sideways = np.zeros((7, 2), dtype=np.float32)
+    sideways[0], sideways[2] = (40, 50), (60, 50)  # fingers point right
+    roi = tflite_backend.hand_roi(box, sideways)
+    assert roi.rotation == pytest.approx(math.pi / 2)
+    assert (roi.cx, roi.cy) == pytest.approx((60, 50))
+
+
+def test_roi_transform_round_trip():
+    """A point found in the crop maps back to where it is in the frame."""
+    frame = np.zeros((300, 400, 3), dtype=np.uint8)
+    frame[118:123, 248:253] = 255  # dot centred on (250, 120)
+    roi = Roi(cx=230, cy=140, size=112, rotation=0.6)
+    to_frame = tflite_backend.roi_transform(roi)
+
+    crop = tflite_backend.cv2.warpAffine(
+        frame,
+        to_frame,
+        (224, 224),
+        flags=tflite_backend.cv2.INTER_LINEAR | tflite_backend.cv2.WARP_INVERSE_MAP,
+    )
+    ys, xs = np.nonzero(crop[:, :, 0] > 128)
+    found = to_frame @ np.array([xs.mean(), ys.mean(), 1.0])
+    np.testing.assert_allclose(found, [250, 120], atol=1.0)
+    np.testing.assert_allclose(to_frame @ [112, 112, 1], [230, 140], atol=1e-3)
+
+
+def test_letterbox_pads_evenly():
+    """Wide frames are scaled to fit and padded top and bottom."""
+    tensor, scale, left, top = tflite_backend.letterbox(
+        np.full((96, 192, 3), 255, dtype=np.uint8)
+    )
+    assert tensor.shape == (1, 192, 192, 3)
+    assert (scale, left, top) == (1.0, 0, 48)
+    assert tensor[0, 47].max() == 0
+    assert tensor[0, 48:144].min() == pytest.approx(1.0)
+
+
+class FakeInterpreter:
+    """Stands in for the TFLite interpreter: one palm, one centred hand."""
+
+    def __init__(self, model_path, **_options):
+        self.palm = "palm" in model_path
+        self.tensors = {}
+
+    def allocate_tensors(self):
+        """Nothing to allocate."""
+
+    def get_input_details(self):
+        """A single input tensor."""
+        return [{"index": 0}]
+
+    def get_output_details(self):
+        """Palm: boxes (18 wide) and scores; hand: landmarks and presence."""
+        if self.palm:
+            return [
+                {"index": 1, "shape": [1, 2016, 18]},
+                {"index": 2, "shape": [1, 2016, 1]},
+            ]
+        return [{"index": 1, "name": "Identity"}, {"index": 2, "name": "Identity_1"}]
+
+    def set_tensor(self, index, value):
+        """Record the input."""
+        self.tensors[index] = value
+
+    def invoke(self):
+        """Produce fixed outputs."""
+        if self.palm:
+            boxes = np.zeros((1, 2016, 18), dtype=np.float32)
+            boxes[0, 1700, 2:4] = 38.4  # 0.2 x 0.2 palm on anchor 1700
+            boxes[0, 1700, 5], boxes[0, 1700, 9] = 19.2, -19.2  # wrist below
+            scores = np.full((1, 2016, 1), -10, dtype=np.float32)
+            scores[0, 1700] = 10
+            self.tensors[1], self.tensors[2] = boxes, scores
+        else:
+            points = np.zeros((1, 63), dtype=np.float32)
+            points[0, 0::3] = 112  # every landmark at the crop centre
+            points[0, 1::3] = 112
+            self.tensors[1] = points
+            self.tensors[2] = np.array([[0.9]], dtype=np.float32)
+
+    def get_tensor(self, index):
+        """Return an output."""
+        return self.tensors[index]
+
+
+def test_tflite_backend_projects_landmarks_to_frame():
+    """Landmarks at the crop centre land on the ROI centre in the frame."""
+    with patch.object(tflite_backend, "Interpreter", FakeInterpreter):
+        with patch.object(tflite_backend, "model_path", lambda name, _dir: name):
+            backend = TFLiteBackend(threads=2, xnnpack=False)
+            hands = backend.detect(np.zeros((192, 192, 3), dtype=np.uint8), TIERS[0])
+
+    anchor = tflite_backend.palm_anchors()[1700]
+    assert len(hands) == 1 and len(hands[0]) == 21
+    # Upright palm of height 0.2: the ROI centre is 0.1 above the palm centre
+    assert hands[0][0].x == pytest.approx(anchor[0], abs=1e-4)
+    assert hands[0][0].y == pytest.approx(anchor[1] - 0.1, abs=1e-4)
+
+
+def test_tflite_backend_without_runtime():
+    """Choosing tflite without an interpreter installed fails at startup."""
+    with patch.object(tflite_backend, "Interpreter", None):
+        with pytest.raises(ImportError):
+            TFLiteBackend()
+
+
+def test_tflite_backend_real_models_find_no_hand():
+    """With tflite-runtime installed the bundled models load and run."""
+    pytest.importorskip("tflite_runtime")
+    backend = TFLiteBackend()
+    assert not backend.detect(np.zeros((240, 320, 3), dtype=np.uint8), TIERS[1])
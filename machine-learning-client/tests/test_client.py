@@ -3,6 +3,9 @@
 # pylint: disable=redefined-outer-name
 from unittest.mock import patch
 import pytest
+from pymongo.errors import PyMongoError
+from shared.gesture_registry import lookup
+import client
 from client import create_app
 
 
@@ -45,6 +48,7 @@ def test_valid_image(mock_analyze, mock_insert, api_client):
 
     assert response.status_code == 200
     assert response.json["gesture"] == "thumbs_up"
+    assert response.json["tier"] == "full"
     mock_analyze.assert_called_once()
     mock_insert.assert_called_once()
 
@@ -67,3 +71,134 @@ def test_data_url_prefix(mock_analyze, mock_insert, api_client):
     assert response.json["gesture"] == "fist"
     mock_analyze.assert_called_once()
     mock_insert.assert_called_once()
+
+
+def test_payload_too_large(api_client):
+    """Bodies over MAX_CONTENT_LENGTH are rejected with 413."""
+    api_client.application.config["MAX_CONTENT_LENGTH"] = 64
+    response = api_client.post("/analyze-image", json={"image": "A" * 256})
+    assert response.status_code == 413
+
+
+def test_health(api_client):
+    """Health probe reports status and current quality tier."""
+    response = api_client.get("/health")
+    assert response.status_code == 200
+    assert response.json["status"] == "ok"
+    assert response.json["tier"] == "full"
+
+
+@patch("client.collection.update_one")
+@patch("client.collection.insert_one")
+@patch("client.analyze_image")
+def test_request_id_stored_once(mock_analyze, mock_insert, mock_update, api_client):
+    """Requests carrying X-Request-ID are upserted so hedged copies dedupe."""
+    mock_analyze.return_value = {"gesture": "ok"}
+    tiny_png = (
+        "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR4nGNgYAAAAAMA"
+        "ASsJTYQAAAAASUVORK5CYII="
+    )
+
+    response = api_client.post(
+        "/analyze-image",
+        json={"image": tiny_png, "request_id": "from-the-body"},
+        headers={"X-Request-ID": "abc123"},
+    )
+
+    assert response.status_code == 200
+    mock_insert.assert_not_called()
+    query, update = mock_update.call_args[0]
+    assert query == {"request_id": "abc123"}
+    assert update["$setOnInsert"]["code"] == lookup("ok").code
+    assert mock_update.call_args[1]["upsert"] is True
+
+
+@patch("client.collection.insert_one")
+@patch("client.analyze_image")
+def test_document_stores_code_only(mock_analyze, mock_insert, api_client):
+    """Stored documents carry the registry code, not label strings."""
+    mock_analyze.return_value = {"gesture": "point"}
+    tiny_png = (
+        "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR4nGNgYAAAAAMA"
+        "ASsJTYQAAAAASUVORK5CYII="
+    )
+
+    response = api_client.post("/analyze-image", json={"image": tiny_png})
+
+    assert response.json["emoji"] == "🤔"
+    document = mock_insert.call_args[0][0]
+    assert document["code"] == lookup("point").code
+    assert not {"gesture", "mood", "emoji"} & document.keys()
+
+
+@patch("client.collection.insert_one")
+@patch("client.analyze_image")
+def test_document_records_room(mock_analyze, mock_insert, api_client):
+    """Each document carries its room; bad room ids fall back to main."""
+    mock_analyze.return_value = {"gesture": "fist"}
+    tiny_png = (
+        "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR4nGNgYAAAAAMA"
+        "ASsJTYQAAAAASUVORK5CYII="
+    )
+
+    api_client.post("/analyze-image", json={"image": tiny_png, "room": "bio-101"})
+    api_client.post("/analyze-image", json={"image": tiny_png, "room": "a b/c"})
+
+    rooms = [c[0][0]["room"] for c in mock_insert.call_args_list]
+    assert rooms == ["bio-101", "main"]
+
+
+@patch("client.collection.insert_one")
+@patch("client.analyze_clip")
+def test_clip_is_analyzed_in_one_request(mock_clip, mock_insert, api_client):
+    """A clip's frames are decoded in order and stored as one gesture."""
+    mock_clip.return_value = {"gesture": "wave"}
+    frames = ["data:image/jpeg;base64,AAEC", "AwQF"]
+
+    response = api_client.post("/analyze-image", json={"frames": frames})
+
+    assert response.status_code == 200
+    assert response.json["gesture"] == "wave"
+    assert mock_clip.call_args[0][0] == [b"\x00\x01\x02", b"\x03\x04\x05"]
+    mock_insert.assert_called_once()
+
+
+@patch("client.collection.insert_one")
+@patch("client.analyze_clip")
+def test_clip_latency_is_recorded_per_frame(mock_clip, _mock_insert, api_client):
+    """A clip adds its time per frame, not in total, to the latency average."""
+    clock = [10.0]
+
+    def two_seconds(*_args, **_kwargs):
+        clock[0] += 2.0
+        return {"gesture": "wave"}
+
+    mock_clip.side_effect = two_seconds
+    with patch("client.time.monotonic", lambda: clock[0]):
+        with patch.object(
+            client.quality, "release", wraps=client.quality.release
+        ) as release:
+            api_client.post("/analyze-image", json={"frames": ["AAEC"] * 4})
+
+    release.assert_called_once_with(0.5)
+
+
+def test_clip_must_be_a_short_list(api_client):
+    """Empty, oversized or non-list clips are rejected with 400."""
+    for frames in ([], ["AAEC"] * 1000, "AAEC"):
+        response = api_client.post("/analyze-image", json={"frames": frames})
+        assert response.status_code == 400
+
+
+def test_index_creation_failure_is_reported(capsys):
+    """A database error while creating indexes is printed, not raised."""
+    with patch.object(client.store, "ensure_indexes", side_effect=PyMongoError("down")):
+        client.ensure_indexes()
+    assert "index creation failed: down" in capsys.readouterr().out
+
+
+def test_unexpected_body_gets_a_json_error(api_client):
+    """A failure before decoding still answers with a JSON error."""
+    response = api_client.post("/analyze-image", json=["image", "frames"])
+    assert response.status_code == 500
+    assert "error" in response.json
@@ -1,7 +1,10 @@
+# pylint: disable=protected-access
 """Tests for gesture_api module gesture recognition logic."""
 
 from unittest.mock import patch, MagicMock
+import numpy as np
 import gesture_api
+from quality import TIERS
 
 
 def test_no_image():
@@ -17,10 +20,7 @@ def test_no_hand():
 
     with patch("gesture_api.cv2.imread", return_value=fake_img):
         with patch("gesture_api.cv2.cvtColor", return_value=fake_img):
-            with patch(
-                "gesture_api.mp_hands.process",
-                return_value=MagicMock(multi_hand_landmarks=None),
-            ):
+            with patch.object(gesture_api.backend, "detect", return_value=[]):
                 result = gesture_api.analyze_image("img.jpg")
                 assert result["gesture"] == "no_hand"
 
@@ -44,12 +44,9 @@ def test_thumb_up():
     for idx in [6, 10, 14, 18, 8, 12, 16, 20]:
         fake_lm[idx].y = 0.50
 
-    mock_results = MagicMock()
-    mock_results.multi_hand_landmarks = [MagicMock(landmark=fake_lm)]
-
     with patch("gesture_api.cv2.imread", return_value=fake_img):
         with patch("gesture_api.cv2.cvtColor", return_value=fake_img):
-            with patch("gesture_api.mp_hands.process", return_value=mock_results):
+            with patch.object(gesture_api.backend, "detect", return_value=[fake_lm]):
                 result = gesture_api.analyze_image("x")
                 assert result["gesture"] == "thumbs_up"
 
@@ -73,11 +70,22 @@ def test_open_palm():
     fake_lm[4].y = 0.5
     fake_lm[2].y = 0.5
 
-    mock_results = MagicMock()
-    mock_results.multi_hand_landmarks = [MagicMock(landmark=fake_lm)]
-
     with patch("gesture_api.cv2.imread", return_value=fake_img):
         with patch("gesture_api.cv2.cvtColor", return_value=fake_img):
-            with patch("gesture_api.mp_hands.process", return_value=mock_results):
+            with patch.object(gesture_api.backend, "detect", return_value=[fake_lm]):
                 result = gesture_api.analyze_image("x")
                 assert result["gesture"] == "open_palm"
+
+
+def test_reduced_tier_downscales_input():
+    """Cheaper tiers should feed a smaller image to their own hand model."""
+    big_img = np.zeros((1080, 1920, 3), dtype=np.uint8)
+
+    with patch("gesture_api.cv2.imread", return_value=big_img):
+        with patch.object(gesture_api.backend, "detect", return_value=[]) as detect:
+            result = gesture_api.analyze_image("x", TIERS[2])
+
+    assert result["gesture"] == "no_hand"
+    processed, tier = detect.call_args[0]
+    assert max(processed.shape[:2]) == TIERS[2].max_side
+    assert tier is TIERS[2]
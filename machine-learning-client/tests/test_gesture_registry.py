@@ -0,0 +1,25 @@
+"""Tests for the shared gesture registry."""
+
+from shared import gesture_registry
+from shared.gesture_registry import GESTURES, from_code, lookup, resolve
+
+
+def test_codes_are_dense_and_unique():
+    """GESTURES is indexed by code, and labels are unique."""
+    assert [g.code for g in GESTURES] == list(range(len(GESTURES)))
+    assert len({g.name for g in GESTURES}) == len(GESTURES)
+
+
+def test_lookup_and_from_code():
+    """Unknown labels and codes fall back to 'unknown'."""
+    assert lookup("fist").mood == "stressed"
+    assert lookup("made_up") is gesture_registry.UNKNOWN
+    assert from_code(lookup("wave").code).name == "wave"
+    assert from_code(999) is gesture_registry.UNKNOWN
+
+
+def test_resolve_legacy_document():
+    """Documents written before codes keep their stored mood and emoji."""
+    entry = resolve({"gesture": "victory", "mood": "excited", "emoji": "👍"})
+    assert (entry.name, entry.mood, entry.emoji) == ("victory", "excited", "👍")
+    assert not resolve({"gesture": "no_hand"}).visible
@@ -0,0 +1,161 @@
+"""Tests for the gesture stores."""
+
+# pylint: disable=redefined-outer-name
+
+import sqlite3
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from shared import gesture_store
+from shared.gesture_store import ExportQuery, MongoGestureStore, SQLiteGestureStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    """A fresh SQLite store."""
+    return SQLiteGestureStore(str(tmp_path / "gestures.db"))
+
+
+def gesture(timestamp, code=3, room="main", **extra):
+    """A document as the ML client stores it."""
+    return {"room": room, "code": code, "score": 0.9, "timestamp": timestamp, **extra}
+
+
+def test_open_store_by_name(tmp_path):
+    """GESTURE_STORE picks the store; unknown names are rejected."""
+    collection = MagicMock()
+    with patch.dict("os.environ", {"GESTURE_STORE": "mongo"}):
+        assert gesture_store.open_store(lambda: collection).collection is collection
+        assert gesture_store.open_store(lambda: None) is None
+    env = {"GESTURE_STORE": "sqlite", "SQLITE_PATH": str(tmp_path / "g.db")}
+    with patch.dict("os.environ", env):
+        opened = gesture_store.open_store(lambda: collection)
+        assert isinstance(opened, SQLiteGestureStore)
+        assert gesture_store.open_store(lambda: collection) is opened
+    with patch.dict("os.environ", {"GESTURE_STORE": "redis"}):
+        with pytest.raises(ValueError):
+            gesture_store.open_store(lambda: collection)
+
+
+def test_sqlite_uses_wal_and_indexes(store):
+    """The file is in WAL mode and whiteboard reads use the room index."""
+    store.ensure_indexes()
+    connection = sqlite3.connect(store.path)
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    plan = " ".join(
+        row[-1]
+        for row in connection.execute(
+            "EXPLAIN QUERY PLAN " + gesture_store.RECENT, ("main", 0, "[0]")
+        )
+    )
+    assert "gestures_room_time" in plan
+
+
+def test_sqlite_recent_and_expire(store):
+    """Newest first, one room only, hidden codes skipped; expiry per room."""
+    for doc in (
+        gesture(100),
+        gesture(300, code=5),
+        gesture(200, code=0),
+        gesture(400, room="bio"),
+    ):
+        store.add(doc)
+
+    assert store.recent("main", 150, [0]) == [{"code": 5, "timestamp": 300}]
+    assert [d["timestamp"] for d in store.recent("main", 0, [])] == [300, 200, 100]
+
+    store.expire("main", 250)
+    assert [d["timestamp"] for d in store.recent("main", 0, [])] == [300]
+    assert len(store.recent("bio", 0, [])) == 1
+
+
+def test_sqlite_request_id_stored_once(store):
+    """Hedged copies of one request leave a single row."""
+    store.add(gesture(100, request_id="abc"))
+    store.add(gesture(101, request_id="abc"))
+    store.add(gesture(102))
+    assert [d["timestamp"] for d in store.recent("main", 0, [])] == [102, 100]
+
+
+def test_sqlite_batches_concurrent_writes(store):
+    """Writes queued while a commit runs share the next transaction."""
+    commits = []
+    original = store._write_batch  # pylint: disable=protected-access
+
+    def counting(batch):
+        commits.append(len(batch))
+        original(batch)
+
+    with patch.object(store, "_write_batch", counting):
+        threads = [
+            threading.Thread(target=store.add, args=(gesture(i),)) for i in range(50)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert sum(commits) == 50
+    assert len(store.recent("main", 0, [])) == 50
+
+
+def test_sqlite_write_errors_reach_the_caller(store):
+    """A failed batch raises in add() and the writer keeps going."""
+    with pytest.raises(sqlite3.IntegrityError):
+        store.add(gesture(100, code=None))
+    store.add(gesture(101))
+    assert len(store.recent("main", 0, [])) == 1
+
+
+def test_sqlite_export_filters_and_pages(store):
+    """Export is ordered by (timestamp, id) and resumes after a row."""
+    for timestamp, code, room in (
+        (100, 3, "main"),
+        (100, 4, "main"),
+        (200, 3, "bio"),
+        (300, 3, "main"),
+    ):
+        store.add(gesture(timestamp, code=code, room=room))
+
+    rows = list(store.export(ExportQuery(), batch_size=2))
+    assert [(r["timestamp"], r["_id"]) for r in rows] == [
+        (100, 1),
+        (100, 2),
+        (200, 3),
+        (300, 4),
+    ]
+    assert set(rows[0]) == {"_id", "timestamp", "room", "code", "score"}
+
+    query = ExportQuery(room="main", codes=[3], after=(100, 1))
+    assert [r["_id"] for r in store.export(query)] == [4]
+    assert [r["_id"] for r in store.export(ExportQuery(after=(100, 1)), limit=2)] == [
+        2,
+        3,
+    ]
+    assert [r["_id"] for r in store.export(ExportQuery(start=150, end=300))] == [3]
+
+
+def test_mongo_export_filter():
+    """Legacy documents match the default room and gesture labels."""
+    collection = MagicMock()
+    MongoGestureStore(collection).export(
+        ExportQuery(room="main", codes=[3], names=["fist"]), limit=5
+    )
+    query = collection.find.call_args[0][0]
+    assert query["$and"][0] == {"room": {"$in": ["main", None]}}
+    assert query["$and"][1]["$or"][1] == {"gesture": {"$in": ["fist"]}}
+    assert collection.find.call_args[1]["limit"] == 5
+
+
+def test_mongo_reads_follow_read_preference():
+    """recent() uses the read preference; writes and expiry the primary."""
+    collection = MagicMock()
+    reads = gesture_store.read_preference("secondaryPreferred", 90)
+    mongo = MongoGestureStore(collection, reads)
+    collection.with_options.assert_called_once_with(read_preference=reads)
+    mongo.recent("main", 0, [])
+    mongo.expire("main", 0)
+    assert collection.with_options.return_value.find.call_count == 1
+    collection.find.assert_not_called()
+    collection.delete_many.assert_called_once()
@@ -0,0 +1,63 @@
+"""Tests for header-based size checks and in-memory decoding."""
+
+from unittest.mock import patch
+import base64
+import cv2
+import numpy as np
+import pytest
+import image_io
+from client import create_app
+
+
+def _encode(ext, width, height):
+    _, buf = cv2.imencode(ext, np.zeros((height, width, 3), dtype=np.uint8))
+    return buf.tobytes()
+
+
+@pytest.mark.parametrize("ext", [".png", ".jpg"])
+def test_image_size_reads_header(ext):
+    """PNG and JPEG dimensions come from the header alone."""
+    data = _encode(ext, 37, 21)
+    assert image_io.image_size(data) == (37, 21)
+    assert image_io.image_size(data[:200]) == (37, 21)
+
+
+def test_image_size_unknown_format():
+    """Unrecognised formats report no size."""
+    assert image_io.image_size(b"GIF89a...") is None
+
+
+def test_decode_image_from_bytes():
+    """Encoded bytes decode to a BGR array without touching disk."""
+    image = image_io.decode_image(_encode(".png", 8, 6))
+    assert image.shape == (6, 8, 3)
+    assert image_io.decode_image(b"") is None
+
+
+def test_decode_image_rejects_before_decoding():
+    """Oversized images are refused from the header, before imdecode runs."""
+    data = _encode(".jpg", 200, 100)
+    with patch.object(image_io, "MAX_IMAGE_PIXELS", 100 * 100):
+        with patch("image_io.cv2.imdecode") as imdecode:
+            with pytest.raises(image_io.ImageTooLarge):
+                image_io.decode_image(data)
+    imdecode.assert_not_called()
+
+
+def test_decode_image_scales_down_large_jpeg():
+    """A cheap tier gets a JPEG decoded at reduced resolution."""
+    image = image_io.decode_image(_encode(".jpg", 1600, 1200), max_side=320)
+    assert image.shape == (300, 400, 3)
+
+
+def test_analyze_image_too_large_returns_413():
+    """The API answers 413 for images over the pixel limit."""
+    app = create_app()
+    app.config["TESTING"] = True
+    payload = base64.b64encode(_encode(".png", 200, 100)).decode()
+
+    with patch.object(image_io, "MAX_IMAGE_PIXELS", 100 * 100):
+        response = app.test_client().post("/analyze-image", json={"image": payload})
+
+    assert response.status_code == 413
+    assert "too large" in response.get_json()["error"]
@@ -0,0 +1,119 @@
+"""Tests for motion gesture recognition from clips of frames."""
+
+import math
+import threading
+from unittest.mock import MagicMock, patch
+import numpy as np
+import pytest
+import gesture_api
+from motion import MAX_FRAMES, classify_motion, frame_buffer, write_landmarks
+
+
+def _hand_at(x, y):
+    """A (21, 3) frame with every landmark at (x, y)."""
+    frame = np.zeros((21, 3), dtype=np.float32)
+    frame[:, 0] = x
+    frame[:, 1] = y
+    return frame
+
+
+def _frames(path):
+    return np.stack([_hand_at(x, y) for x, y in path])
+
+
+def test_swipes():
+    """A straight horizontal sweep is a swipe in its direction."""
+    right = [(0.2 + 0.06 * i, 0.5) for i in range(10)]
+    assert classify_motion(_frames(right)) == "swipe_right"
+    assert classify_motion(_frames(right[::-1])) == "swipe_left"
+
+
+def test_wave():
+    """Side-to-side oscillation in place is a wave."""
+    path = [(0.5 + 0.1 * math.sin(i * math.pi / 2), 0.4) for i in range(12)]
+    assert classify_motion(_frames(path)) == "wave"
+
+
+def test_circle():
+    """A full loop in one direction is a circle."""
+    path = [
+        (0.5 + 0.15 * math.cos(a), 0.5 + 0.15 * math.sin(a))
+        for a in np.linspace(0, 2 * math.pi, 14)
+    ]
+    assert classify_motion(_frames(path)) == "circle"
+
+
+def test_still_hand_is_not_motion():
+    """Jitter around one spot, or too few frames, gives nothing."""
+    rng = np.random.default_rng(1)
+    path = 0.5 + rng.normal(0, 0.002, size=(12, 2))
+    assert classify_motion(_frames(path)) is None
+    assert classify_motion(_frames([(0.1, 0.5), (0.9, 0.5)])) is None
+
+
+def test_frame_buffer_is_reused_per_thread():
+    """Each thread allocates one (MAX_FRAMES, 21, 3) buffer and keeps it."""
+    points = frame_buffer()
+    assert points.shape == (MAX_FRAMES, 21, 3)
+    assert points.dtype == np.float32
+    assert frame_buffer() is points
+    other = []
+    thread = threading.Thread(target=lambda: other.append(frame_buffer()))
+    thread.start()
+    thread.join()
+    assert other[0] is not points
+
+
+def test_write_landmarks_fills_a_row():
+    """Landmark objects and arrays are copied into a buffer row in place."""
+    points = frame_buffer()
+    objects = [MagicMock(x=0.1, y=0.2, z=0.3) for _ in range(21)]
+    write_landmarks(points[0], objects)
+    write_landmarks(points[1], _hand_at(0.5, 0.6))
+    assert np.allclose(points[0, 0], [0.1, 0.2, 0.3])
+    assert np.allclose(points[1, 20], [0.5, 0.6, 0.0])
+
+
+def _detect_path(path):
+    """A backend.detect stand-in returning one hand per frame along path."""
+    frames = iter([[[MagicMock(x=x, y=y, z=0.0) for _ in range(21)]] for x, y in path])
+    return lambda *_args: next(frames)
+
+
+def test_analyze_clip_recognizes_motion():
+    """A hand moving across a clip's frames is reported as a motion."""
+    path = [(0.2 + 0.06 * i, 0.5) for i in range(10)]
+    fake_img = np.zeros((4, 4, 3), dtype=np.uint8)
+
+    with patch("gesture_api.decode_image", return_value=fake_img):
+        with patch.object(gesture_api.backend, "detect", _detect_path(path)):
+            result = gesture_api.analyze_clip([b"frame"] * len(path))
+    assert result == {"gesture": "swipe_right"}
+
+
+def test_analyze_clip_falls_back_to_pose():
+    """A still hand is classified from the clip's last frame with a hand."""
+    fake_img = np.zeros((4, 4, 3), dtype=np.uint8)
+    detections = iter([[["early"]], [["last"]], []])
+
+    with patch("gesture_api.decode_image", return_value=fake_img):
+        with patch.object(
+            gesture_api.backend, "detect", lambda *_args: next(detections)
+        ):
+            with patch("gesture_api.classify_motion", return_value=None):
+                with patch(
+                    "gesture_api.classify_landmarks", return_value={"gesture": "ok"}
+                ) as rules:
+                    with patch("gesture_api.write_landmarks"):
+                        assert gesture_api.analyze_clip([b"a", b"b", b"c"]) == {
+                            "gesture": "ok"
+                        }
+    rules.assert_called_once_with(["last"])
+
+
+def test_analyze_clip_rejects_long_clips():
+    """More frames than the buffer holds are refused before any work."""
+    with patch("gesture_api.decode_image") as decode:
+        with pytest.raises(ValueError):
+            gesture_api.analyze_clip([b"frame"] * (MAX_FRAMES + 1))
+    decode.assert_not_called()
@@ -0,0 +1,102 @@
+"""Tests for the no-hand prefilter."""
+
+from unittest.mock import patch
+import cv2
+import numpy as np
+import gesture_api
+from prefilter import Prefilter, evaluate
+from benchmarks.prefilter_eval import main as eval_main
+
+SKIN_BGR = (120, 150, 200)
+
+
+def _background(seed=0):
+    """Textured, skin-free frame (bluish noise)."""
+    rng = np.random.default_rng(seed)
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    frame[..., 0] = rng.integers(120, 220, (240, 320))
+    frame[..., 1] = rng.integers(60, 140, (240, 320))
+    frame[..., 2] = rng.integers(20, 80, (240, 320))
+    return frame
+
+
+def _with_hand(seed=0):
+    frame = _background(seed)
+    cv2.ellipse(frame, (160, 120), (50, 70), 0, 0, 360, SKIN_BGR, -1)
+    return frame
+
+
+def test_rejection_reasons():
+    """Dark, blank and skin-free frames are rejected; a hand is not."""
+    prefilter = Prefilter(enabled=True)
+    assert prefilter.reason(np.zeros((240, 320, 3), dtype=np.uint8)) == "dark"
+    assert prefilter.reason(np.full((240, 320, 3), 128, dtype=np.uint8)) == "flat"
+    assert prefilter.reason(_background()) == "no_skin"
+    assert prefilter.reason(_with_hand()) is None
+
+
+def test_disabled_by_default():
+    """Without PREFILTER=1 every frame goes to the hand model."""
+    with patch.dict("os.environ", {"PREFILTER": ""}):
+        assert Prefilter().check(np.zeros((8, 8, 3), dtype=np.uint8)) is None
+
+
+def test_unchanged_frame_after_no_hand_is_skipped():
+    """Within a session a repeat of a hand-less frame is not re-analyzed."""
+    prefilter = Prefilter(enabled=True)
+    frame = _with_hand()
+    assert prefilter.check(frame, session="s") is None
+    prefilter.remember("s", hand_seen=False)
+    assert prefilter.check(frame.copy(), session="s") == "no_hand"
+    assert prefilter.rejects["static"] == 1
+
+    assert prefilter.check(frame, session="t") is None
+    prefilter.remember("t", hand_seen=True)
+    assert prefilter.check(frame, session="t") is None
+
+
+def test_evaluate_reports_false_rejects():
+    """evaluate() scores the prefilter against labeled frames."""
+    samples = [(_with_hand(i), True) for i in range(4)]
+    samples += [(_background(i), False) for i in range(3)]
+    samples += [(np.zeros((240, 320, 3), dtype=np.uint8), True)]  # mislabeled
+
+    result = evaluate(Prefilter(enabled=True), samples)
+
+    assert result["frames"] == 8
+    assert result["false_reject_rate"] == 1 / 5
+    assert result["skip_rate"] == 1.0
+    assert result["reasons"] == {"hand:dark": 1, "no_hand:no_skin": 3}
+
+
+def test_evaluate_counts_static_repeats():
+    """A session's repeat of a hand-less frame is scored as "static"."""
+    samples = [(_with_hand(), False), (_with_hand(), False)]
+
+    result = evaluate(Prefilter(enabled=True), samples)
+    assert result["reasons"] == {"no_hand:static": 1}
+    assert result["skip_rate"] == 0.5
+    assert not evaluate(Prefilter(enabled=True), samples, session=None)["reasons"]
+
+
+def test_eval_script_reads_labeled_folders(tmp_path):
+    """The evaluation script takes hand/ and no_hand/ folders."""
+    (tmp_path / "hand").mkdir()
+    (tmp_path / "no_hand").mkdir()
+    cv2.imwrite(str(tmp_path / "hand" / "a.png"), _with_hand())
+    cv2.imwrite(str(tmp_path / "no_hand" / "b.png"), _background())
+
+    result = eval_main([str(tmp_path), "--json"])
+
+    assert result["false_reject_rate"] == 0.0
+    assert result["skip_rate"] == 1.0
+
+
+def test_analyze_image_skips_hand_model():
+    """A rejected frame never reaches the hand model."""
+    dark = np.zeros((240, 320, 3), dtype=np.uint8)
+    with patch.object(gesture_api, "prefilter", Prefilter(enabled=True)):
+        with patch("gesture_api.cv2.imread", return_value=dark):
+            with patch.object(gesture_api.backend, "detect") as detect:
+                assert gesture_api.analyze_image("x") == {"gesture": "no_image"}
+    detect.assert_not_called()
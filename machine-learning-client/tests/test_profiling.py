@@ -0,0 +1,110 @@
+"""Tests for the on-demand profiler and its admin endpoint."""
+
+# pylint: disable=redefined-outer-name
+import os
+import time
+from unittest.mock import patch
+import pytest
+from shared.profiling import Profiler, profiler
+from client import create_app
+
+TINY_PNG = (
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR4nGNgYAAAAAMA"
+    "ASsJTYQAAAAASUVORK5CYII="
+)
+
+
+@pytest.fixture
+def api_client():
+    """Create Flask test client with profiling reset."""
+    profiler.stop()
+    app = create_app()
+    app.config["TESTING"] = True
+    return app.test_client()
+
+
+def test_endpoint_disabled_without_token(api_client):
+    """No ADMIN_TOKEN configured → endpoint hidden."""
+    with patch.dict(os.environ, {"ADMIN_TOKEN": ""}):
+        response = api_client.get("/admin/profile")
+    assert response.status_code == 404
+
+
+def test_endpoint_rejects_wrong_token(api_client):
+    """Wrong X-Admin-Token → 403."""
+    with patch.dict(os.environ, {"ADMIN_TOKEN": "secret"}):
+        response = api_client.get("/admin/profile", headers={"X-Admin-Token": "nope"})
+    assert response.status_code == 403
+
+
+def test_stage_is_free_when_inactive():
+    """Stages share one no-op context manager while profiling is off."""
+    idle = Profiler()
+    assert idle.stage("a") is idle.stage("b")
+    with idle.stage("a"):
+        pass
+    assert not idle.stages
+
+
+def test_stage_timings_are_running_totals():
+    """A long session keeps one total per stage, not every timing."""
+    session = Profiler()
+    session.active = True
+    for _ in range(1000):
+        with session.stage("decode"):
+            pass
+    session.active = False
+    assert session.stages["decode"][0] == 1000
+    report = session.report()
+    assert report["stages"]["decode"]["count"] == 1000
+    assert report["pid"] == os.getpid()
+
+
+@patch("client.collection.insert_one")
+@patch("client.analyze_image")
+def test_profiles_next_request(mock_analyze, _mock_insert, api_client):
+    """Profiling for one request records stage timings, then switches off."""
+    mock_analyze.return_value = {"gesture": "fist"}
+    headers = {"X-Admin-Token": "secret"}
+
+    with patch.dict(os.environ, {"ADMIN_TOKEN": "secret"}):
+        started = api_client.post(
+            "/admin/profile", json={"requests": 1}, headers=headers
+        )
+        assert started.status_code == 202
+
+        api_client.post("/analyze-image", json={"image": TINY_PNG})
+        time.sleep(0.01)
+
+        report = api_client.get("/admin/profile", headers=headers).get_json()
+
+    assert report["active"] is False
+    assert report["stages"]["base64_decode"]["count"] == 1
+    assert report["stages"]["mongo_insert"]["count"] == 1
+
+
+def test_bad_options_are_rejected(api_client):
+    """Options that are not positive numbers get 400, not a server error."""
+    headers = {"X-Admin-Token": "secret"}
+    with patch.dict(os.environ, {"ADMIN_TOKEN": "secret"}):
+        for body in (
+            {"requests": "lots"},
+            {"seconds": -1},
+            {"requests": 1, "interval_ms": "fast"},
+            {"requests": 1, "interval_ms": 60000},
+            ["requests"],
+        ):
+            response = api_client.post("/admin/profile", json=body, headers=headers)
+            assert response.status_code == 400, body
+    assert profiler.active is False
+
+
+def test_restart_waits_for_previous_sampler():
+    """A restarted session never runs alongside the stopped one's sampler."""
+    session = Profiler()
+    assert session.start(seconds=60, interval=0.05)
+    first = session._sampler  # pylint: disable=protected-access
+    session.stop()
+    assert session.start(seconds=60, interval=0.05)
+    assert not first.is_alive()
+    session.stop()
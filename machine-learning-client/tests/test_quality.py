@@ -0,0 +1,56 @@
+"""Tests for the load-aware quality controller."""
+
+import os
+from unittest.mock import patch
+
+from test_server_config import load_config
+from quality import TIERS, QualityController
+
+
+def test_starts_at_full_quality():
+    """An idle controller should hand out the full tier."""
+    controller = QualityController(max_inflight=2, latency_budget=1.0, cooldown=0)
+    assert controller.acquire() == TIERS[0]
+
+
+def test_steps_down_when_queue_grows():
+    """Too many in-flight requests should degrade one tier at a time."""
+    controller = QualityController(max_inflight=2, latency_budget=1.0, cooldown=0)
+    tiers = [controller.acquire() for _ in range(4)]
+    assert tiers[0] == TIERS[0]
+    assert tiers[2] == TIERS[1]
+    assert tiers[3] == TIERS[2]
+
+
+def test_steps_down_on_slow_requests_and_recovers():
+    """High latency degrades; fast requests afterwards restore quality."""
+    controller = QualityController(max_inflight=10, latency_budget=1.0, cooldown=0)
+    controller.acquire()
+    controller.release(3.0)
+    assert controller.acquire() == TIERS[1]
+    controller.release(0.01)
+    for _ in range(20):
+        controller.acquire()
+        controller.release(0.01)
+    assert controller.acquire() == TIERS[0]
+
+
+def test_cooldown_limits_tier_changes():
+    """Only one tier change is allowed per cooldown window."""
+    controller = QualityController(max_inflight=1, latency_budget=1.0, cooldown=60)
+    tiers = [controller.acquire() for _ in range(5)]
+    assert tiers[-1] == TIERS[1]
+
+
+def test_default_queue_budget_fits_the_worker_threads():
+    """With gunicorn's threads all busy the queue signal steps quality down."""
+    env = {"GUNICORN_THREADS": "2", "QUALITY_MAX_INFLIGHT": ""}
+    with patch.dict(os.environ, env):
+        threads = load_config().threads
+        controller = QualityController(latency_budget=1.0, cooldown=0)
+    assert controller.budget.max_inflight < threads
+    tiers = [controller.acquire() for _ in range(threads)]
+    assert tiers[-1] == TIERS[1]
+
+    with patch.dict(os.environ, {"QUALITY_MAX_INFLIGHT": "6"}):
+        assert QualityController().budget.max_inflight == 6
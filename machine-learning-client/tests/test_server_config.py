@@ -0,0 +1,41 @@
+"""Tests for the production (gunicorn) entry point."""
+
+import importlib.util
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / "gunicorn.conf.py"
+
+
+def load_config():
+    """Import gunicorn.conf.py as a module."""
+    spec = importlib.util.spec_from_file_location("gunicorn_conf", CONFIG_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_config_reads_env():
+    """Worker, thread and recycling settings come from the environment."""
+    env = {"GUNICORN_WORKERS": "3", "GUNICORN_THREADS": "1", "PORT": "8080"}
+    with patch.dict(os.environ, env):
+        config = load_config()
+    assert config.workers == 3
+    assert config.threads == 1
+    assert config.bind == "0.0.0.0:8080"
+    assert config.max_requests > 0
+
+
+def test_config_preloads_native_modules():
+    """cv2 and mediapipe are imported in the master, before workers fork."""
+    config = load_config()
+    assert config.mediapipe is not None
+    assert config.cv2 is not None
+
+
+def test_wsgi_exposes_app():
+    """wsgi.app is a ready Flask application."""
+    import wsgi  # pylint: disable=import-outside-toplevel
+
+    assert wsgi.app.url_map is not None
@@ -0,0 +1,78 @@
+"""Tests for request tracing in the ML client."""
+
+import json
+import os
+from unittest.mock import patch
+
+from shared import tracing
+from shared.tracing import Tracer
+from client import create_app
+
+TINY_PNG = (
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR4nGNgYAAAAAMA"
+    "ASsJTYQAAAAASUVORK5CYII="
+)
+
+
+@patch("client.collection.insert_one")
+@patch("client.analyze_image")
+def test_continues_web_app_trace(mock_analyze, _mock_insert, tmp_path):
+    """Spans join the caller's trace under its span and carry the tier."""
+    mock_analyze.return_value = {"gesture": "fist", "score": 0.9}
+    path = tmp_path / "traces.jsonl"
+    with patch.dict(os.environ, {"TRACE_EXPORT": "file", "TRACE_FILE": str(path)}):
+        app = create_app()
+    trace_id, parent = "a" * 32, "b" * 16
+
+    with patch.object(Tracer, "_ensure_thread"):
+        response = app.test_client().post(
+            "/analyze-image",
+            json={"image": TINY_PNG},
+            headers={"traceparent": f"00-{trace_id}-{parent}-01"},
+        )
+    app.extensions["tracing"].flush()
+
+    assert response.status_code == 200
+    assert response.headers["X-Trace-ID"] == trace_id
+    spans = {
+        s["name"]: s
+        for s in json.loads(path.read_text(encoding="utf-8"))["resourceSpans"][0][
+            "scopeSpans"
+        ][0]["spans"]
+    }
+    assert {"POST /analyze-image", "base64_decode", "mongo_insert"} <= set(spans)
+    assert {s["traceId"] for s in spans.values()} == {trace_id}
+    root = spans["POST /analyze-image"]
+    assert root["parentSpanId"] == parent
+    assert spans["mongo_insert"]["parentSpanId"] == root["spanId"]
+    assert {"key": "tier", "value": {"stringValue": "full"}} in root["attributes"]
+
+
+def test_unsampled_parent_is_not_exported():
+    """A trace the web app did not sample is dropped here too."""
+    tracer = Tracer("test", export="file", sample=1.0)
+    trace = tracer.begin({"traceparent": f"00-{'a' * 32}-{'b' * 16}-00"})
+    trace.end(trace.start("POST /analyze-image"))
+    with patch.object(Tracer, "_ensure_thread"), patch.object(
+        Tracer, "_export"
+    ) as export:
+        tracer.finish(trace)
+        tracer.flush()
+    export.assert_not_called()
+
+
+def test_otlp_attribute_types():
+    """Attribute values map onto OTLP's typed AnyValue."""
+    trace = tracing.Trace("a" * 32)
+    trace.end(trace.start("x", n=3, ok=True, ratio=0.5, tier="lite"))
+    spans = tracing.to_otlp("svc", "host:1", [trace])["resourceSpans"][0]["scopeSpans"][
+        0
+    ]["spans"]
+    assert len(spans) == 1
+    span = spans[0]
+    assert span["attributes"] == [
+        {"key": "n", "value": {"intValue": "3"}},
+        {"key": "ok", "value": {"boolValue": True}},
+        {"key": "ratio", "value": {"doubleValue": 0.5}},
+        {"key": "tier", "value": {"stringValue": "lite"}},
+    ]
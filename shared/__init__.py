@@ -0,0 +1,5 @@
+"""
+Modules both services use: the gesture registry and store, tracing and
+profiling. Each Dockerfile copies this package into its image next to the
+service's own code, so there is a single copy to edit.
+"""
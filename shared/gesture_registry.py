@@ -0,0 +1,66 @@
+"""
+Single source of truth for gesture labels, moods and emojis.
+
+MongoDB documents store only the integer code, so codes are append-only:
+never renumber, reuse or remove one.
+"""
+
+from collections import namedtuple
+
+# emoji is the mood shown on the whiteboard; hand is the gesture itself
+Gesture = namedtuple("Gesture", ["code", "name", "mood", "emoji", "hand", "visible"])
+
+GESTURES = (
+    Gesture(0, "unknown", "unknown", "❓", "❓", False),
+    Gesture(1, "no_hand", "unknown", "❓", "❓", False),
+    Gesture(2, "no_image", "unknown", "❓", "❓", False),
+    Gesture(3, "thumbs_up", "happy", "😄", "👍", True),
+    Gesture(4, "thumbs_down", "sad", "😞", "👎", True),
+    Gesture(5, "open_palm", "neutral", "🙂", "✋", True),
+    Gesture(6, "fist", "stressed", "😤", "✊", True),
+    Gesture(7, "victory", "relaxed", "😎", "✌️", True),
+    Gesture(8, "ok", "content", "😊", "👌", True),
+    Gesture(9, "point", "curious", "🤔", "👉", True),
+    Gesture(10, "rock", "excited", "🤘", "🤘", True),
+    Gesture(11, "swipe_left", "dismissive", "👈", "👈", True),
+    Gesture(12, "swipe_right", "eager", "👉", "👉", True),
+    Gesture(13, "wave", "friendly", "👋", "👋", True),
+    Gesture(14, "circle", "playful", "🔄", "🔄", True),
+)
+
+UNKNOWN = GESTURES[0]
+BY_NAME = {gesture.name: gesture for gesture in GESTURES}
+HIDDEN_NAMES = tuple(g.name for g in GESTURES if not g.visible)
+HIDDEN_CODES = [g.code for g in GESTURES if not g.visible]
+
+
+def lookup(name):
+    """Registry entry for a label; unrecognised labels are 'unknown'."""
+    return BY_NAME.get(name, UNKNOWN)
+
+
+def from_code(code):
+    """Registry entry for a stored code (GESTURES is indexed by code)."""
+    if isinstance(code, int) and 0 <= code < len(GESTURES):
+        return GESTURES[code]
+    return UNKNOWN
+
+
+def resolve(doc):
+    """
+    Registry entry for a stored document. Documents written before codes
+    were introduced carry label strings instead; their stored mood and
+    emoji are kept as they were.
+    """
+    if "code" in doc:
+        return from_code(doc["code"])
+    name = doc.get("gesture", "unknown")
+    entry = lookup(name)
+    return Gesture(
+        entry.code,
+        name,
+        doc.get("mood", "unknown"),
+        doc.get("emoji") or entry.emoji,
+        entry.hand,
+        name not in HIDDEN_NAMES,
+    )
@@ -0,0 +1,425 @@
+"""
+Where recognized gestures are stored and read back.
+
+Both services go through a GestureStore: the ML client adds gestures, and the
+web app reads the whiteboard and exports from it and expires old entries.
+GESTURE_STORE picks the implementation: "mongo" (the default) or "sqlite", an
+embedded database file at SQLITE_PATH in WAL mode. SQLite suits a single node
+and offline benchmarks, where it needs no database server and reads are
+local. Both services must open the same file, e.g. through a shared volume.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from collections import namedtuple
+
+from pymongo import read_preferences
+from pymongo.errors import DuplicateKeyError
+
+# Documents stored before rooms existed have no room and belong to this one
+DEFAULT_ROOM = "main"
+
+WHITEBOARD_FIELDS = {
+    "_id": 0,
+    "code": 1,
+    "timestamp": 1,
+    "gesture": 1,
+    "mood": 1,
+    "emoji": 1,
+}
+EXPORT_FIELDS = {
+    "_id": 1,
+    "timestamp": 1,
+    "room": 1,
+    "code": 1,
+    "score": 1,
+    "gesture": 1,
+    "mood": 1,
+    "emoji": 1,
+}
+
+# Export filters, each None when not given. codes are gesture codes and names
+# the same gestures' labels, for documents stored before codes; after is the
+# (timestamp, id) of the last row already received.
+ExportQuery = namedtuple(
+    "ExportQuery", "room start end codes names after", defaults=(None,) * 6
+)
+
+
+class GestureStore:
+    """Storage for recognized gestures; subclasses implement each operation."""
+
+    name = "base"
+
+    def ensure_indexes(self):
+        """Create the indexes the read and write paths rely on (idempotent)."""
+        raise NotImplementedError
+
+    def add(self, document):
+        """
+        Store one gesture (room, code, score, timestamp). A document with a
+        request_id is stored only once, whichever copy of a hedged request
+        arrives first.
+        """
+        raise NotImplementedError
+
+    def expire(self, room, before):
+        """Delete a room's gestures older than the epoch time before."""
+        raise NotImplementedError
+
+    def recent(self, room, since, hidden_codes):
+        """
+        A room's gestures since an epoch time, newest first, skipping hidden
+        codes. May lag the latest writes where reads go to secondaries.
+        """
+        raise NotImplementedError
+
+    def export(self, query, limit=0, batch_size=1000):
+        """
+        Iterate over the gestures matching an ExportQuery in (timestamp, id)
+        order, fetching batch_size at a time; limit 0 means no limit.
+        """
+        raise NotImplementedError
+
+
+class MongoGestureStore(GestureStore):
+    """
+    Gestures in a MongoDB collection. Writes and expiry always go to the
+    primary; recent() reads with the reads read preference, e.g. from
+    secondaries.
+    """
+
+    name = "mongo"
+
+    def __init__(self, collection, reads=None):
+        self.collection = collection
+        self.reads = (
+            collection
+            if reads is None
+            else collection.with_options(read_preference=reads)
+        )
+
+    @staticmethod
+    def _room(room):
+        if room == DEFAULT_ROOM:
+            return {"$in": [DEFAULT_ROOM, None]}
+        return room
+
+    def ensure_indexes(self):
+        self.collection.create_index(
+            "request_id",
+            unique=True,
+            partialFilterExpression={"request_id": {"$exists": True}},
+        )
+        # Whiteboard reads and expiry are scoped to one room; _id breaks
+        # timestamp ties for the keyset-paginated export (either direction)
+        self.collection.create_index([("room", 1), ("timestamp", 1), ("_id", 1)])
+        # Export across all rooms
+        self.collection.create_index([("timestamp", 1), ("_id", 1)])
+
+    def add(self, document):
+        request_id = document.get("request_id")
+        if not request_id:
+            self.collection.insert_one(document)
+            return
+        try:
+            self.collection.update_one(
+                {"request_id": request_id}, {"$setOnInsert": document}, upsert=True
+            )
+        except DuplicateKeyError:
+            pass
+
+    def expire(self, room, before):
+        self.collection.delete_many(
+            {"room": self._room(room), "timestamp": {"$lt": before}}
+        )
+
+    def recent(self, room, since, hidden_codes):
+        # Hidden codes are skipped by the query, except on documents from
+        # before gesture codes; room leads so the (room, timestamp) index is used
+        return list(
+            self.reads.find(
+                {
+                    "room": self._room(room),
+                    "timestamp": {"$gte": since},
+                    "code": {"$nin": hidden_codes},
+                },
+                WHITEBOARD_FIELDS,
+            ).sort("timestamp", -1)
+        )
+
+    def _filter(self, query):
+        clauses = []
+        if query.room is not None:
+            clauses.append({"room": self._room(query.room)})
+        time_range = {}
+        if query.start is not None:
+            time_range["$gte"] = query.start
+        if query.end is not None:
+            time_range["$lt"] = query.end
+        if time_range:
+            clauses.append({"timestamp": time_range})
+        if query.codes is not None:
+            clauses.append(
+                {
+                    "$or": [
+                        {"code": {"$in": list(query.codes)}},
+                        {"gesture": {"$in": list(query.names or ())}},
+                    ]
+                }
+            )
+        if query.after is not None:
+            timestamp, doc_id = query.after
+            # Strictly after the last row seen in (timestamp, _id) order
+            clauses.append(
+                {
+                    "$or": [
+                        {"timestamp": {"$gt": timestamp}},
+                        {"timestamp": timestamp, "_id": {"$gt": doc_id}},
+                    ]
+                }
+            )
+        if not clauses:
+            return {}
+        if len(clauses) == 1:
+            return clauses[0]
+        return {"$and": clauses}
+
+    def export(self, query, limit=0, batch_size=1000):
+        # A server-side cursor: documents arrive batch_size at a time
+        return self.collection.find(
+            self._filter(query),
+            EXPORT_FIELDS,
+            sort=[("timestamp", 1), ("_id", 1)],
+            batch_size=batch_size,
+            limit=max(limit, 0),
+        )
+
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS gestures (
+        id INTEGER PRIMARY KEY,
+        room TEXT NOT NULL,
+        code INTEGER NOT NULL,
+        score REAL,
+        timestamp REAL NOT NULL,
+        request_id TEXT UNIQUE
+    )""",
+    "CREATE INDEX IF NOT EXISTS gestures_room_time ON gestures (room, timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS gestures_time ON gestures (timestamp, id)",
+)
+INSERT = (
+    "INSERT INTO gestures (room, code, score, timestamp, request_id)"
+    " VALUES (:room, :code, :score, :timestamp, :request_id)"
+    " ON CONFLICT (request_id) DO NOTHING"
+)
+EXPIRE = "DELETE FROM gestures WHERE room = ? AND timestamp < ?"
+RECENT = (
+    "SELECT code, timestamp FROM gestures WHERE room = ? AND timestamp >= ?"
+    " AND code NOT IN (SELECT value FROM json_each(?)) ORDER BY timestamp DESC"
+)
+
+
+class SQLiteGestureStore(GestureStore):
+    """
+    Gestures in an SQLite file in WAL mode, so readers never block the writer
+    or each other. Each thread keeps its own connection, and with it the
+    compiled form of every statement it has run. Writes from all threads go
+    through one writer thread. It commits whatever has queued up in a single
+    transaction, so a burst of requests costs one commit rather than one
+    each. add() returns once its row is committed.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path, batch_size=256):
+        self.path = path
+        self.batch_size = batch_size
+        self._local = threading.local()
+        self._pending = queue.Queue()
+        self._writer_pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        # Connections do not survive a fork; gunicorn workers open their own
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None, cached_statements=64
+            )
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Commits skip the fsync (checkpoints still sync); a power cut can
+            # lose the last commits but never corrupts the file
+            connection.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                connection.execute(statement)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def ensure_indexes(self):
+        self._connection()
+
+    def add(self, document):
+        row = {
+            "room": document.get("room") or DEFAULT_ROOM,
+            "code": document["code"],
+            "score": document.get("score"),
+            "timestamp": document["timestamp"],
+            "request_id": document.get("request_id"),
+        }
+        done = threading.Event()
+        outcome = []
+        self._ensure_writer()
+        self._pending.put((row, done, outcome))
+        done.wait()
+        if outcome:
+            raise outcome[0]
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._writer_pid != os.getpid():
+                self._writer_pid = os.getpid()
+                threading.Thread(target=self._write_loop, daemon=True).start()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._pending.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        try:
+            self._commit([row for row, _done, _outcome in batch])
+        except Exception:  # pylint: disable=broad-exception-caught
+            # One bad row must not fail the others: retry them one by one,
+            # handing each failure to its own add()
+            for row, _done, outcome in batch:
+                try:
+                    self._commit([row])
+                except Exception as exc:  # pylint: disable=broad-exception-caught
+                    outcome.append(exc)
+        for _row, done, _outcome in batch:
+            done.set()
+
+    def _commit(self, rows):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(INSERT, rows)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def expire(self, room, before):
+        self._connection().execute(EXPIRE, (room, before))
+
+    def recent(self, room, since, hidden_codes):
+        # Hidden codes are bound as one JSON array so the statement text, and
+        # with it the compiled statement, is the same on every call
+        rows = self._connection().execute(
+            RECENT, (room, since, "[" + ",".join(map(str, hidden_codes)) + "]")
+        )
+        return [dict(row) for row in rows]
+
+    def export(self, query, limit=0, batch_size=1000):
+        clauses = []
+        params = []
+        if query.room is not None:
+            clauses.append("room = ?")
+            params.append(query.room)
+        if query.start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(query.start)
+        if query.end is not None:
+            clauses.append("timestamp < ?")
+            params.append(query.end)
+        if query.codes is not None:
+            clauses.append("code IN (SELECT value FROM json_each(?))")
+            params.append("[" + ",".join(map(str, query.codes)) + "]")
+        if query.after is not None:
+            clauses.append("(timestamp, id) > (?, ?)")
+            params.extend(query.after)
+        sql = "SELECT id AS _id, timestamp, room, code, score FROM gestures"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp, id LIMIT ?"
+        params.append(limit if limit > 0 else -1)
+        cursor = self._connection().execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield dict(row)
+        finally:
+            # An unfinished SELECT would hold back WAL checkpoints
+            cursor.close()
+
+
+STORES = ("mongo", "sqlite")
+
+READ_MODES = {
+    "primaryPreferred": read_preferences.PrimaryPreferred,
+    "secondary": read_preferences.Secondary,
+    "secondaryPreferred": read_preferences.SecondaryPreferred,
+    "nearest": read_preferences.Nearest,
+}
+# The smallest maxStalenessSeconds MongoDB accepts
+MIN_MAX_STALENESS = 90
+
+_sqlite_stores = {}
+_sqlite_stores_lock = threading.Lock()
+
+
+def sqlite_store(path=None):
+    """The process-wide SQLiteGestureStore for path (default SQLITE_PATH)."""
+    path = path or os.getenv("SQLITE_PATH", "gestures.db")
+    with _sqlite_stores_lock:
+        if path not in _sqlite_stores:
+            _sqlite_stores[path] = SQLiteGestureStore(path)
+    return _sqlite_stores[path]
+
+
+def read_preference(mode, max_staleness=0):
+    """
+    pymongo read preference for a mode name, or None for "primary". With
+    max_staleness (seconds, 0 for no limit) secondaries that have fallen
+    further behind the primary are not read from.
+    """
+    if mode == "primary":
+        if max_staleness > 0:
+            raise ValueError("a staleness limit needs a mode that reads secondaries")
+        return None
+    if mode not in READ_MODES:
+        raise ValueError(
+            f"unknown read preference {mode!r}; pick from primary, {', '.join(READ_MODES)}"
+        )
+    if 0 < max_staleness < MIN_MAX_STALENESS:
+        raise ValueError(f"max staleness must be at least {MIN_MAX_STALENESS} seconds")
+    return READ_MODES[mode](
+        max_staleness=int(max_staleness) if max_staleness > 0 else -1
+    )
+
+
+def open_store(get_collection, reads=None):
+    """
+    The store GESTURE_STORE names. For mongo, get_collection returns the
+    gestures collection, or None when MongoDB is down, and so does this;
+    reads is the read preference for recent().
+    """
+    backend = os.getenv("GESTURE_STORE", "mongo")
+    if backend not in STORES:
+        raise ValueError(f"unknown GESTURE_STORE {backend!r}; pick from {STORES}")
+    if backend == "sqlite":
+        return sqlite_store()
+    collection = get_collection()
+    return None if collection is None else MongoGestureStore(collection, reads)
@@ -0,0 +1,256 @@
+"""
+On-demand sampling profiler with per-stage timers and an admin endpoint.
+
+State is per process: under gunicorn each worker profiles only the requests
+it serves, so profile with one worker (responses carry the worker's pid).
+"""
+
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+from flask import Response, jsonify, request
+
+from shared import tracing
+
+_NULL_STAGE = nullcontext()
+
+# Seconds between stack samples, unless a session asks for another interval
+DEFAULT_INTERVAL = 0.005
+# Longest interval_ms accepted, so a restart never waits long for the old
+# sampler to notice it was stopped
+MAX_INTERVAL_MS = 1000
+
+
+class Profiler:
+    """
+    Stack-sampling profiler that runs for the next N requests or T seconds.
+    Only threads that are currently serving a request are sampled.
+    """
+
+    def __init__(self):
+        self.active = False
+        self.samples = Counter()
+        # name -> [count, total seconds, max seconds]; a long session keeps
+        # running totals rather than every timing
+        self.stages = {}
+        self.requests_left = None
+        self._threads = set()
+        self._sampler = None
+        self._lock = threading.Lock()
+
+    def start(self, requests=None, seconds=None, interval=None):
+        """Reset previous results and start sampling."""
+        with self._lock:
+            if self.active:
+                return False
+            previous = self._sampler
+        # A stopped session's sampler may still be asleep; let it finish so
+        # two never sample at once
+        if previous is not None:
+            previous.join()
+        with self._lock:
+            if self.active:
+                return False
+            self.samples = Counter()
+            self.stages = {}
+            self._threads = set()
+            self.requests_left = requests
+            self.active = True
+            self._sampler = threading.Thread(
+                target=self._sample_loop,
+                args=(
+                    interval or DEFAULT_INTERVAL,
+                    time.monotonic() + seconds if seconds else None,
+                ),
+                daemon=True,
+            )
+            self._sampler.start()
+        return True
+
+    def stop(self):
+        """Stop sampling; collected results stay available."""
+        self.active = False
+
+    def enter_request(self):
+        """Mark the calling thread as serving a request."""
+        self._threads.add(threading.get_ident())
+
+    def exit_request(self, count=True):
+        """Unmark the calling thread and count the request towards N."""
+        self._threads.discard(threading.get_ident())
+        with self._lock:
+            if count and self.requests_left is not None:
+                self.requests_left -= 1
+                if self.requests_left <= 0:
+                    self.active = False
+
+    def stage(self, name):
+        """Context manager timing one stage; free when profiling is off."""
+        if not self.active:
+            return _NULL_STAGE
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                totals = self.stages.setdefault(name, [0, 0.0, 0.0])
+                totals[0] += 1
+                totals[1] += elapsed
+                totals[2] = max(totals[2], elapsed)
+
+    def _sample_loop(self, interval, deadline):
+        while self.active:
+            if deadline and time.monotonic() >= deadline:
+                self.active = False
+                break
+            frames = sys._current_frames()  # pylint: disable=protected-access
+            for ident in list(self._threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.samples[_collapse(frame)] += 1
+            time.sleep(interval)
+
+    def collapsed(self):
+        """Return samples in collapsed-stack format for flame graph tools."""
+        return "\n".join(
+            f"{stack} {count}" for stack, count in self.samples.most_common()
+        )
+
+    def report(self):
+        """Summarize samples and stage timings as a JSON-friendly dict."""
+        with self._lock:
+            totals = [(name, *values) for name, values in self.stages.items()]
+        stages = {}
+        for name, count, total, most in totals:
+            stages[name] = {
+                "count": count,
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total * 1000 / count, 3),
+                "max_ms": round(most * 1000, 3),
+            }
+        return {
+            "pid": os.getpid(),
+            "active": self.active,
+            "samples": sum(self.samples.values()),
+            "requests_left": self.requests_left,
+            "stages": stages,
+            "collapsed": self.collapsed(),
+        }
+
+
+def _collapse(frame):
+    """Render a frame's call chain root-first as 'file:func;file:func'."""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+profiler = Profiler()
+
+
+def _option(options, name, cast, most=float("inf")):
+    """A positive number from the request body, or None when not given."""
+    value = options.get(name)
+    if not value:
+        return None
+    value = cast(value)
+    if not 0 < value <= most:
+        raise ValueError(name)
+    return value
+
+
+def _start_from_request():
+    """Start profiling with options from the JSON body of the request."""
+    options = request.get_json(silent=True)
+    if not isinstance(options, dict):
+        options = {}
+    try:
+        requests = _option(options, "requests", int)
+        seconds = _option(options, "seconds", float)
+        interval_ms = _option(options, "interval_ms", float, MAX_INTERVAL_MS)
+    except (TypeError, ValueError, OverflowError):
+        message = (
+            "'requests' and 'seconds' must be positive numbers and "
+            f"'interval_ms' between 0 and {MAX_INTERVAL_MS}"
+        )
+        return jsonify({"error": message}), 400
+    if not requests and not seconds:
+        return jsonify({"error": "Provide 'requests' or 'seconds'"}), 400
+    started = profiler.start(
+        requests=requests,
+        seconds=seconds,
+        interval=interval_ms / 1000 if interval_ms else None,
+    )
+    if not started:
+        return jsonify({"error": "Profiling already running", "pid": os.getpid()}), 409
+    return jsonify({"message": "Profiling started", "pid": os.getpid()}), 202
+
+
+@contextmanager
+def _timed_span(timer, span):
+    with timer, span:
+        yield
+
+
+def stage(name):
+    """
+    Time a named stage of request handling while profiling is on, and record
+    it as a span when the request is traced.
+    """
+    timer = profiler.stage(name)
+    span = tracing.span(name)
+    if span is tracing.NULL_SPAN:
+        return timer
+    if timer is _NULL_STAGE:
+        return span
+    return _timed_span(timer, span)
+
+
+def init_app(app):
+    """
+    Register request hooks and the /admin/profile endpoint. The endpoint is
+    only enabled when ADMIN_TOKEN is set and must be called with a matching
+    X-Admin-Token header.
+    """
+
+    @app.before_request
+    def _profile_enter():
+        if profiler.active:
+            profiler.enter_request()
+
+    @app.teardown_request
+    def _profile_exit(_exc):
+        if profiler.active:
+            profiler.exit_request(count=not request.path.startswith("/admin/"))
+
+    @app.route("/admin/profile", methods=["GET", "POST", "DELETE"])
+    def admin_profile():
+        """Start (POST), read (GET) or stop (DELETE) a profiling session."""
+        token = os.getenv("ADMIN_TOKEN")
+        if not token:
+            return jsonify({"error": "Not found"}), 404
+        if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), token):
+            return jsonify({"error": "Forbidden"}), 403
+
+        if request.method == "POST":
+            return _start_from_request()
+
+        if request.method == "DELETE":
+            profiler.stop()
+
+        if request.args.get("format") == "collapsed":
+            return Response(profiler.collapsed(), mimetype="text/plain")
+        return jsonify(profiler.report()), 200
@@ -0,0 +1,302 @@
+"""
+Per-request tracing across the web app and the ML client.
+
+Each request becomes a trace: a root span for the request and a child span
+for every profiling.stage() it passes through. The web app starts the trace
+and hands it to the ML client in a W3C traceparent header, so the spans of
+both services share one trace id, returned to callers as X-Trace-ID. A
+caller's trace may span many requests, so the trace id is never used as the
+request id the ML client deduplicates hedged copies with.
+Finished traces are exported as OTLP/HTTP JSON, one export request per line
+to TRACE_FILE or POSTed to TRACE_OTLP_URL, from a background thread.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import re
+import socket
+import threading
+import time
+import urllib.request
+import uuid
+from contextlib import contextmanager, nullcontext
+
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+NULL_SPAN = nullcontext()
+_TRACEPARENT = re.compile(r"00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})")
+_local = threading.local()
+
+
+def _span_id():
+    return os.urandom(8).hex()
+
+
+class Trace:
+    """The spans one service records for one request."""
+
+    def __init__(self, trace_id, parent_id=None, sampled=True):
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.spans = []
+        self._open = []
+
+    def start(self, name, **attributes):
+        """Open a span as a child of the innermost open span."""
+        parent = self._open[-1]["span_id"] if self._open else self.parent_id
+        opened = {
+            "name": name,
+            "span_id": _span_id(),
+            "parent_id": parent,
+            "start_ns": time.time_ns(),
+            "end_ns": None,
+            "attributes": attributes,
+        }
+        self.spans.append(opened)
+        self._open.append(opened)
+        return opened
+
+    def end(self, opened):
+        """Close a span opened with start."""
+        opened["end_ns"] = time.time_ns()
+        self._open.remove(opened)
+
+    @property
+    def current_span_id(self):
+        """Span id new children and outgoing requests hang off."""
+        return self._open[-1]["span_id"] if self._open else self.parent_id
+
+    @property
+    def duration_ms(self):
+        """Length of the root span in milliseconds."""
+        root = self.spans[0]
+        return ((root["end_ns"] or time.time_ns()) - root["start_ns"]) / 1e6
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(service, instance, traces):
+    """OTLP/HTTP JSON export request for a batch of finished traces."""
+    spans = []
+    for trace in traces:
+        for recorded in trace.spans:
+            otlp_span = {
+                "traceId": trace.trace_id,
+                "spanId": recorded["span_id"],
+                "name": recorded["name"],
+                "kind": 2 if recorded is trace.spans[0] else 1,  # server / internal
+                "startTimeUnixNano": str(recorded["start_ns"]),
+                "endTimeUnixNano": str(recorded["end_ns"] or recorded["start_ns"]),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)}
+                    for key, value in recorded["attributes"].items()
+                ],
+            }
+            if recorded["parent_id"]:
+                otlp_span["parentSpanId"] = recorded["parent_id"]
+            spans.append(otlp_span)
+    resource = {"service.name": service, "service.instance.id": instance}
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": key, "value": _otlp_value(value)}
+                        for key, value in resource.items()
+                    ]
+                },
+                "scopeSpans": [{"scope": {"name": "tracing"}, "spans": spans}],
+            }
+        ]
+    }
+
+
+class Tracer:  # pylint: disable=too-many-instance-attributes
+    """
+    Decide which requests to keep and export them. TRACE_EXPORT=file or
+    otlp turns tracing on. TRACE_SAMPLE is the share of requests kept; with
+    TRACE_SLOW_MS set, requests at least that slow are kept as well, so the
+    tail is always there to look at. The ML client also keeps whatever the
+    web app sampled.
+    """
+
+    BATCH = 256
+    MAX_QUEUED = 2000
+
+    def __init__(self, service, export=None, sample=None, slow_ms=None):
+        self.service = service
+        self.instance = f"{socket.gethostname()}:{os.getpid()}"
+        self.export = export if export is not None else os.getenv("TRACE_EXPORT", "")
+        self.sample = (
+            sample if sample is not None else float(os.getenv("TRACE_SAMPLE", "1.0"))
+        )
+        self.slow_ms = (
+            slow_ms if slow_ms is not None else float(os.getenv("TRACE_SLOW_MS", "0"))
+        )
+        self.path = os.getenv("TRACE_FILE", "traces.jsonl")
+        self.url = os.getenv("TRACE_OTLP_URL", "http://localhost:4318/v1/traces")
+        self.dropped = 0
+        self._queue = queue.Queue(self.MAX_QUEUED)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """True when traces are exported somewhere."""
+        return self.export in ("file", "otlp")
+
+    def begin(self, headers):
+        """Start a trace, continuing the caller's if it sent one."""
+        match = _TRACEPARENT.fullmatch(headers.get("traceparent", ""))
+        if match:
+            trace_id, parent_id, flags = match.groups()
+            return Trace(trace_id, parent_id, sampled=bool(int(flags, 16) & 1))
+        return Trace(uuid.uuid4().hex, sampled=random.random() < self.sample)
+
+    def finish(self, trace):
+        """Queue a finished trace for export if it is sampled or slow."""
+        if not trace.sampled and not (
+            self.slow_ms and trace.duration_ms >= self.slow_ms
+        ):
+            return
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_thread(self):
+        # Started lazily, and again in each forked gunicorn worker
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.BATCH:
+                try:
+                    batch.append(self._queue.get(timeout=0.5))
+                except queue.Empty:
+                    break
+            self._export(batch)
+
+    def flush(self):
+        """Export everything queued so far from the calling thread."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._export(batch)
+
+    def _export(self, traces):
+        body = json.dumps(to_otlp(self.service, self.instance, traces))
+        try:
+            if self.export == "file":
+                with self._lock, open(self.path, "a", encoding="utf-8") as out:
+                    out.write(body + "\n")
+            else:
+                post = urllib.request.Request(
+                    self.url,
+                    data=body.encode(),
+                    headers={"Content-Type": "application/json"},
+                )
+                with urllib.request.urlopen(post, timeout=5):
+                    pass
+        except OSError as exc:
+            # Covers the file, urllib.error.URLError/HTTPError and timeouts
+            logger.warning("Trace export failed: %s", exc)
+
+
+def current():
+    """The calling thread's trace, or None."""
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def _span(trace, name):
+    opened = trace.start(name)
+    try:
+        yield opened
+    finally:
+        trace.end(opened)
+
+
+def span(name):
+    """Context manager recording a span when the current request is traced."""
+    trace = current()
+    if trace is None:
+        return NULL_SPAN
+    return _span(trace, name)
+
+
+def annotate(**attributes):
+    """Add attributes to the request's root span."""
+    trace = current()
+    if trace is not None and trace.spans:
+        trace.spans[0]["attributes"].update(attributes)
+
+
+def outgoing_headers():
+    """traceparent for a call to another service, or {} when not traced."""
+    trace = current()
+    if trace is None:
+        return {}
+    flags = "01" if trace.sampled else "00"
+    return {"traceparent": f"00-{trace.trace_id}-{trace.current_span_id}-{flags}"}
+
+
+def init_app(app, service):
+    """Trace every request when TRACE_EXPORT is set; returns the Tracer."""
+    tracer = Tracer(service)
+    app.extensions["tracing"] = tracer
+    if not tracer.enabled:
+        return tracer
+
+    @app.before_request
+    def _trace_begin():
+        trace = tracer.begin(request.headers)
+        route = request.url_rule.rule if request.url_rule else request.path
+        trace.start(
+            f"{request.method} {route}",
+            **{"http.method": request.method, "http.route": route},
+        )
+        _local.trace = trace
+
+    @app.after_request
+    def _trace_response(response):
+        trace = current()
+        if trace is not None:
+            annotate(**{"http.status_code": response.status_code})
+            response.headers["X-Trace-ID"] = trace.trace_id
+        return response
+
+    @app.teardown_request
+    def _trace_end(_exc):
+        trace = current()
+        _local.trace = None
+        if trace is not None and trace.spans:
+            trace.end(trace.spans[0])
+            tracer.finish(trace)
+
+    return tracer
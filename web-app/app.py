@@ -3,10 +3,28 @@
 import os
 import time
 import base64
-from flask import Flask, jsonify, request, render_template
+import threading
+import uuid
+from flask import Flask, Response, jsonify, request
+from werkzeug.exceptions import RequestEntityTooLarge
 from pymongo import MongoClient
 import requests
 from dotenv import load_dotenv
+from shared import profiling, tracing
+from shared.gesture_registry import HIDDEN_CODES, lookup, resolve
+from shared.gesture_store import open_store, read_preference
+from shared.profiling import stage
+import http_cache
+import export
+import rate_limit
+from rate_limit import Overloaded
+from ml_pool import ReplicaPool
+from room_cache import RoomCache, normalize_room
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; compact responses fall back to JSON
+    msgpack = None
 
 load_dotenv()
 
@@ -15,6 +33,49 @@ ML_HOST = os.getenv("MLCLIENT_HOST", "mlclient")
 
 ML_URL = f"http://{ML_HOST}:{ML_PORT}"
 
+# ML_URLS (comma-separated) spreads inference over several ML client replicas
+ML_POOL = ReplicaPool.from_env(ML_URL)
+
+# How long gestures are kept (0 keeps them forever); the whiteboard itself
+# only ever shows the last 24 hours, older ones remain available to export
+RETENTION_HOURS = float(os.getenv("RETENTION_HOURS", "720"))
+
+# Expired gestures are deleted at most this often per room (seconds), so
+# whiteboard polls do not send a delete to the primary on every reload
+EXPIRE_INTERVAL = float(os.getenv("EXPIRE_INTERVAL", "60"))
+
+# Whiteboard reads may go to secondaries; WHITEBOARD_MAX_STALENESS (seconds,
+# at least 90, 0 for no limit) skips secondaries lagging further behind.
+# Inserts and expiry always go to the primary.
+WHITEBOARD_READS = read_preference(
+    os.getenv("WHITEBOARD_READ_PREFERENCE", "primary"),
+    float(os.getenv("WHITEBOARD_MAX_STALENESS", "0")),
+)
+
+MSGPACK_MIMETYPE = "application/x-msgpack"
+
+# One client per connection string and process: a MongoClient keeps its own
+# connection pool and replica set monitor, and must not cross a fork
+_mongo_clients = {}
+_mongo_clients_lock = threading.Lock()
+
+
+def _mongo_client(mongo_uri):
+    """The process's MongoClient for mongo_uri, pinged when first created."""
+    key = (os.getpid(), mongo_uri)
+    with _mongo_clients_lock:
+        mongo_client = _mongo_clients.get(key)
+        if mongo_client is None:
+            mongo_client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+            try:
+                # Test connection
+                mongo_client.admin.command("ping")
+            except Exception:
+                mongo_client.close()
+                raise
+            _mongo_clients[key] = mongo_client
+        return mongo_client
+
 
 def get_mongo_collection():
     """Get MongoDB collection with proper error handling."""
@@ -43,43 +104,139 @@ def get_mongo_collection():
 
         collection_name = "gestures"
 
-        # Initialize MongoDB client with connection timeout
-        mongo_client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
-        db = mongo_client[db_name]
-        # Test connection
-        mongo_client.admin.command("ping")
-        return db[collection_name]
+        return _mongo_client(mongo_uri)[db_name][collection_name]
     except Exception as exc:
         # Return None if connection fails - will be handled in routes
         print(f"MongoDB connection error: {exc}")
         return None
 
 
-def create_app():
+def _compact_whiteboard(recent_gestures):
+    """
+    Columnar whiteboard payload: parallel arrays of timestamps (whole
+    seconds) and small codes into a legend of (gesture, mood, emoji).
+    The browser renders time_ago itself using the server's clock, sent
+    in the X-Server-Time header so the body (and its ETag) only changes
+    with the gestures and unchanged polls get a 304. Sent as MessagePack
+    when the client asks for it and msgpack is installed.
+    """
+    legend = []
+    legend_codes = {}
+    timestamps = []
+    codes = []
+    for doc in recent_gestures:
+        entry = resolve(doc)
+        if not entry.visible:
+            continue
+        code = legend_codes.get(entry)
+        if code is None:
+            code = legend_codes[entry] = len(legend)
+            legend.append((entry.name, entry.mood, entry.emoji))
+        timestamps.append(int(doc.get("timestamp", 0)))
+        codes.append(code)
+
+    payload = {
+        "legend": legend,
+        "t": timestamps,
+        "g": codes,
+        "count": len(codes),
+    }
+    if (
+        msgpack is not None
+        and request.accept_mimetypes.best_match(["application/json", MSGPACK_MIMETYPE])
+        == MSGPACK_MIMETYPE
+    ):
+        response = Response(msgpack.packb(payload), mimetype=MSGPACK_MIMETYPE)
+    else:
+        response = jsonify(payload)
+    response.headers["X-Server-Time"] = str(int(time.time()))
+    return response
+
+
+def get_gesture_store():
+    """The GESTURE_STORE store, or None when MongoDB is unreachable."""
+    return open_store(get_mongo_collection, WHITEBOARD_READS)
+
+
+def _load_recent_gestures(room, expire=True):
+    """
+    Expire old gestures and then fetch one room's gestures from the last 24
+    hours, newest first. Returns None when the store is unreachable.
+    """
+    store = get_gesture_store()
+    if store is None:
+        return None
+
+    now = time.time()
+    # Calculate timestamp from 24 hours ago
+    twenty_four_hours_ago = now - (24 * 60 * 60)
+
+    # First, delete entries past the retention period
+    if expire and RETENTION_HOURS > 0:
+        store.expire(room, now - RETENTION_HOURS * 60 * 60)
+
+    # Fetch recent gestures, skipping hidden ones (no_hand, ...)
+    with stage(f"{store.name}_query"):
+        return store.recent(room, twenty_four_hours_ago, HIDDEN_CODES)
+
+
+def create_app():  # pylint: disable=too-many-statements
     """Create and configure the Flask application."""
     app = Flask(__name__)
+    app.config["MAX_CONTENT_LENGTH"] = int(
+        os.getenv("MAX_CONTENT_LENGTH", str(10 * 1024 * 1024))
+    )
+    profiling.init_app(app)
+    tracing.init_app(app, "web-app")
+    http_cache.init_app(app)
+    # Looked up on each call so tests can patch get_mongo_collection
+    # pylint: disable-next=unnecessary-lambda
+    export.init_app(app, lambda: get_gesture_store())
+    # pylint: disable-next=unnecessary-lambda
+    ml_admission = rate_limit.init_app(app, lambda: get_mongo_collection())
 
     @app.route("/")
     def index():
         """Render landing (index) page instead of redirecting to camera."""
-        return render_template("index.html")
+        return http_cache.render_cached("index.html")
 
     @app.route("/camera")
     def camera():
         """Render the camera page."""
-        return render_template("camera.html")
+        return http_cache.render_cached("camera.html")
 
     @app.route("/whiteboard")
     def whiteboard():
         """Render the whiteboard page showing today's moods."""
-        return render_template("whiteboard.html")
+        return http_cache.render_cached("whiteboard.html")
+
+    # Recent gestures per room, so polling clients share one query per room.
+    # Posts do not refresh it: a whiteboard may lag by up to
+    # WHITEBOARD_MAX_STALENESS + WHITEBOARD_CACHE_TTL seconds, and the poster
+    # sees their own gesture from the /analyze response meanwhile.
+    whiteboard_cache = RoomCache()
+    # When each room last expired
+    expired_at = {}
+
+    def load_whiteboard(room):
+        now = time.time()
+        expire = now - expired_at.get(room, 0) >= EXPIRE_INTERVAL
+        if expire:
+            if len(expired_at) >= whiteboard_cache.max_rooms:
+                expired_at.clear()
+            expired_at[room] = now
+        return _load_recent_gestures(room, expire=expire)
 
     @app.route("/api/whiteboard", methods=["GET"])
     def get_whiteboard_data():
-        """Fetch gestures from the last 24 hours for the whiteboard."""
+        """Fetch gestures from the last 24 hours for one room's whiteboard."""
         try:
-            collection = get_mongo_collection()
-            if collection is None:
+            room = normalize_room(request.args.get("room"))
+            if room is None:
+                return jsonify({"error": "Invalid room"}), 400
+
+            recent_gestures = whiteboard_cache.get(room, lambda: load_whiteboard(room))
+            if recent_gestures is None:
                 return (
                     jsonify(
                         {
@@ -91,49 +248,22 @@ def create_app():
                     503,
                 )
 
-            # Calculate timestamp from 24 hours ago
-            twenty_four_hours_ago = time.time() - (24 * 60 * 60)
-
-            # Query MongoDB for gestures from last 24 hours
-            # First, delete entries older than 24 hours
-            collection.delete_many({"timestamp": {"$lt": twenty_four_hours_ago}})
-
-            # Fetch recent gestures
-            recent_gestures = list(
-                collection.find(
-                    {"timestamp": {"$gte": twenty_four_hours_ago}},
-                    {"_id": 0},  # Exclude MongoDB _id field
-                ).sort(
-                    "timestamp", -1
-                )  # Sort by most recent first
-            )
-
-            # Map gestures to mood emojis (using the same mapping as in database)
-            mood_map = {
-                "thumbs_up": "😄",
-                "thumbs_down": "😞",
-                "open_palm": "🙂",
-                "fist": "😤",
-                "victory": "😎",
-                "ok": "😊",
-                "point": "👉",
-            }
+            if request.args.get("format") == "compact":
+                return _compact_whiteboard(recent_gestures)
 
             # Format the gestures for display
             formatted_gestures = []
             for gesture in recent_gestures:
-                gesture_type = gesture.get("gesture", "unknown")
+                entry = resolve(gesture)
                 # Skip no_hand and unknown gestures - do nothing
-                if gesture_type in ["no_hand", "unknown", "no_image"]:
+                if not entry.visible:
                     continue
 
-                # Use emoji from database if available, otherwise map it
-                emoji = gesture.get("emoji") or mood_map.get(gesture_type, "❓")
                 formatted_gestures.append(
                     {
-                        "emoji": emoji,
-                        "gesture": gesture_type,
-                        "mood": gesture.get("mood", "unknown"),
+                        "emoji": entry.emoji,
+                        "gesture": entry.name,
+                        "mood": entry.mood,
                         "timestamp": gesture.get("timestamp"),
                         "time_ago": _format_time_ago(
                             gesture.get("timestamp", time.time())
@@ -169,20 +299,28 @@ def create_app():
         return "over 24h ago"
 
     @app.route("/analyze", methods=["POST"])
-    def analyze():
+    def analyze():  # pylint: disable=too-many-return-statements
         """Analyze the uploaded base64 image and return gesture result."""
         try:
-            data = request.get_json(force=True, silent=False)
-
-            if not data or "image" not in data:
+            # The raw body is kept (and forwarded as is); the parsed copy is
+            # not cached and is dropped once it has been validated.
+            with stage("parse_json"):
+                body = request.get_data()
+                data = request.get_json(force=True, silent=False, cache=False)
+
+            # "frames" is a clip of camera frames checked for motion gestures
+            if not data or ("image" not in data and "frames" not in data):
                 return jsonify({"error": "No image provided"}), 400
 
-            image_b64 = data["image"]
+            room = normalize_room(data.get("room"))
+            if room is None:
+                return jsonify({"error": "Invalid room"}), 400
 
             # CI mock: simulate ML server
             if os.getenv("CI") == "true":
                 try:
-                    base64.b64decode(image_b64, validate=True)
+                    for image in data.get("frames") or [data.get("image")]:
+                        base64.b64decode(image, validate=True)
                 except Exception:
                     return jsonify({"error": "Invalid base64"}), 500
 
@@ -199,13 +337,27 @@ def create_app():
                     200,
                 )
 
-            # ML server call
-            ml_response = requests.post(
-                ML_URL + "/analyze-image",
-                json={"image": image_b64},
-                timeout=30,  # Increased timeout for image processing
-            )
-            result = ml_response.json()
+            del data
+
+            # ML server call. The upload is passed through byte for byte instead
+            # of being re-serialized. X-Request-ID, minted here for this call
+            # only, lets the ML client store a hedged duplicate of it once;
+            # traceparent puts the ML client's spans under ml_request.
+            with ml_admission.slot(), stage("ml_request"):
+                ml_response = ML_POOL.post(
+                    "/analyze-image",
+                    data=body,
+                    headers={
+                        "Content-Type": "application/json",
+                        "X-Request-ID": uuid.uuid4().hex,
+                        **tracing.outgoing_headers(),
+                    },
+                    timeout=30,  # Increased timeout for image processing
+                )
+                result = ml_response.json()
+
+            if ml_response.status_code == 413:
+                return jsonify({"error": result.get("error", "Image too large")}), 413
 
             # Check for error
             if "error" in result:
@@ -213,33 +365,35 @@ def create_app():
                 return jsonify({"error": result["error"]}), 500
 
             gesture = result.get("gesture", "unknown")
-
-            emoji_map = {
-                "thumbs_up": "👍",
-                "thumbs_down": "👎",
-                "open_palm": "✋",
-                "fist": "✊",
-                "victory": "✌️",
-                "rock": "🤘",
-                "ok": "👌",
-                "point": "👉",
-                "no_hand": "❓",
-                "no_image": "❓",
-                "unknown": "❓",
+            entry = lookup(gesture)
+            response = {
+                "gesture": gesture,
+                "emoji": entry.hand,
+                "label": gesture,
+                "confidence": 1.0,
+                # The quality tier the ML client ran at; below "full" under load
+                "tier": result.get("tier"),
+                "message": "Processed successfully",
             }
-
-            return (
-                jsonify(
-                    {
-                        "gesture": gesture,
-                        "emoji": emoji_map.get(gesture, "❓"),
-                        "label": gesture,
-                        "confidence": 1.0,
-                        "message": "Processed successfully",
-                    }
-                ),
-                200,
-            )
+            if entry.visible:
+                # What the whiteboard will show for this post, so the poster's
+                # page can draw it before the (possibly lagging) reads catch up
+                response["posted"] = {
+                    "gesture": gesture,
+                    "mood": entry.mood,
+                    "emoji": entry.emoji,
+                    "timestamp": time.time(),
+                }
+            return jsonify(response), 200
+
+        except RequestEntityTooLarge:
+            return jsonify({"error": "Image too large"}), 413
+
+        except Overloaded:
+            return rate_limit.retry_later("ML service is busy", 503, 1)
+
+        except requests.Timeout:
+            return jsonify({"error": "ML service timed out"}), 504
 
         except Exception as exc:
             return jsonify({"error": str(exc)}), 500
@@ -250,4 +404,5 @@ def create_app():
 if __name__ == "__main__":  # pragma: no cover
     APP = create_app()
     port = int(os.environ.get("WEBAPP_PORT", 5000))
-    APP.run(host="0.0.0.0", port=port, debug=True)
+    # Development server only; production runs gunicorn (see gunicorn.conf.py)
+    APP.run(host="0.0.0.0", port=port, debug=os.getenv("FLASK_DEBUG") == "1")
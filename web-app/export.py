@@ -0,0 +1,156 @@
+"""Streaming NDJSON/CSV export of gesture history with keyset pagination."""
+
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import Response, jsonify, request, stream_with_context
+
+from shared.gesture_registry import BY_NAME, resolve
+from shared.gesture_store import ExportQuery
+from room_cache import normalize_room
+
+COLUMNS = ["id", "timestamp", "room", "gesture", "mood", "emoji", "score"]
+DEFAULT_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 10000
+# Rows are yielded to the server in chunks of roughly this many bytes
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_time(value):
+    """Epoch seconds or an ISO 8601 date/time (UTC unless stated) to epoch."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def parse_after(value):
+    """Split an 'after' cursor '<timestamp>:<id>' into its two keys."""
+    timestamp, _, doc_id = value.partition(":")
+    if not doc_id:
+        raise ValueError("after must look like <timestamp>:<id>")
+    try:
+        key = ObjectId(doc_id)
+    except InvalidId:
+        key = int(doc_id)
+    return float(timestamp), key
+
+
+def build_query(args):
+    """Translate export query-string arguments into an ExportQuery."""
+    filters = {}
+    if args.get("room"):
+        filters["room"] = normalize_room(args["room"])
+        if filters["room"] is None:
+            raise ValueError("invalid room")
+    if args.get("from"):
+        filters["start"] = parse_time(args["from"])
+    if args.get("to"):
+        filters["end"] = parse_time(args["to"])
+    if args.get("gesture"):
+        names = [n for n in args["gesture"].split(",") if n]
+        unknown = [n for n in names if n not in BY_NAME]
+        if unknown:
+            raise ValueError(f"unknown gesture: {', '.join(unknown)}")
+        filters["codes"] = [BY_NAME[n].code for n in names]
+        filters["names"] = names  # documents without codes
+    if args.get("after"):
+        filters["after"] = parse_after(args["after"])
+    return ExportQuery(**filters)
+
+
+def to_row(doc):
+    """Flatten a stored document into an export row."""
+    entry = resolve(doc)
+    return {
+        "id": str(doc.get("_id")),
+        "timestamp": doc.get("timestamp"),
+        "room": doc.get("room") or "main",
+        "gesture": entry.name,
+        "mood": entry.mood,
+        "emoji": entry.emoji,
+        "score": doc.get("score"),
+    }
+
+
+def _ndjson_lines(cursor):
+    for doc in cursor:
+        yield json.dumps(to_row(doc), ensure_ascii=False) + "\n"
+
+
+def _csv_lines(cursor):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    for doc in cursor:
+        writer.writerow(to_row(doc))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def _chunked(lines):
+    """Group small lines into CHUNK_SIZE pieces to cut per-write overhead."""
+    pending = []
+    size = 0
+    for line in lines:
+        pending.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(pending)
+            pending = []
+            size = 0
+    if pending:
+        yield "".join(pending)
+
+
+def init_app(app, get_store):
+    """
+    Register /api/export. get_store returns the gesture store, or None when
+    the database is down.
+    """
+
+    @app.route("/api/export", methods=["GET"])
+    def export_gestures():
+        """
+        Stream gesture history oldest first as NDJSON (default) or CSV.
+        Filters: room, from, to, gesture (comma-separated). Resume or page
+        with after=<timestamp>:<id> of the last row received; limit caps the
+        rows returned and batch_size the rows fetched per database round trip.
+        """
+        fmt = request.args.get("format", "ndjson")
+        if fmt not in ("ndjson", "csv"):
+            return jsonify({"error": "format must be ndjson or csv"}), 400
+        try:
+            query = build_query(request.args)
+            limit = int(request.args.get("limit", 0))
+            batch_size = int(request.args.get("batch_size", DEFAULT_BATCH_SIZE))
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+
+        store = get_store()
+        if store is None:
+            return jsonify({"error": "Database connection failed"}), 503
+
+        # Rows arrive batch_size at a time and are written out as they come,
+        # so memory use does not grow with the export
+        cursor = store.export(query, limit=max(limit, 0), batch_size=batch_size)
+        if fmt == "csv":
+            body = _chunked(_csv_lines(cursor))
+            mimetype = "text/csv"
+        else:
+            body = _chunked(_ndjson_lines(cursor))
+            mimetype = "application/x-ndjson"
+        response = Response(stream_with_context(body), mimetype=mimetype)
+        response.headers["Content-Disposition"] = f"attachment; filename=gestures.{fmt}"
+        return response
@@ -0,0 +1,25 @@
+"""Gunicorn settings for the web app; every value can be overridden via env."""
+
+# pylint: disable=invalid-name
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# The web app mostly waits on the ML client and MongoDB, so use threads
+worker_class = "gthread"
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# Longer than the 30 s ML request timeout so slow inferences still finish
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "45"))
+# On SIGTERM, stop accepting and give in-flight requests this long to drain
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Recycle workers periodically to cap memory growth
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+preload_app = True
+accesslog = "-"
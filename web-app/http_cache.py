@@ -0,0 +1,124 @@
+"""Response compression, ETags and cache headers for the web app."""
+
+import gzip
+import hashlib
+import os
+
+from flask import current_app, render_template, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; fall back to gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "text/html",
+    "text/css",
+    "text/plain",
+    "application/javascript",
+    "application/x-msgpack",
+}
+# Bodies smaller than this are not worth the CPU (or the extra headers)
+MIN_COMPRESS_SIZE = 512
+# Fingerprinted static URLs never change content, so cache them for a year
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+
+_static_hashes = {}
+_rendered_pages = {}
+
+
+def static_hash(static_folder, filename):
+    """Return a short content hash for a static file, cached by mtime."""
+    path = os.path.join(static_folder, filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _static_hashes.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, "rb") as f:
+        digest = hashlib.md5(f.read(), usedforsecurity=False).hexdigest()[:12]
+    _static_hashes[path] = (mtime, digest)
+    return digest
+
+
+def render_cached(template_name):
+    """
+    Render a template that takes no context once and reuse the HTML.
+    Caching is skipped in debug mode so template edits show up immediately.
+    """
+    if current_app.debug:
+        return render_template(template_name)
+    if template_name not in _rendered_pages:
+        _rendered_pages[template_name] = render_template(template_name)
+    return _rendered_pages[template_name]
+
+
+def _pick_encoding(body):
+    """Choose br or gzip for the current request, or None to send as is."""
+    if len(body) < MIN_COMPRESS_SIZE:
+        return None
+    if brotli is not None and request.accept_encodings["br"]:
+        return "br"
+    if request.accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def _compress(body, encoding):
+    """Compress body with the chosen encoding."""
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def init_app(app):
+    """Register static fingerprinting, ETags and compression on the app."""
+
+    @app.url_defaults
+    def _fingerprint_static(endpoint, values):
+        if endpoint == "static" and "filename" in values and "v" not in values:
+            digest = static_hash(app.static_folder, values["filename"])
+            if digest:
+                values["v"] = digest
+
+    @app.after_request
+    def _cache_and_compress(response):
+        if request.endpoint == "static":
+            if request.args.get("v"):
+                response.cache_control.public = True
+                response.cache_control.max_age = STATIC_MAX_AGE
+                response.cache_control.immutable = True
+            return response
+
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or response.status_code != 200
+            or response.mimetype not in COMPRESSIBLE_TYPES
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        body = response.get_data()
+        encoding = _pick_encoding(body)
+        response.vary.add("Accept-Encoding")
+
+        if request.method == "GET":
+            # Let browsers revalidate pages and polls; unchanged → 304, no body.
+            # Each encoding gets its own ETag so caches never mix them up.
+            response.cache_control.no_cache = True
+            response.add_etag()
+            if encoding:
+                etag, _ = response.get_etag()
+                response.set_etag(f"{etag}-{encoding}")
+            response.make_conditional(request)
+            if response.status_code != 200:
+                return response
+
+        if encoding:
+            response.set_data(_compress(body, encoding))
+            response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,178 @@
+"""Health-aware load balancing across ML client replicas."""
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+# Responses that mean the replica itself is unwell (a proxy or gunicorn could
+# not reach, or gave up on, the worker). Other errors, e.g. the 500 the ML
+# client returns for an undecodable image, are about the request and must not
+# get a healthy replica ejected.
+REPLICA_FAILURE_STATUSES = frozenset((502, 503, 504))
+
+
+class Replica:  # pylint: disable=too-few-public-methods
+    """One ML client endpoint and what we know about its load and health."""
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.inflight = 0
+        self.ewma = 0.0
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    def available(self, now):
+        """True unless the replica is currently ejected."""
+        return now >= self.ejected_until
+
+
+class ReplicaPool:  # pylint: disable=too-many-instance-attributes
+    """
+    Route each request to the available replica with the fewest in-flight
+    requests (ties broken by EWMA latency). Replicas are ejected after
+    consecutive failures and brought back by an active health check.
+    Optionally sends a hedged copy to a second replica when the first has
+    not answered within hedge_after seconds.
+    """
+
+    ALPHA = 0.3  # EWMA smoothing factor
+
+    def __init__(
+        self,
+        urls,
+        hedge_after=None,
+        eject_after=3,
+        eject_for=30.0,
+        health_interval=5.0,
+    ):
+        self.replicas = [Replica(url) for url in urls]
+        self.hedge_after = hedge_after
+        self.eject_after = eject_after
+        self.eject_for = eject_for
+        self.health_interval = health_interval
+        self._lock = threading.Lock()
+        self._executor = None
+        self._health_thread = None
+
+    @classmethod
+    def from_env(cls, default_url):
+        """Build a pool from ML_URLS (comma-separated) or a single URL."""
+        urls = [u.strip() for u in os.getenv("ML_URLS", "").split(",") if u.strip()]
+        hedge_ms = float(os.getenv("ML_HEDGE_AFTER_MS", "0"))
+        return cls(
+            urls or [default_url],
+            hedge_after=hedge_ms / 1000 if hedge_ms > 0 else None,
+            eject_after=int(os.getenv("ML_EJECT_AFTER", "3")),
+            eject_for=float(os.getenv("ML_EJECT_SECONDS", "30")),
+            health_interval=float(os.getenv("ML_HEALTH_INTERVAL", "5")),
+        )
+
+    def pick(self, exclude=None):
+        """Return the least-loaded available replica and count it in-flight."""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [
+                r for r in self.replicas if r is not exclude and r.available(now)
+            ]
+            if not candidates:
+                # Everything is ejected: fail open rather than refuse traffic
+                candidates = [r for r in self.replicas if r is not exclude]
+            if not candidates:
+                return None
+            replica = min(candidates, key=lambda r: (r.inflight, r.ewma))
+            replica.inflight += 1
+            return replica
+
+    def _finish(self, replica, latency, ok):
+        with self._lock:
+            replica.inflight -= 1
+            if ok:
+                replica.failures = 0
+                if not replica.ewma:
+                    replica.ewma = latency
+                else:
+                    replica.ewma = (
+                        self.ALPHA * latency + (1 - self.ALPHA) * replica.ewma
+                    )
+            else:
+                replica.failures += 1
+                if replica.failures >= self.eject_after:
+                    replica.ejected_until = time.monotonic() + self.eject_for
+
+    def _send(self, replica, path, kwargs):
+        started = time.monotonic()
+        try:
+            response = requests.post(replica.url + path, **kwargs)
+        except requests.RequestException:
+            self._finish(replica, time.monotonic() - started, ok=False)
+            raise
+        self._finish(
+            replica,
+            time.monotonic() - started,
+            ok=response.status_code not in REPLICA_FAILURE_STATUSES,
+        )
+        return response
+
+    def post(self, path, **kwargs):
+        """POST to the best replica, hedging to a second one if configured."""
+        self._ensure_health_checks()
+        replica = self.pick()
+        if not self.hedge_after or len(self.replicas) < 2:
+            return self._send(replica, path, kwargs)
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=32)
+        first = self._executor.submit(self._send, replica, path, kwargs)
+        done, _ = wait([first], timeout=self.hedge_after)
+        if done:
+            return first.result()
+
+        backup = self.pick(exclude=replica)
+        second = self._executor.submit(self._send, backup, path, kwargs)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except requests.RequestException as exc:
+                    error = exc
+        raise error
+
+    def _ensure_health_checks(self):
+        """Start the health-check thread in this process if it isn't running."""
+        if len(self.replicas) < 2 or self.health_interval <= 0:
+            return
+        # Checked on use rather than at startup so forked workers get their own
+        with self._lock:
+            if self._health_thread is None or not self._health_thread.is_alive():
+                self._health_thread = threading.Thread(
+                    target=self._health_loop, daemon=True
+                )
+                self._health_thread.start()
+
+    def _health_loop(self):
+        while True:
+            for replica in self.replicas:
+                self.check(replica)
+            time.sleep(self.health_interval)
+
+    def check(self, replica):
+        """Probe /health; eject on failure, readmit on success."""
+        try:
+            ok = requests.get(replica.url + "/health", timeout=2).status_code == 200
+        except requests.RequestException:
+            ok = False
+        with self._lock:
+            if ok:
+                replica.failures = 0
+                replica.ejected_until = 0.0
+            else:
+                replica.failures = max(replica.failures, self.eject_after)
+                replica.ejected_until = time.monotonic() + self.eject_for
+        return ok
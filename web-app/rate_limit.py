@@ -0,0 +1,304 @@
+"""Per-client token-bucket rate limits and admission control for ML calls."""
+
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from flask import Response, jsonify, request
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# rate is tokens per second, burst the bucket size
+Limit = namedtuple("Limit", ["rate", "burst"])
+
+# route=count/period[:burst], comma-separated; an empty string disables limits.
+# Buckets are per client address by default, so everyone behind one NAT (a
+# classroom, an office) shares one; RATE_LIMIT_KEY=session gives each camera
+# page its own, at the price of trusting a header the client picks.
+DEFAULT_LIMITS = "/analyze=2/s:10"
+_LIMIT_PATTERN = re.compile(r"(\d+(?:\.\d+)?)/([smh])(?::(\d+))?")
+_PERIODS = {"s": 1, "m": 60, "h": 3600}
+
+
+def parse_limits(spec):
+    """'/analyze=2/s:10,/api/export=6/m' -> {"/analyze": Limit(2.0, 10), ...}."""
+    limits = {}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        route, _, value = part.partition("=")
+        match = _LIMIT_PATTERN.fullmatch(value.strip())
+        if not route.startswith("/") or not match:
+            raise ValueError(
+                f"bad rate limit {part!r}; expected /route=N/s|m|h[:burst]"
+            )
+        count, period, burst = match.groups()
+        count = float(count)
+        limits[route.strip()] = Limit(
+            count / _PERIODS[period], int(burst) if burst else max(1, int(count))
+        )
+    return limits
+
+
+class MemoryBuckets:  # pylint: disable=too-few-public-methods
+    """
+    Token buckets held in this process. Every gunicorn worker keeps its own,
+    so a client spread over several workers gets up to workers x the limit.
+    The least recently used buckets are dropped beyond max_keys.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key, limit, now=None):
+        """Take a token; return 0 when allowed, else seconds until one refills."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit.burst, now))
+            tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / limit.rate
+            if not wait:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class MongoBuckets:  # pylint: disable=too-few-public-methods
+    """
+    Token buckets in a MongoDB collection, shared by every worker and
+    replica. Each take is a single atomic find_one_and_update; a TTL index
+    removes idle buckets. If MongoDB is unreachable requests are allowed.
+    """
+
+    COLLECTION = "rate_limits"
+    RETRY_SECONDS = 30
+
+    def __init__(self, get_collection):
+        self._get_collection = get_collection
+        self._collection = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def _buckets(self):
+        with self._lock:
+            if self._collection is None and time.monotonic() >= self._retry_at:
+                self._retry_at = time.monotonic() + self.RETRY_SECONDS
+                gestures = self._get_collection()
+                if gestures is not None:
+                    buckets = gestures.database[self.COLLECTION]
+                    buckets.create_index("expires", expireAfterSeconds=0)
+                    self._collection = buckets
+            return self._collection
+
+    @staticmethod
+    def _take(buckets, key, limit, now):
+        elapsed = {"$subtract": [now, {"$ifNull": ["$updated", now]}]}
+        refilled = {
+            "$min": [
+                limit.burst,
+                {
+                    "$add": [
+                        {"$ifNull": ["$tokens", limit.burst]},
+                        {"$multiply": [elapsed, limit.rate]},
+                    ]
+                },
+            ]
+        }
+        has_token = {"$gte": ["$tokens", 1]}
+        return buckets.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated": now}},
+                {
+                    "$set": {
+                        "allowed": has_token,
+                        "tokens": {
+                            "$cond": [
+                                has_token,
+                                {"$subtract": ["$tokens", 1]},
+                                "$tokens",
+                            ]
+                        },
+                        # A full refill plus a minute of slack
+                        "expires": datetime.now(timezone.utc)
+                        + timedelta(seconds=limit.burst / limit.rate + 60),
+                    }
+                },
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def take(self, key, limit, now=None):
+        """Take a token; return 0 when allowed, else seconds until one refills."""
+        now = time.time() if now is None else now
+        try:
+            buckets = self._buckets()
+            if buckets is None:
+                return 0.0
+            try:
+                doc = self._take(buckets, key, limit, now)
+            except DuplicateKeyError:
+                # Two first takes on a new key both tried to insert it; the
+                # bucket exists now, so the retry updates it
+                doc = self._take(buckets, key, limit, now)
+        except Exception as exc:
+            print(f"Rate limit store error: {exc}")
+            with self._lock:
+                self._collection = None
+            return 0.0
+        if doc["allowed"]:
+            return 0.0
+        return (1 - doc["tokens"]) / limit.rate
+
+
+class Overloaded(Exception):
+    """No ML slot became free within the admission wait."""
+
+
+class Admission:  # pylint: disable=too-few-public-methods
+    """
+    Cap on concurrent ML client calls from this worker. A request waits up
+    to wait seconds for a slot and is then turned away with a 503, so a
+    burst queues here briefly instead of piling onto the ML tier.
+    """
+
+    def __init__(self, limit=None, wait=None):
+        self.limit = (
+            limit if limit is not None else int(os.getenv("ML_MAX_INFLIGHT", "4"))
+        )
+        self.wait = (
+            wait
+            if wait is not None
+            else float(os.getenv("ML_ADMISSION_WAIT_MS", "1000")) / 1000
+        )
+        self._slots = threading.BoundedSemaphore(self.limit) if self.limit > 0 else None
+        self.inflight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self):
+        """Hold one ML slot for the duration of the block; raises Overloaded."""
+        if self._slots is None:
+            yield
+            return
+        if not self._slots.acquire(timeout=self.wait):
+            with self._lock:
+                self.rejected += 1
+            raise Overloaded()
+        with self._lock:
+            self.inflight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.inflight -= 1
+            self._slots.release()
+
+
+def retry_later(message, status, seconds):
+    """JSON error response with a Retry-After header (whole seconds)."""
+    response = jsonify({"error": message})
+    response.status_code = status
+    response.headers["Retry-After"] = str(max(1, math.ceil(seconds)))
+    return response
+
+
+def client_key():
+    """
+    Who a request counts against: its address, or with RATE_LIMIT_KEY=session
+    the X-Session-ID header the camera page sends (address if missing).
+    """
+    if os.getenv("RATE_LIMIT_KEY", "ip") == "session":
+        session = request.headers.get("X-Session-ID", "")
+        if 0 < len(session) <= 64:
+            return "session:" + session
+    return "ip:" + (request.remote_addr or "unknown")
+
+
+def _metrics_text(limits, outcomes, admission):
+    worker = f'worker="{os.getpid()}"'
+    lines = [
+        "# HELP webapp_rate_limit_requests_total Rate-limited route requests by outcome",
+        "# TYPE webapp_rate_limit_requests_total counter",
+    ]
+    for route in limits:
+        for outcome in ("allowed", "limited"):
+            lines.append(
+                f'webapp_rate_limit_requests_total{{{worker},route="{route}",'
+                f'outcome="{outcome}"}} {outcomes[route, outcome]}'
+            )
+    lines += [
+        "# HELP webapp_rate_limit_per_second Configured refill rate per client",
+        "# TYPE webapp_rate_limit_per_second gauge",
+    ]
+    lines += [
+        f'webapp_rate_limit_per_second{{{worker},route="{route}"}} {limit.rate:g}'
+        for route, limit in limits.items()
+    ]
+    lines += [
+        "# HELP webapp_rate_limit_burst Configured bucket size per client",
+        "# TYPE webapp_rate_limit_burst gauge",
+    ]
+    lines += [
+        f'webapp_rate_limit_burst{{{worker},route="{route}"}} {limit.burst}'
+        for route, limit in limits.items()
+    ]
+    lines += [
+        "# HELP webapp_ml_inflight ML client calls in progress",
+        "# TYPE webapp_ml_inflight gauge",
+        f"webapp_ml_inflight{{{worker}}} {admission.inflight}",
+        "# HELP webapp_ml_inflight_limit Most concurrent ML client calls (0 = no cap)",
+        "# TYPE webapp_ml_inflight_limit gauge",
+        f"webapp_ml_inflight_limit{{{worker}}} {admission.limit}",
+        "# HELP webapp_ml_admission_rejected_total Requests turned away for want of an ML slot",
+        "# TYPE webapp_ml_admission_rejected_total counter",
+        f"webapp_ml_admission_rejected_total{{{worker}}} {admission.rejected}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app, get_collection):
+    """
+    Enforce RATE_LIMITS before matching routes run and serve /metrics.
+    RATE_LIMIT_BACKEND=mongo shares buckets through MongoDB (get_collection
+    returns the gestures collection). Returns the Admission guarding ML calls.
+    """
+    limits = parse_limits(os.getenv("RATE_LIMITS", DEFAULT_LIMITS))
+    if os.getenv("RATE_LIMIT_BACKEND", "memory") == "mongo":
+        buckets = MongoBuckets(get_collection)
+    else:
+        buckets = MemoryBuckets()
+    admission = Admission()
+    outcomes = Counter()
+    outcomes_lock = threading.Lock()
+
+    @app.before_request
+    def _rate_limit():
+        rule = request.url_rule
+        limit = limits.get(rule.rule) if rule is not None else None
+        if limit is None:
+            return None
+        wait = buckets.take(f"{rule.rule}|{client_key()}", limit)
+        with outcomes_lock:
+            outcomes[rule.rule, "limited" if wait else "allowed"] += 1
+        if wait:
+            return retry_later("Too many requests", 429, wait)
+        return None
+
+    @app.route("/metrics")
+    def metrics():
+        """Rate limit and admission counters in Prometheus text format."""
+        with outcomes_lock:
+            text = _metrics_text(limits, outcomes, admission)
+        return Response(text, mimetype="text/plain; version=0.0.4")
+
+    return admission
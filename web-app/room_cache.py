@@ -0,0 +1,82 @@
+"""Short-lived per-room cache of whiteboard query results."""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_ROOM = "main"
+# Room ids travel in URLs and end up as a shard key prefix, so keep them tame
+ROOM_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def normalize_room(value):
+    """Return a valid room id, DEFAULT_ROOM for empty input, or None."""
+    if value is None or value == "":
+        return DEFAULT_ROOM
+    if isinstance(value, str) and ROOM_PATTERN.fullmatch(value):
+        return value
+    return None
+
+
+class RoomCache:  # pylint: disable=too-few-public-methods
+    """
+    Cache one value per room for ttl seconds. Each room has its own lock,
+    so only one request per room reloads an expired entry and a slow or busy
+    room never holds up the others. At most max_rooms rooms are kept.
+    """
+
+    def __init__(self, ttl=None, max_rooms=None):
+        self.ttl = (
+            ttl if ttl is not None else float(os.getenv("WHITEBOARD_CACHE_TTL", "2"))
+        )
+        self.max_rooms = max_rooms or int(os.getenv("WHITEBOARD_CACHE_ROOMS", "1000"))
+        self._entries = OrderedDict()  # room -> (expires_at, value)
+        self._room_locks = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, room, now):
+        with self._lock:
+            entry = self._entries.get(room)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(room)
+                return entry
+            return None
+
+    def _room_lock(self, room):
+        with self._lock:
+            lock = self._room_locks.get(room)
+            if lock is None:
+                if len(self._room_locks) >= 2 * self.max_rooms:
+                    # Forget locks of rooms that never got cached
+                    self._room_locks = {
+                        r: l for r, l in self._room_locks.items() if r in self._entries
+                    }
+                lock = self._room_locks[room] = threading.Lock()
+            return lock
+
+    def get(self, room, load):
+        """Return the cached value for room, calling load() when stale."""
+        if self.ttl <= 0:
+            return load()
+        entry = self._fresh(room, time.monotonic())
+        if entry:
+            return entry[1]
+        with self._room_lock(room):
+            # Another request may have reloaded it while we waited
+            entry = self._fresh(room, time.monotonic())
+            if entry:
+                return entry[1]
+            value = load()
+            if value is not None:
+                self._store(room, value)
+            return value
+
+    def _store(self, room, value):
+        with self._lock:
+            self._entries[room] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(room)
+            while len(self._entries) > self.max_rooms:
+                oldest, _ = self._entries.popitem(last=False)
+                self._room_locks.pop(oldest, None)
@@ -1,13 +1,19 @@
-# pylint: disable=redefined-outer-name
+# pylint: disable=redefined-outer-name,protected-access
 
 """Tests for the Flask web app."""
 
+import gzip
+import json
 import os
+import re
 import time
 from unittest.mock import Mock, patch, MagicMock
 
 import pytest
-from app import create_app
+from shared.gesture_registry import HIDDEN_CODES, lookup
+from shared.gesture_store import read_preference
+import http_cache
+from app import create_app, get_mongo_collection
 
 
 @pytest.fixture
@@ -210,7 +216,7 @@ def test_analyze_with_ml_server_unknown_gesture(flask_client):
         "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42"
         "mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
     )
-    mock_response = Mock()
+    mock_response = Mock(status_code=200)
     mock_response.json.return_value = {"gesture": "unknown_gesture"}
 
     with patch.dict(os.environ, {"CI": ""}):
@@ -224,6 +230,20 @@ def test_analyze_with_ml_server_unknown_gesture(flask_client):
             data = response.get_json()
             assert data["gesture"] == "unknown_gesture"
             assert data["emoji"] == "❓"
+            # Hidden from the whiteboard, so nothing for the poster to draw
+            assert "posted" not in data
+            assert data["tier"] is None
+
+
+def test_analyze_passes_quality_tier_through(flask_client):
+    """The ML client's quality tier reaches the camera page."""
+    mock_response = Mock(status_code=200)
+    mock_response.json.return_value = {"gesture": "fist", "tier": "reduced"}
+
+    with patch.dict(os.environ, {"CI": ""}):
+        with patch("app.requests.post", return_value=mock_response):
+            response = flask_client.post("/analyze", json={"image": "aGk="})
+    assert response.get_json()["tier"] == "reduced"
 
 
 def test_format_time_ago_just_now(flask_client):
@@ -390,7 +410,7 @@ def test_analyze_different_gesture_types(flask_client):
     ]
 
     for gesture_type in gesture_types:
-        mock_response = Mock()
+        mock_response = Mock(status_code=200)
         mock_response.json.return_value = {"gesture": gesture_type}
 
         with patch.dict(os.environ, {"CI": ""}):
@@ -404,3 +424,401 @@ def test_analyze_different_gesture_types(flask_client):
                 data = response.get_json()
                 assert data["gesture"] == gesture_type
                 assert "emoji" in data
+
+
+def test_admin_profile_disabled_without_token(flask_client):
+    """Profiling endpoint is hidden when ADMIN_TOKEN is unset."""
+    with patch.dict(os.environ, {"ADMIN_TOKEN": ""}):
+        response = flask_client.get("/admin/profile")
+        assert response.status_code == 404
+
+
+def test_admin_profile_records_stages(flask_client):
+    """Profiling the next request reports the whiteboard query stage."""
+    mock_collection = MagicMock()
+    mock_collection.find.return_value.sort.return_value = []
+    headers = {"X-Admin-Token": "secret"}
+
+    with patch.dict(os.environ, {"ADMIN_TOKEN": "secret"}):
+        response = flask_client.post(
+            "/admin/profile", json={"requests": 1}, headers=headers
+        )
+        assert response.status_code == 202
+
+        with patch("app.get_mongo_collection", return_value=mock_collection):
+            flask_client.get("/api/whiteboard")
+
+        data = flask_client.get("/admin/profile", headers=headers).get_json()
+        assert data["active"] is False
+        assert data["stages"]["mongo_query"]["count"] == 1
+
+
+def test_analyze_payload_too_large(flask_client):
+    """Bodies over MAX_CONTENT_LENGTH are rejected with 413."""
+    flask_client.application.config["MAX_CONTENT_LENGTH"] = 64
+    response = flask_client.post("/analyze", json={"image": "A" * 256})
+    assert response.status_code == 413
+
+
+def test_wsgi_exposes_app():
+    """wsgi.app is the production entry point."""
+    import wsgi  # pylint: disable=import-outside-toplevel
+
+    assert wsgi.app.url_map is not None
+
+
+def _many_gestures(count):
+    """Build a whiteboard-sized list of mock gesture documents."""
+    now = time.time()
+    return [
+        {
+            "gesture": "thumbs_up",
+            "emoji": "😄",
+            "mood": "happy",
+            "timestamp": now - i,
+        }
+        for i in range(count)
+    ]
+
+
+def test_whiteboard_api_gzip(flask_client):
+    """Large JSON responses are gzipped when the client accepts it."""
+    mock_collection = MagicMock()
+    mock_collection.find.return_value.sort.return_value = _many_gestures(50)
+
+    with patch("app.get_mongo_collection", return_value=mock_collection):
+        response = flask_client.get(
+            "/api/whiteboard", headers={"Accept-Encoding": "gzip"}
+        )
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    data = json.loads(gzip.decompress(response.data))
+    assert data["count"] == 50
+
+
+def test_whiteboard_api_not_compressed_without_accept(flask_client):
+    """Clients that do not ask for compression get plain JSON."""
+    mock_collection = MagicMock()
+    mock_collection.find.return_value.sort.return_value = _many_gestures(50)
+
+    with patch("app.get_mongo_collection", return_value=mock_collection):
+        response = flask_client.get("/api/whiteboard")
+    assert "Content-Encoding" not in response.headers
+    assert response.get_json()["count"] == 50
+
+
+def test_page_etag_revalidation(flask_client):
+    """An unchanged page answers If-None-Match with 304 and no body."""
+    first = flask_client.get("/camera")
+    etag = first.headers["ETag"]
+    second = flask_client.get("/camera", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.data == b""
+
+
+def test_static_urls_are_fingerprinted(flask_client):
+    """Pages link CSS with a content hash and those URLs are cached for a year."""
+    page = flask_client.get("/").data.decode()
+    match = re.search(r'href="(/static/style\.css\?v=[0-9a-f]+)"', page)
+    assert match
+
+    response = flask_client.get(match.group(1))
+    assert response.status_code == 200
+    assert response.cache_control.max_age == 365 * 24 * 60 * 60
+    assert response.cache_control.immutable
+    response.close()
+
+
+def test_templates_rendered_once(flask_client):
+    """Repeat page loads reuse the rendered HTML."""
+    with patch.dict(http_cache._rendered_pages, clear=True):
+        with patch("http_cache.render_template", return_value="<html></html>") as r:
+            flask_client.get("/whiteboard")
+            flask_client.get("/whiteboard")
+    r.assert_called_once_with("whiteboard.html")
+
+
+def test_whiteboard_api_brotli(flask_client):
+    """Brotli is preferred when available and accepted."""
+    brotli = pytest.importorskip("brotli")
+    mock_collection = MagicMock()
+    mock_collection.find.return_value.sort.return_value = _many_gestures(50)
+
+    with patch("app.get_mongo_collection", return_value=mock_collection):
+        response = flask_client.get(
+            "/api/whiteboard", headers={"Accept-Encoding": "gzip, br"}
+        )
+    assert response.headers["Content-Encoding"] == "br"
+    assert json.loads(brotli.decompress(response.data))["count"] == 50
+
+
+def test_whiteboard_api_compact_format(flask_client):
+    """format=compact returns parallel arrays and a legend."""
+    current_time = time.time()
+    mock_gestures = [
+        {"gesture": "fist", "mood": "stressed", "timestamp": current_time - 60},
+        {"gesture": "no_hand", "mood": "unknown", "timestamp": current_time - 90},
+        {"gesture": "ok", "mood": "content", "timestamp": current_time - 120},
+        {"gesture": "fist", "mood": "stressed", "timestamp": current_time - 180},
+    ]
+    mock_collection = MagicMock()
+    mock_collection.find.return_value.sort.return_value = mock_gestures
+
+    with patch("app.get_mongo_collection", return_value=mock_collection):
+        response = flask_client.get("/api/whiteboard?format=compact")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["count"] == 3
+    assert data["g"] == [0, 1, 0]
+    assert data["legend"] == [["fist", "stressed", "😤"], ["ok", "content", "😊"]]
+    assert data["t"] == [
+        int(g["timestamp"]) for g in mock_gestures if g["mood"] != "unknown"
+    ]
+    assert "time_ago" not in data
+    assert "now" not in data
+    assert abs(int(response.headers["X-Server-Time"]) - current_time) < 60
+
+
+def test_whiteboard_api_compact_revalidates(flask_client):
+    """The server clock is outside the body, so unchanged polls get a 304."""
+    mock_collection = MagicMock()
+    mock_collection.find.return_value.sort.return_value = _many_gestures(3)
+
+    with patch("app.get_mongo_collection", return_value=mock_collection):
+        first = flask_client.get("/api/whiteboard?format=compact")
+        with patch("app.time.time", return_value=time.time() + 5):
+            again = flask_client.get(
+                "/api/whiteboard?format=compact",
+                headers={"If-None-Match": first.headers["ETag"]},
+            )
+    assert again.status_code == 304
+    assert int(again.headers["X-Server-Time"]) > int(first.headers["X-Server-Time"])
+
+
+def test_whiteboard_api_compact_msgpack(flask_client):
+    """Compact responses are MessagePack-encoded on request."""
+    msgpack = pytest.importorskip("msgpack")
+    mock_collection = MagicMock()
+    mock_collection.find.return_value.sort.return_value = _many_gestures(3)
+
+    with patch("app.get_mongo_collection", return_value=mock_collection):
+        response = flask_client.get(
+            "/api/whiteboard?format=compact",
+            headers={"Accept": "application/x-msgpack"},
+        )
+    assert response.mimetype == "application/x-msgpack"
+    data = msgpack.unpackb(response.data)
+    assert data["count"] == 3
+    assert data["legend"] == [["thumbs_up", "happy", "😄"]]
+
+
+def test_analyze_forwards_raw_body(flask_client):
+    """The upload is passed to the ML client unchanged, with a request id."""
+    body = json.dumps({"image": "aGVsbG8="}).encode()
+    mock_response = Mock(status_code=200)
+    mock_response.json.return_value = {"gesture": "fist"}
+
+    with patch.dict(os.environ, {"CI": ""}):
+        with patch("app.requests.post", return_value=mock_response) as post:
+            response = flask_client.post(
+                "/analyze", data=body, content_type="application/json"
+            )
+
+    assert response.status_code == 200
+    kwargs = post.call_args.kwargs
+    assert kwargs["data"] == body
+    assert "json" not in kwargs
+    assert re.fullmatch(r"[0-9a-f]{32}", kwargs["headers"]["X-Request-ID"])
+
+
+def test_analyze_passes_through_413(flask_client):
+    """An image the ML client refuses as too large stays a 413."""
+    mock_response = Mock(status_code=413)
+    mock_response.json.return_value = {"error": "Image too large: 9000x9000"}
+
+    with patch.dict(os.environ, {"CI": ""}):
+        with patch("app.requests.post", return_value=mock_response):
+            response = flask_client.post("/analyze", json={"image": "aGVsbG8="})
+
+    assert response.status_code == 413
+    assert "too large" in response.get_json()["error"]
+
+
+def test_whiteboard_api_resolves_gesture_codes(flask_client):
+    """Documents storing only a registry code are expanded at read time."""
+    now = time.time()
+    mock_collection = MagicMock()
+    mock_collection.find.return_value.sort.return_value = [
+        {"code": lookup("point").code, "timestamp": now - 10},
+        {"gesture": "fist", "mood": "stressed", "timestamp": now - 20},
+    ]
+
+    with patch("app.get_mongo_collection", return_value=mock_collection):
+        data = flask_client.get("/api/whiteboard").get_json()
+        compact = flask_client.get("/api/whiteboard?format=compact").get_json()
+
+    query = mock_collection.find.call_args[0][0]
+    assert query["code"] == {"$nin": HIDDEN_CODES}
+    assert [(g["gesture"], g["mood"], g["emoji"]) for g in data["gestures"]] == [
+        ("point", "curious", "🤔"),
+        ("fist", "stressed", "😤"),
+    ]
+    assert compact["legend"] == [["point", "curious", "🤔"], ["fist", "stressed", "😤"]]
+
+
+def test_whiteboard_api_is_scoped_to_room(flask_client):
+    """?room= selects one room's documents; legacy ones belong to main."""
+    mock_collection = MagicMock()
+    mock_collection.find.return_value.sort.return_value = []
+
+    with patch("app.get_mongo_collection", return_value=mock_collection):
+        flask_client.get("/api/whiteboard?room=bio-101")
+        flask_client.get("/api/whiteboard")
+        bad = flask_client.get("/api/whiteboard?room=../etc")
+
+    queries = [c[0][0] for c in mock_collection.find.call_args_list]
+    assert queries[0]["room"] == "bio-101"
+    assert queries[1]["room"] == {"$in": ["main", None]}
+    assert list(queries[0])[0] == "room"
+    assert bad.status_code == 400
+
+
+def test_whiteboard_api_caches_per_room(flask_client):
+    """Polls of one room share a query for the TTL, posts there included."""
+    mock_collection = MagicMock()
+    mock_collection.find.return_value.sort.return_value = []
+    mock_response = Mock(status_code=200)
+    mock_response.json.return_value = {"gesture": "fist"}
+
+    with patch("app.get_mongo_collection", return_value=mock_collection):
+        for _ in range(3):
+            flask_client.get("/api/whiteboard?room=r1")
+        flask_client.get("/api/whiteboard?room=r2")
+        assert mock_collection.find.call_count == 2
+
+        with patch.dict(os.environ, {"CI": ""}):
+            with patch("app.requests.post", return_value=mock_response):
+                flask_client.post("/analyze", json={"image": "aGk=", "room": "r1"})
+        flask_client.get("/api/whiteboard?room=r1")
+        flask_client.get("/api/whiteboard?room=r2")
+        assert mock_collection.find.call_count == 2
+
+
+def test_analyze_request_ids_are_per_call(flask_client):
+    """Each call gets its own request id, whatever ids the caller sends."""
+    mock_response = Mock(status_code=200)
+    mock_response.json.return_value = {"gesture": "fist"}
+    incoming = {
+        "X-Request-ID": "a" * 32,
+        "traceparent": f"00-{'a' * 32}-{'b' * 16}-01",
+    }
+
+    with patch.dict(os.environ, {"CI": ""}):
+        with patch("app.requests.post", return_value=mock_response) as post:
+            for _ in range(3):
+                flask_client.post(
+                    "/analyze",
+                    json={"image": "aGk=", "request_id": "a" * 32},
+                    headers=incoming,
+                )
+
+    sent = [c.kwargs["headers"]["X-Request-ID"] for c in post.call_args_list]
+    assert len(set(sent)) == 3
+    assert "a" * 32 not in sent
+
+
+def test_analyze_forwards_motion_clip(flask_client):
+    """A clip of frames goes to the ML client as one request."""
+    body = json.dumps({"frames": ["aGk=", "aGk="], "room": "r1"}).encode()
+    mock_response = Mock(status_code=200)
+    mock_response.json.return_value = {"gesture": "wave"}
+
+    with patch.dict(os.environ, {"CI": ""}):
+        with patch("app.requests.post", return_value=mock_response) as post:
+            response = flask_client.post(
+                "/analyze", data=body, content_type="application/json"
+            )
+
+    assert response.status_code == 200
+    assert post.call_count == 1
+    assert post.call_args.kwargs["data"] == body
+
+
+def test_analyze_rejects_invalid_room(flask_client):
+    """Room ids are validated before anything is sent to the ML client."""
+    with patch("app.requests.post") as post:
+        response = flask_client.post(
+            "/analyze", json={"image": "aGk=", "room": "<script>"}
+        )
+    assert response.status_code == 400
+    post.assert_not_called()
+
+
+def test_whiteboard_expiry_follows_retention(flask_client):
+    """Gestures are deleted after RETENTION_HOURS, not after 24 hours."""
+    mock_collection = MagicMock()
+    mock_collection.find.return_value.sort.return_value = []
+
+    with patch("app.get_mongo_collection", return_value=mock_collection):
+        with patch("app.RETENTION_HOURS", 48):
+            flask_client.get("/api/whiteboard?room=r1")
+        with patch("app.RETENTION_HOURS", 0):
+            flask_client.get("/api/whiteboard?room=r2")
+
+    cutoff = mock_collection.delete_many.call_args[0][0]["timestamp"]["$lt"]
+    assert abs(cutoff - (time.time() - 48 * 3600)) < 60
+    assert mock_collection.delete_many.call_count == 1
+    since = mock_collection.find.call_args[0][0]["timestamp"]["$gte"]
+    assert abs(since - (time.time() - 24 * 3600)) < 60
+
+
+def test_whiteboard_reads_follow_read_preference():
+    """Every poll, a poster's included, reads with the configured preference."""
+    mock_collection = MagicMock()
+    secondary = mock_collection.with_options.return_value
+    secondary.find.return_value.sort.return_value = []
+    mock_response = Mock(status_code=200)
+    mock_response.json.return_value = {"gesture": "fist"}
+    reads = read_preference("secondaryPreferred", 120)
+
+    with patch.dict(os.environ, {"WHITEBOARD_CACHE_TTL": "0"}):
+        client = create_app().test_client()
+    with patch("app.get_mongo_collection", return_value=mock_collection):
+        with patch("app.WHITEBOARD_READS", reads):
+            client.get("/api/whiteboard?room=r1")
+            with patch.dict(os.environ, {"CI": ""}):
+                with patch("app.requests.post", return_value=mock_response):
+                    posted = client.post(
+                        "/analyze", json={"image": "aGk=", "room": "r1"}
+                    )
+            client.get("/api/whiteboard?room=r1")
+
+    mock_collection.with_options.assert_called_with(read_preference=reads)
+    assert secondary.find.call_count == 2
+    mock_collection.find.assert_not_called()
+    # The poster draws their own gesture until the reads catch up
+    assert posted.get_json()["posted"]["emoji"] == lookup("fist").emoji
+    # Expiry deletes on the primary, and only once per EXPIRE_INTERVAL
+    assert mock_collection.delete_many.call_count == 1
+    secondary.delete_many.assert_not_called()
+
+
+def test_read_preference_parsing():
+    """Staleness limits need a secondary-reading mode and MongoDB's minimum."""
+    assert read_preference("primary") is None
+    assert read_preference("nearest", 90).max_staleness == 90
+    assert read_preference("secondary").max_staleness == -1
+    for mode, staleness in (("primary", 120), ("secondary", 30), ("replica", 0)):
+        with pytest.raises(ValueError):
+            read_preference(mode, staleness)
+
+
+def test_mongo_client_reused():
+    """Each worker pings MongoDB once and keeps its client and pool."""
+    with patch.dict(os.environ, {"CONN_STR": "mongodb://reuse-test:27017/db"}):
+        with patch("app.MongoClient") as mongo_client:
+            first = get_mongo_collection()
+            second = get_mongo_collection()
+    assert mongo_client.call_count == 1
+    assert mongo_client.return_value.admin.command.call_count == 1
+    assert first is second
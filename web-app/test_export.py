@@ -0,0 +1,142 @@
+# pylint: disable=redefined-outer-name
+
+"""Tests for the streaming gesture export."""
+
+import csv
+import io
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from bson import ObjectId
+from shared import gesture_store
+from shared.gesture_registry import lookup
+from app import create_app
+import export
+
+DOCS = [
+    {
+        "_id": ObjectId("6650f0a0a0a0a0a0a0a0a0a1"),
+        "timestamp": 1700000000.5,
+        "room": "bio-101",
+        "code": lookup("thumbs_up").code,
+        "score": 0.9,
+    },
+    {
+        "_id": ObjectId("6650f0a0a0a0a0a0a0a0a0a2"),
+        "timestamp": 1700000001.0,
+        "gesture": "fist",
+        "mood": "stressed",
+        "emoji": "😤",
+    },
+]
+
+
+@pytest.fixture
+def flask_client():
+    """Fixture to create the Flask test client."""
+    flask_app = create_app()
+    flask_app.config.update({"TESTING": True})
+    return flask_app.test_client()
+
+
+@pytest.fixture
+def mock_collection():
+    """Collection whose find() yields DOCS."""
+    collection = MagicMock()
+    collection.find.return_value = iter(DOCS)
+    with patch("app.get_mongo_collection", return_value=collection):
+        yield collection
+
+
+def test_export_ndjson(flask_client, mock_collection):
+    """Default format is one JSON object per line, codes resolved."""
+    response = flask_client.get("/api/export")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert response.is_streamed
+    rows = [
+        json.loads(line) for line in response.get_data(as_text=True).split("\n")[:-1]
+    ]
+    assert [r["gesture"] for r in rows] == ["thumbs_up", "fist"]
+    assert rows[0]["room"] == "bio-101"
+    assert rows[1]["room"] == "main"
+    assert rows[1]["emoji"] == "😤"
+
+    args, kwargs = mock_collection.find.call_args
+    assert args == ({}, gesture_store.EXPORT_FIELDS)
+    assert kwargs["sort"] == [("timestamp", 1), ("_id", 1)]
+    assert kwargs["batch_size"] == export.DEFAULT_BATCH_SIZE
+    assert kwargs["limit"] == 0
+
+
+def test_export_csv(flask_client, mock_collection):
+    """CSV has a header row and one row per document."""
+    response = flask_client.get("/api/export?format=csv&batch_size=50000")
+    assert response.mimetype == "text/csv"
+    assert "gestures.csv" in response.headers["Content-Disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [r["id"] for r in rows] == [str(d["_id"]) for d in DOCS]
+    assert float(rows[0]["timestamp"]) == DOCS[0]["timestamp"]
+    assert mock_collection.find.call_args[1]["batch_size"] == export.MAX_BATCH_SIZE
+
+
+def test_export_filters_and_cursor(flask_client, mock_collection):
+    """Room, time range, gesture and after= combine into one query."""
+    last = DOCS[0]
+    flask_client.get(
+        "/api/export?room=bio-101&from=2023-11-14&to=1700001000"
+        f"&gesture=fist,ok&after={last['timestamp']}:{last['_id']}&limit=10"
+    )
+    args, kwargs = mock_collection.find.call_args
+    room, time_range, gestures, after = args[0]["$and"]
+    assert room == {"room": "bio-101"}
+    assert time_range == {"timestamp": {"$gte": 1699920000.0, "$lt": 1700001000.0}}
+    assert gestures["$or"][0] == {
+        "code": {"$in": [lookup("fist").code, lookup("ok").code]}
+    }
+    assert after == {
+        "$or": [
+            {"timestamp": {"$gt": last["timestamp"]}},
+            {"timestamp": last["timestamp"], "_id": {"$gt": last["_id"]}},
+        ]
+    }
+    assert kwargs["limit"] == 10
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "format=xml",
+        "room=../etc",
+        "gesture=jazz_hands",
+        "after=nonsense",
+        "from=yesterday",
+        "limit=lots",
+    ],
+)
+def test_export_rejects_bad_parameters(flask_client, mock_collection, query):
+    """Invalid parameters are a 400 and never reach the database."""
+    response = flask_client.get(f"/api/export?{query}")
+    assert response.status_code == 400
+    mock_collection.find.assert_not_called()
+
+
+def test_export_no_db(flask_client):
+    """503 when MongoDB is unreachable."""
+    with patch("app.get_mongo_collection", return_value=None):
+        response = flask_client.get("/api/export")
+    assert response.status_code == 503
+
+
+def test_export_chunks_output():
+    """Many small rows are written out in CHUNK_SIZE pieces."""
+    lines = ["x" * 100 + "\n"] * 2000
+    chunks = list(export._chunked(iter(lines)))  # pylint: disable=protected-access
+    assert "".join(chunks) == "".join(lines)
+    assert len(chunks) == -(-len(lines) * 101 // export.CHUNK_SIZE)
+
+
+def test_parse_after_accepts_integer_ids():
+    """Stores with integer ids (the load-test stub) page the same way."""
+    assert export.parse_after("1700000000.5:42") == (1700000000.5, 42)
@@ -0,0 +1,47 @@
+"""Tests for the web app reading from the embedded SQLite gesture store."""
+
+import json
+import os
+import time
+from unittest.mock import patch
+
+from shared.gesture_registry import lookup
+from shared.gesture_store import sqlite_store
+from app import create_app
+
+
+def test_whiteboard_and_export_from_sqlite(tmp_path):
+    """With GESTURE_STORE=sqlite no MongoDB is needed to read gestures."""
+    env = {"GESTURE_STORE": "sqlite", "SQLITE_PATH": str(tmp_path / "g.db")}
+    now = time.time()
+    with patch.dict(os.environ, env):
+        store = sqlite_store()
+        for offset, name, room in (
+            (60, "fist", "main"),
+            (30, "no_hand", "main"),
+            (10, "ok", "bio-101"),
+            (100 * 24 * 3600, "fist", "main"),  # past retention
+        ):
+            store.add(
+                {"room": room, "code": lookup(name).code, "timestamp": now - offset}
+            )
+        flask_client = create_app().test_client()
+
+        with patch("app.get_mongo_collection") as mongo:
+            board = flask_client.get("/api/whiteboard?room=main").get_json()
+            exported = flask_client.get("/api/export").get_data(as_text=True)
+        mongo.assert_not_called()
+
+    assert [g["gesture"] for g in board["gestures"]] == ["fist"]
+    rows = [json.loads(line) for line in exported.splitlines()]
+    assert [(r["room"], r["gesture"]) for r in rows] == [
+        ("main", "fist"),
+        ("main", "no_hand"),
+        ("bio-101", "ok"),
+    ]
+    after = f"{rows[0]['timestamp']}:{rows[0]['id']}"
+    with patch.dict(os.environ, env):
+        page = flask_client.get(f"/api/export?after={after}&room=main")
+    assert [
+        json.loads(line)["gesture"] for line in page.get_data(as_text=True).splitlines()
+    ] == ["no_hand"]
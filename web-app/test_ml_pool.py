@@ -0,0 +1,98 @@
+"""Tests for routing requests across ML client replicas."""
+
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+from ml_pool import ReplicaPool
+
+
+def test_picks_least_loaded_replica():
+    """Requests go to the replica with the fewest in-flight requests."""
+    pool = ReplicaPool(["http://a", "http://b"])
+    first = pool.pick()
+    second = pool.pick()
+    assert {first.url, second.url} == {"http://a", "http://b"}
+
+
+def test_ewma_breaks_ties():
+    """With equal in-flight counts, the faster replica wins."""
+    pool = ReplicaPool(["http://slow", "http://fast"])
+    slow, fast = pool.replicas
+    slow.ewma, fast.ewma = 2.0, 0.1
+    assert pool.pick() is fast
+
+
+def test_ejects_after_consecutive_failures():
+    """A replica that keeps failing stops receiving traffic."""
+    pool = ReplicaPool(["http://bad", "http://good"], eject_after=2, health_interval=0)
+    bad = pool.replicas[0]
+
+    with patch("ml_pool.requests.post", side_effect=requests.ConnectionError):
+        for _ in range(2):
+            replica = pool.pick(exclude=pool.replicas[1])
+            with pytest.raises(requests.ConnectionError):
+                pool._send(replica, "/analyze-image", {})  # pylint: disable=W0212
+
+    assert not bad.available(time.monotonic())
+    assert pool.pick() is pool.replicas[1]
+
+
+def test_bad_requests_do_not_eject():
+    """Errors about the request itself leave the replica in rotation."""
+    pool = ReplicaPool(["http://a", "http://b"], eject_after=2, health_interval=0)
+    replica = pool.replicas[0]
+
+    with patch("ml_pool.requests.post", return_value=Mock(status_code=500)):
+        for _ in range(3):
+            pool._send(replica, "/analyze-image", {})  # pylint: disable=W0212
+    assert replica.available(time.monotonic())
+
+    with patch("ml_pool.requests.post", return_value=Mock(status_code=503)):
+        for _ in range(2):
+            pool._send(replica, "/analyze-image", {})  # pylint: disable=W0212
+    assert not replica.available(time.monotonic())
+
+
+def test_all_ejected_fails_open():
+    """If every replica is ejected, traffic still goes somewhere."""
+    pool = ReplicaPool(["http://a"])
+    pool.replicas[0].ejected_until = time.monotonic() + 60
+    assert pool.pick() is pool.replicas[0]
+
+
+def test_health_check_readmits_replica():
+    """A passing /health probe brings an ejected replica back."""
+    pool = ReplicaPool(["http://a", "http://b"])
+    replica = pool.replicas[0]
+    replica.ejected_until = time.monotonic() + 60
+    with patch("ml_pool.requests.get", return_value=Mock(status_code=200)):
+        assert pool.check(replica)
+    assert replica.available(time.monotonic())
+
+
+def test_hedged_request_returns_faster_replica():
+    """A slow first replica is raced by a hedged copy to the second."""
+    pool = ReplicaPool(["http://slow", "http://fast"], hedge_after=0.05)
+    pool.replicas[1].ewma = 1.0  # make sure the slow one is picked first
+    pool._health_thread = Mock(is_alive=lambda: True)  # pylint: disable=W0212
+
+    def fake_post(url, **_kwargs):
+        if url.startswith("http://slow"):
+            time.sleep(0.5)
+            return Mock(status_code=200, url=url)
+        return Mock(status_code=200, url=url)
+
+    with patch("ml_pool.requests.post", side_effect=fake_post):
+        response = pool.post("/analyze-image", json={}, timeout=1)
+    assert response.url == "http://fast/analyze-image"
+
+
+def test_from_env_reads_replica_list():
+    """ML_URLS configures several replicas."""
+    env = {"ML_URLS": "http://m1:80, http://m2:80", "ML_HEDGE_AFTER_MS": "250"}
+    with patch.dict("os.environ", env):
+        pool = ReplicaPool.from_env("http://default")
+    assert [r.url for r in pool.replicas] == ["http://m1:80", "http://m2:80"]
+    assert pool.hedge_after == 0.25
@@ -0,0 +1,209 @@
+"""Tests for rate limiting, ML admission control and /metrics."""
+
+import os
+import threading
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+import rate_limit
+from rate_limit import Admission, Limit, MemoryBuckets, MongoBuckets, Overloaded
+from app import create_app
+
+
+def make_client(**env):
+    """Test client for an app created with the given environment."""
+    with patch.dict(os.environ, env):
+        flask_app = create_app()
+    flask_app.config.update({"TESTING": True})
+    return flask_app.test_client()
+
+
+def test_parse_limits():
+    """count/period[:burst]; burst defaults to one period's count."""
+    assert rate_limit.parse_limits("/analyze=2/s:10, /api/export=6/m") == {
+        "/analyze": Limit(2.0, 10),
+        "/api/export": Limit(0.1, 6),
+    }
+    assert not rate_limit.parse_limits("")
+    for bad in ("analyze=2/s", "/analyze=2/day", "/analyze"):
+        with pytest.raises(ValueError):
+            rate_limit.parse_limits(bad)
+
+
+def test_memory_buckets_burst_then_refill():
+    """A full bucket allows burst requests, then refills at rate."""
+    buckets = MemoryBuckets()
+    limit = Limit(rate=2.0, burst=3)
+    assert [buckets.take("a", limit, now=0.0) for _ in range(3)] == [0.0] * 3
+    assert buckets.take("a", limit, now=0.0) == pytest.approx(0.5)
+    assert buckets.take("b", limit, now=0.0) == 0.0  # other clients unaffected
+    assert buckets.take("a", limit, now=0.5) == 0.0
+    assert buckets.take("a", limit, now=0.5) > 0
+    assert buckets.take("a", limit, now=100.0) == 0.0
+
+
+def test_memory_buckets_are_bounded():
+    """Least recently used buckets are dropped beyond max_keys."""
+    buckets = MemoryBuckets(max_keys=2)
+    limit = Limit(rate=1.0, burst=1)
+    for key in ("a", "b", "c"):
+        buckets.take(key, limit, now=0.0)
+    assert buckets.take("a", limit, now=0.0) == 0.0  # forgotten, so full again
+    assert buckets.take("c", limit, now=0.0) > 0
+
+
+def test_mongo_buckets_atomic_update():
+    """One find_one_and_update per take; the result decides the wait."""
+    buckets_collection = MagicMock()
+    gestures = MagicMock()
+    gestures.database.__getitem__.return_value = buckets_collection
+    store = MongoBuckets(lambda: gestures)
+    limit = Limit(rate=2.0, burst=5)
+
+    buckets_collection.find_one_and_update.return_value = {
+        "allowed": True,
+        "tokens": 4.0,
+    }
+    assert store.take("/analyze|ip:1", limit, now=10.0) == 0.0
+    buckets_collection.find_one_and_update.return_value = {
+        "allowed": False,
+        "tokens": 0.5,
+    }
+    assert store.take("/analyze|ip:1", limit, now=10.0) == pytest.approx(0.25)
+
+    buckets_collection.create_index.assert_called_once_with(
+        "expires", expireAfterSeconds=0
+    )
+    query, pipeline = buckets_collection.find_one_and_update.call_args[0]
+    assert query == {"_id": "/analyze|ip:1"}
+    assert pipeline[0]["$set"]["updated"] == 10.0
+    assert buckets_collection.find_one_and_update.call_args[1]["upsert"] is True
+
+
+def test_mongo_buckets_fail_open():
+    """Store errors and an unreachable MongoDB let requests through."""
+    assert MongoBuckets(lambda: None).take("k", Limit(1.0, 1)) == 0.0
+    gestures = MagicMock()
+    gestures.database.__getitem__.return_value.find_one_and_update.side_effect = (
+        Exception("down")
+    )
+    assert MongoBuckets(lambda: gestures).take("k", Limit(1.0, 1)) == 0.0
+
+
+def test_mongo_buckets_retry_insert_race():
+    """Losing the race to create a bucket is retried, not treated as an outage."""
+    buckets_collection = MagicMock()
+    gestures = MagicMock()
+    gestures.database.__getitem__.return_value = buckets_collection
+    buckets_collection.find_one_and_update.side_effect = [
+        DuplicateKeyError("E11000"),
+        {"allowed": False, "tokens": 0.0},
+        {"allowed": False, "tokens": 0.0},
+    ]
+    store = MongoBuckets(lambda: gestures)
+
+    assert store.take("k", Limit(1.0, 1), now=0.0) == pytest.approx(1.0)
+    assert store.take("k", Limit(1.0, 1), now=0.0) == pytest.approx(1.0)
+    assert buckets_collection.find_one_and_update.call_count == 3
+
+
+def test_admission_caps_inflight():
+    """Only limit callers hold a slot; others give up after wait."""
+    admission = Admission(limit=1, wait=0.01)
+    entered = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with admission.slot():
+            entered.set()
+            release.wait(1)
+
+    worker = threading.Thread(target=hold)
+    worker.start()
+    entered.wait(1)
+    assert admission.inflight == 1
+    with pytest.raises(Overloaded):
+        with admission.slot():
+            pass
+    release.set()
+    worker.join()
+    with admission.slot():
+        assert admission.inflight == 1
+    assert admission.inflight == 0
+    assert admission.rejected == 1
+
+
+def test_analyze_rate_limited_with_retry_after():
+    """Past the burst, /analyze answers 429 without reading the image."""
+    flask_client = make_client(RATE_LIMITS="/analyze=1/m:2")
+    with patch.dict(os.environ, {"CI": "true"}):
+        statuses = [
+            flask_client.post("/analyze", json={"image": "aGk="}).status_code
+            for _ in range(3)
+        ]
+        limited = flask_client.post("/analyze", json={"image": "aGk="})
+    assert statuses == [200, 200, 429]
+    assert 1 <= int(limited.headers["Retry-After"]) <= 60
+    # Other routes are not limited
+    assert flask_client.get("/camera").status_code == 200
+
+
+def test_rate_limit_keyed_by_session():
+    """With RATE_LIMIT_KEY=session each camera session has its own bucket."""
+    flask_client = make_client(RATE_LIMITS="/analyze=1/m:1")
+    with patch.dict(os.environ, {"RATE_LIMIT_KEY": "session", "CI": "true"}):
+        first = [
+            flask_client.post(
+                "/analyze", json={"image": "aGk="}, headers={"X-Session-ID": sid}
+            ).status_code
+            for sid in ("s1", "s2", "s1")
+        ]
+    assert first == [200, 200, 429]
+
+
+def test_analyze_busy_ml_tier_returns_503():
+    """No free ML slot within the wait is a 503 with Retry-After."""
+    flask_client = make_client(
+        RATE_LIMITS="", ML_MAX_INFLIGHT="1", ML_ADMISSION_WAIT_MS="0"
+    )
+    release = threading.Event()
+    entered = threading.Event()
+    mock_response = Mock(status_code=200)
+    mock_response.json.return_value = {"gesture": "fist"}
+
+    def slow_post(*_args, **_kwargs):
+        entered.set()
+        release.wait(1)
+        return mock_response
+
+    with patch.dict(os.environ, {"CI": ""}), patch(
+        "app.ML_POOL.post", side_effect=slow_post
+    ):
+        worker = threading.Thread(
+            target=flask_client.post,
+            args=("/analyze",),
+            kwargs={"json": {"image": "aGk="}},
+        )
+        worker.start()
+        entered.wait(1)
+        busy = flask_client.post("/analyze", json={"image": "aGk="})
+        release.set()
+        worker.join()
+
+    assert busy.status_code == 503
+    assert busy.headers["Retry-After"] == "1"
+
+
+def test_metrics_endpoint():
+    """/metrics exposes per-route outcomes and the ML admission state."""
+    flask_client = make_client(RATE_LIMITS="/analyze=1/m:1")
+    with patch.dict(os.environ, {"CI": "true"}):
+        flask_client.post("/analyze", json={"image": "aGk="})
+        flask_client.post("/analyze", json={"image": "aGk="})
+    response = flask_client.get("/metrics")
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    assert 'route="/analyze",outcome="allowed"} 1' in text
+    assert 'route="/analyze",outcome="limited"} 1' in text
+    assert "webapp_ml_inflight_limit" in text
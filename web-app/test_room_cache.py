@@ -0,0 +1,60 @@
+"""Tests for room id validation and the per-room whiteboard cache."""
+
+import threading
+import time
+from room_cache import DEFAULT_ROOM, RoomCache, normalize_room
+
+
+def test_normalize_room():
+    """Empty means the default room; anything odd is rejected."""
+    assert normalize_room(None) == DEFAULT_ROOM
+    assert normalize_room("") == DEFAULT_ROOM
+    assert normalize_room("bio-101") == "bio-101"
+    assert normalize_room("a b") is None
+    assert normalize_room("x" * 65) is None
+    assert normalize_room(7) is None
+
+
+def test_cache_is_per_room_and_expires():
+    """Values are kept per room until the TTL runs out."""
+    cache = RoomCache(ttl=0.05, max_rooms=10)
+    calls = []
+
+    def loader(room):
+        return lambda: calls.append(room) or [room, len(calls)]
+
+    assert cache.get("a", loader("a")) == ["a", 1]
+    assert cache.get("a", loader("a")) == ["a", 1]
+    assert cache.get("b", loader("b")) == ["b", 2]
+    time.sleep(0.06)
+    assert cache.get("b", loader("b")) == ["b", 3]
+
+
+def test_cache_does_not_store_failures():
+    """A None result (database down) is retried on the next request."""
+    cache = RoomCache(ttl=60, max_rooms=10)
+    assert cache.get("a", lambda: None) is None
+    assert cache.get("a", lambda: [1]) == [1]
+
+
+def test_cache_evicts_least_recent_room():
+    """No more than max_rooms rooms are held."""
+    cache = RoomCache(ttl=60, max_rooms=2)
+    for room in ("a", "b", "c"):
+        cache.get(room, lambda r=room: [r])
+    assert cache.get("a", lambda: ["reloaded"]) == ["reloaded"]
+
+
+def test_slow_room_does_not_block_others():
+    """One room reloading does not hold up reads of another room."""
+    cache = RoomCache(ttl=60, max_rooms=10)
+    release = threading.Event()
+    slow = threading.Thread(target=cache.get, args=("busy", release.wait))
+    slow.start()
+    try:
+        started = time.monotonic()
+        assert cache.get("quiet", lambda: [1]) == [1]
+        assert time.monotonic() - started < 0.5
+    finally:
+        release.set()
+        slow.join()
@@ -0,0 +1,123 @@
+"""Tests for request tracing in the web app."""
+
+import json
+import logging
+import os
+import re
+from unittest.mock import Mock, patch
+
+from shared import tracing
+from shared.tracing import Trace, Tracer
+from app import create_app
+
+TINY_PNG = (
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42"
+    "mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+)
+
+
+def post_analyze(flask_app):
+    """POST /analyze against a mocked ML service; returns (response, ML call)."""
+    ml_response = Mock(status_code=200)
+    ml_response.json.return_value = {"gesture": "fist"}
+    with patch.dict(os.environ, {"CI": ""}):
+        with patch("app.requests.post", return_value=ml_response) as ml_post:
+            response = flask_app.test_client().post(
+                "/analyze", json={"image": TINY_PNG}
+            )
+    return response, ml_post.call_args
+
+
+def test_untraced_request_still_gets_request_id():
+    """With tracing off the ML call carries a fresh id and no traceparent."""
+    with patch.dict(os.environ, {"TRACE_EXPORT": ""}):
+        flask_app = create_app()
+    response, call = post_analyze(flask_app)
+
+    assert response.status_code == 200
+    assert "X-Trace-ID" not in response.headers
+    assert re.fullmatch(r"[0-9a-f]{32}", call.kwargs["headers"]["X-Request-ID"])
+    assert "traceparent" not in call.kwargs["headers"]
+
+
+def test_analyze_trace_is_exported_and_propagated(tmp_path):
+    """The ML call continues the trace under ml_request, with its own request id."""
+    path = tmp_path / "traces.jsonl"
+    env = {"TRACE_EXPORT": "file", "TRACE_FILE": str(path), "TRACE_SAMPLE": "1"}
+    with patch.dict(os.environ, env):
+        flask_app = create_app()
+    with patch.object(Tracer, "_ensure_thread"):
+        response, call = post_analyze(flask_app)
+    flask_app.extensions["tracing"].flush()
+
+    trace_id = response.headers["X-Trace-ID"]
+    headers = call.kwargs["headers"]
+    assert re.fullmatch(r"[0-9a-f]{32}", headers["X-Request-ID"])
+    assert headers["X-Request-ID"] != trace_id
+    version, parent_trace, parent_span, flags = headers["traceparent"].split("-")
+    assert (version, parent_trace, flags) == ("00", trace_id, "01")
+
+    export = json.loads(path.read_text(encoding="utf-8"))
+    resource = export["resourceSpans"][0]
+    assert {"key": "service.name", "value": {"stringValue": "web-app"}} in resource[
+        "resource"
+    ]["attributes"]
+    spans = {s["name"]: s for s in resource["scopeSpans"][0]["spans"]}
+    assert set(spans) == {"POST /analyze", "parse_json", "ml_request"}
+    assert spans["ml_request"]["spanId"] == parent_span
+    assert spans["ml_request"]["parentSpanId"] == spans["POST /analyze"]["spanId"]
+    assert "parentSpanId" not in spans["POST /analyze"]
+    assert {"key": "http.status_code", "value": {"intValue": "200"}} in spans[
+        "POST /analyze"
+    ]["attributes"]
+
+
+def test_begin_continues_incoming_trace():
+    """A valid traceparent is continued; anything else starts a new trace."""
+    tracer = Tracer("test", export="file", sample=0.0)
+    trace = tracer.begin({"traceparent": f"00-{'a' * 32}-{'b' * 16}-01"})
+    assert (trace.trace_id, trace.parent_id, trace.sampled) == (
+        "a" * 32,
+        "b" * 16,
+        True,
+    )
+
+    trace = tracer.begin({"traceparent": "garbage", "X-Request-ID": "c" * 32})
+    assert trace.trace_id != "c" * 32
+    assert (trace.parent_id, trace.sampled) == (None, False)
+
+
+def test_unsampled_traces_kept_only_when_slow():
+    """TRACE_SLOW_MS keeps slow requests even when sampling drops them."""
+    tracer = Tracer("test", export="file", sample=0.0, slow_ms=50)
+    fast, slow = Trace("a" * 32, sampled=False), Trace("b" * 32, sampled=False)
+    for trace, duration_ns in ((fast, 10_000_000), (slow, 80_000_000)):
+        span = trace.start("GET /")
+        trace.end(span)
+        span["end_ns"] = span["start_ns"] + duration_ns
+
+    with patch.object(Tracer, "_ensure_thread"), patch.object(
+        Tracer, "_export"
+    ) as export:
+        tracer.finish(fast)
+        tracer.finish(slow)
+        tracer.flush()
+    export.assert_called_once_with([slow])
+
+
+def test_span_is_free_outside_a_trace():
+    """Stages outside a traced request do not record anything."""
+    assert tracing.span("anything") is tracing.NULL_SPAN
+    assert not tracing.outgoing_headers()
+
+
+def test_export_failures_are_logged(caplog):
+    """An unreachable collector is logged, never raised into the exporter."""
+    tracer = Tracer("test", export="otlp")
+    tracer.url = "http://127.0.0.1:9/v1/traces"
+    trace = Trace("a" * 32)
+    trace.end(trace.start("GET /"))
+
+    with caplog.at_level(logging.WARNING, logger="shared.tracing"):
+        tracer._export([trace])  # pylint: disable=protected-access
+    assert "Trace export failed" in caplog.text